@@ -38,7 +38,7 @@ class AzCli(CLI):
             register_ids_argument, register_global_subscription_argument)
         from azure.cli.core.cloud import get_active_cloud
         from azure.cli.core.commands.transform import register_global_transforms
-        from azure.cli.core._session import ACCOUNT, CONFIG, SESSION
+        from azure.cli.core._session import ACCOUNT, CONFIG, SESSION, INDEX
 
         from knack.util import ensure_dir
 
@@ -53,6 +53,7 @@ class AzCli(CLI):
         ACCOUNT.load(os.path.join(azure_folder, 'azureProfile.json'))
         CONFIG.load(os.path.join(azure_folder, 'az.json'))
         SESSION.load(os.path.join(azure_folder, 'az.sess'), max_age=3600)
+        INDEX.load(os.path.join(azure_folder, 'commandIndex.json'))
         self.cloud = get_active_cloud(self)
         logger.debug('Current cloud config:\n%s', str(self.cloud.name))
 
@@ -131,11 +132,16 @@ class MainCommandsLoader(CLICommandsLoader):
         from azure.cli.core.extension import (
             get_extensions, get_extension_path, get_extension_modname)
 
-        def _update_command_table_from_modules(args):
-            '''Loads command table(s)
-            When `module_name` is specified, only commands from that module will be loaded.
-            If the module is not found, all commands are loaded.
-            '''
+        # {top-level command: {'modules': [...], 'extensions': [...]}} collected while loading, used by the index
+        command_sources = {}
+
+        def _record_command_sources(command_table, source_type, source_name):
+            for cmd_name in command_table:
+                sources = command_sources.setdefault(cmd_name.split()[0], {'modules': [], 'extensions': []})
+                if source_name not in sources[source_type]:
+                    sources[source_type].append(source_name)
+
+        def _get_installed_command_modules():
             installed_command_modules = []
             try:
                 mods_ns_pkg = import_module('azure.cli.command_modules')
@@ -144,15 +150,21 @@ class MainCommandsLoader(CLICommandsLoader):
                                              if modname not in BLACKLISTED_MODS]
             except ImportError as e:
                 logger.warning(e)
+            return installed_command_modules
 
-            logger.debug('Installed command modules %s', installed_command_modules)
+        def _update_command_table_from_modules(args, command_modules):
+            '''Loads command table(s)
+            Only the commands from `command_modules` will be loaded.
+            '''
+            logger.debug('Loading command modules %s', command_modules)
             cumulative_elapsed_time = 0
-            for mod in [m for m in installed_command_modules if m not in BLACKLISTED_MODS]:
+            for mod in [m for m in command_modules if m not in BLACKLISTED_MODS]:
                 try:
                     start_time = timeit.default_timer()
                     module_command_table, module_group_table = _load_module_command_loader(self, args, mod)
                     for cmd in module_command_table.values():
                         cmd.command_source = mod
+                    _record_command_sources(module_command_table, 'modules', mod)
                     self.command_table.update(module_command_table)
                     self.command_group_table.update(module_group_table)
                     elapsed_time = timeit.default_timer() - start_time
@@ -170,7 +182,7 @@ class MainCommandsLoader(CLICommandsLoader):
                          "(note: there's always an overhead with the first module loaded)",
                          cumulative_elapsed_time)
 
-        def _update_command_table_from_extensions(ext_suppressions):
+        def _update_command_table_from_extensions(ext_suppressions, extensions):
 
             from azure.cli.core.extension.operations import check_version_compatibility
 
@@ -185,7 +197,6 @@ class MainCommandsLoader(CLICommandsLoader):
                         filtered_extensions.append(ext)
                 return filtered_extensions
 
-            extensions = get_extensions()
             if extensions:
                 logger.debug("Found %s extensions: %s", len(extensions), [e.name for e in extensions])
                 allowed_extensions = _handle_extension_suppressions(extensions)
@@ -215,6 +226,7 @@ class MainCommandsLoader(CLICommandsLoader):
                                 overrides_command=cmd_name in module_commands,
                                 preview=ext.preview)
 
+                        _record_command_sources(extension_command_table, 'extensions', ext_name)
                         self.command_table.update(extension_command_table)
                         self.command_group_table.update(extension_group_table)
                         elapsed_time = timeit.default_timer() - start_time
@@ -253,22 +265,69 @@ class MainCommandsLoader(CLICommandsLoader):
                             res.append(sup)
             return res
 
-        _update_command_table_from_modules(args)
+        def _load_from_index(command_index, installed_command_modules, extensions):
+            index_result = command_index.get(args, installed_command_modules, extensions)
+            if not index_result:
+                return False
+            index_modules, index_extension_names = index_result
+            _update_command_table_from_modules(args, index_modules)
+            # The index only records extensions which were loaded (i.e. not suppressed) when it was built
+            _update_command_table_from_extensions([], [e for e in extensions if e.name in index_extension_names])
+            if command_index.matches(args, self.command_table):
+                logger.debug("Loaded %d commands from the command index.", len(self.command_table))
+                return True
+            logger.debug("The command index is outdated for '%s'. Loading all commands.", ' '.join(args))
+            self.command_table.clear()
+            self.command_group_table.clear()
+            self.cmd_to_loader_map.clear()
+            self.loaders = []
+            command_sources.clear()
+            return False
+
+        installed_command_modules = _get_installed_command_modules()
+        extensions = []
+        try:
+            extensions = get_extensions()
+        except Exception:  # pylint: disable=broad-except
+            logger.warning("Unable to load extensions. Use --debug for more information.")
+            logger.debug(traceback.format_exc())
+
+        command_index = CommandIndex(self.cli_ctx)
+        use_command_index = self.cli_ctx.config.getboolean('core', 'use_command_index', fallback=True)
+        if use_command_index and _load_from_index(command_index, installed_command_modules, extensions):
+            return self.command_table
+
+        _update_command_table_from_modules(args, installed_command_modules)
         try:
             ext_suppressions = _get_extension_suppressions(self.loaders)
             # We always load extensions even if the appropriate module has been loaded
             # as an extension could override the commands already loaded.
-            _update_command_table_from_extensions(ext_suppressions)
+            _update_command_table_from_extensions(ext_suppressions, extensions)
         except Exception:  # pylint: disable=broad-except
             logger.warning("Unable to load extensions. Use --debug for more information.")
             logger.debug(traceback.format_exc())
 
+        if use_command_index:
+            command_index.update(command_sources, extensions)
+
         return self.command_table
 
     def load_arguments(self, command=None):
         from azure.cli.core.commands.parameters import resource_group_name_type, get_location_type, deployment_name_type
+        from azure.cli.core._argument_cache import ArgumentCache, is_completing_argument_value
         from knack.arguments import ignore_type
 
+        argument_cache = ArgumentCache(self.cli_ctx) if ArgumentCache.is_enabled(self.cli_ctx) else None
+        if argument_cache and command is not None:
+            if command not in self.command_table:
+                # group help only needs the descriptions of the commands in the group
+                uncached = [cmd for cmd in self.command_table.values() if not argument_cache.apply_description(cmd)]
+                argument_cache.update_descriptions(
+                    [cmd for cmd in uncached if ' '.join(cmd.name.split()[:-1]) == command])
+            elif self.cli_ctx.data['completer_active'] and not is_completing_argument_value() and \
+                    argument_cache.apply_arguments(self.command_table[command]):
+                return
+
         # omit specific command to load everything
         if command is None:
             command_loaders = set()
@@ -302,6 +361,98 @@ class MainCommandsLoader(CLICommandsLoader):
                 self.extra_argument_registry.update(loader.extra_argument_registry)
                 loader._update_command_definitions()  # pylint: disable=protected-access
 
+            if argument_cache and command in self.command_table:
+                argument_cache.update(self.command_table[command])
+
+
+class CommandIndex(object):
+    """ Persistent mapping from top-level command groups to the command modules and extensions providing them.
+
+    The index is stored in the config directory and is only valid for the CLI version, cloud profile and set of
+    installed extensions it was built with. Any mismatch causes it to be rebuilt on the next full load.
+    """
+
+    _COMMAND_INDEX = 'commandIndex'
+    _COMMAND_INDEX_KEY = 'key'
+
+    def __init__(self, cli_ctx=None):
+        from azure.cli.core._session import INDEX
+        self.INDEX = INDEX
+        self.version = __version__
+        self.cloud_profile = cli_ctx.cloud.profile if cli_ctx and getattr(cli_ctx, 'cloud', None) else None
+
+    def _get_key(self, extensions):
+        return {
+            'version': self.version,
+            'cloudProfile': self.cloud_profile,
+            'extensions': sorted(ext.name for ext in extensions)
+        }
+
+    @staticmethod
+    def _get_command_words(args):
+        words = []
+        for arg in args or []:
+            if arg.startswith('-'):
+                break
+            words.append(arg)
+        return words
+
+    def get(self, args, installed_command_modules, extensions):
+        """ Return a tuple of (command modules, extension names) for the top-level command in `args`,
+        or None if the index cannot be used. """
+        if self.INDEX.get(self._COMMAND_INDEX_KEY) != self._get_key(extensions):
+            logger.debug("Command index is missing or was built for a different CLI version, cloud profile or "
+                         "set of extensions.")
+            return None
+
+        # Group help (`az`, `az --help`) and commands without a top-level group need the full command table
+        command_words = self._get_command_words(args)
+        if not command_words or args[0].startswith('-'):
+            return None
+
+        index_entry = self.INDEX.get(self._COMMAND_INDEX, {}).get(command_words[0])
+        if not index_entry:
+            logger.debug("No command module found in the command index for '%s'.", command_words[0])
+            return None
+
+        modules = index_entry.get('modules', [])
+        extension_names = index_entry.get('extensions', [])
+        if set(modules) - set(installed_command_modules):
+            logger.debug("Command modules %s from the command index are not installed.",
+                         list(set(modules) - set(installed_command_modules)))
+            return None
+        logger.debug("Found command modules %s and extensions %s in the command index for '%s'.",
+                     modules, extension_names, command_words[0])
+        return modules, extension_names
+
+    def matches(self, args, command_table):
+        """ Check the loaded command table can serve `args`, either as a command (optionally followed by
+        positional arguments) or as a command group. """
+        raw_cmd = ' '.join(self._get_command_words(args))
+        for cmd_name in command_table:
+            if raw_cmd == cmd_name or raw_cmd.startswith(cmd_name + ' ') or cmd_name.startswith(raw_cmd + ' '):
+                return True
+        return False
+
+    def update(self, command_sources, extensions):
+        """ Persist `command_sources`, a {top-level command: {'modules': [...], 'extensions': [...]}} mapping
+        collected during a full load. """
+        self.INDEX.data[self._COMMAND_INDEX_KEY] = self._get_key(extensions)
+        self.INDEX.data[self._COMMAND_INDEX] = command_sources
+        try:
+            self.INDEX.save_with_retry()
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the command index: %s", ex)
+        logger.debug("Updated command index with %d top-level commands.", len(command_sources))
+
+    def invalidate(self):
+        self.INDEX.data = {}
+        try:
+            self.INDEX.save_with_retry()
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to invalidate the command index: %s", ex)
+        logger.debug("Command index has been invalidated.")
+
 
 class ModExtensionSuppress(object):  # pylint: disable=too-few-public-methods
 
@@ -550,6 +701,7 @@ def get_default_cli():
     from azure.cli.core._config import GLOBAL_CONFIG_DIR, ENV_VAR_PREFIX
     from azure.cli.core._help import AzCliHelp
     from azure.cli.core._output import AzOutputProducer
+    from azure.cli.core._query import AzCliQuery
 
     return AzCli(cli_name='az',
                  config_dir=GLOBAL_CONFIG_DIR,
@@ -559,4 +711,5 @@ def get_default_cli():
                  parser_cls=AzCliCommandParser,
                  logging_cls=AzCliLogging,
                  output_cls=AzOutputProducer,
+                 query_cls=AzCliQuery,
                  help_cls=AzCliHelp)
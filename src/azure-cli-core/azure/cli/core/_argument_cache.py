@@ -0,0 +1,195 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+
+import six
+
+from knack.arguments import CLICommandArgument
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# Argument settings which are plain data and can be replayed without importing the command module
+_SERIALIZABLE_SETTINGS = ['options_list', 'help', 'choices', 'nargs', 'action', 'id_part', 'arg_group', 'dest']
+
+
+class ArgumentCache(object):
+    """ Serialized argument and description metadata of commands, stored per command module or extension.
+
+    Entries are recorded the first time a command's arguments are loaded via reflection, or its description is
+    resolved for group help, and are used for tab completion and group help, so that neither needs to import the
+    command handlers or SDK operation classes.
+    An entry is only valid for the CLI (or extension) version and cloud profile it was recorded with.
+    """
+
+    _CACHE_DIR = 'commandArguments'
+    _CACHE_KEY = 'key'
+    _COMMANDS = 'commands'
+
+    def __init__(self, cli_ctx):
+        self.cli_ctx = cli_ctx
+        self.cache_dir = os.path.join(cli_ctx.config.config_dir, self._CACHE_DIR)
+        self._sessions = {}
+
+    @staticmethod
+    def is_enabled(cli_ctx):
+        return cli_ctx.config.getboolean('core', 'use_argument_cache', fallback=True)
+
+    def _get_source(self, cmd):
+        """ Return the (name, version) of the command module or extension providing `cmd`. """
+        from azure.cli.core import __version__ as cli_version
+        command_source = getattr(cmd, 'command_source', None)
+        if isinstance(command_source, six.string_types):
+            return command_source, cli_version
+        extension_name = getattr(command_source, 'extension_name', None)
+        if extension_name:
+            from azure.cli.core.extension import get_extension, ExtensionNotInstalledException
+            try:
+                return extension_name, get_extension(extension_name).version
+            except ExtensionNotInstalledException:
+                return None
+        return None
+
+    def _get_key(self, version):
+        return {'version': version, 'cloudProfile': self.cli_ctx.cloud.profile}
+
+    def _get_session(self, source_name):
+        from knack.util import ensure_dir
+        from azure.cli.core._session import Session
+        if source_name not in self._sessions:
+            ensure_dir(self.cache_dir)
+            session = Session()
+            session.load(os.path.join(self.cache_dir, '{}.json'.format(source_name)))
+            self._sessions[source_name] = session
+        return self._sessions[source_name]
+
+    def _get_entry(self, cmd):
+        source = self._get_source(cmd)
+        if not source:
+            return None
+        source_name, version = source
+        session = self._get_session(source_name)
+        if session.get(self._CACHE_KEY) != self._get_key(version):
+            return None
+        return session.get(self._COMMANDS, {}).get(cmd.name)
+
+    @staticmethod
+    def _serialize_argument(argument):
+        settings = {}
+        for key in _SERIALIZABLE_SETTINGS:
+            value = argument.type.settings.get(key, None)
+            if value is None:
+                continue
+            if key == 'options_list':
+                value = [o for o in value if isinstance(o, six.string_types)]
+            elif key == 'choices':
+                value = [c if isinstance(c, (six.string_types, int, float, bool)) else str(c) for c in value]
+            elif key == 'help':
+                value = str(value)
+            elif not isinstance(value, (six.string_types, int)):
+                # custom argparse actions and non-literal values cannot be replayed
+                continue
+            settings[key] = value
+        return settings
+
+    @staticmethod
+    def _resolve_description(cmd):
+        description = cmd.description
+        if callable(description):
+            try:
+                description = description()
+            except Exception:  # pylint: disable=broad-except
+                description = None
+        return description if isinstance(description, six.string_types) else None
+
+    def _record(self, cmd, **values):
+        """ Merge `values` into the entry of `cmd` without saving it. Return the source name, or None. """
+        source = self._get_source(cmd)
+        if not source:
+            return None
+        source_name, version = source
+        session = self._get_session(source_name)
+        if session.get(self._CACHE_KEY) != self._get_key(version):
+            session.data = {self._CACHE_KEY: self._get_key(version), self._COMMANDS: {}}
+        session.data.setdefault(self._COMMANDS, {}).setdefault(cmd.name, {}).update(values)
+        return source_name
+
+    def _save(self, source_name):
+        try:
+            self._sessions[source_name].save_with_retry()
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the argument cache for '%s': %s", source_name, ex)
+
+    def update(self, cmd):
+        """ Record the loaded arguments and description of `cmd` if not cached yet. """
+        entry = self._get_entry(cmd)
+        if entry is not None and 'arguments' in entry:
+            return
+        source_name = self._record(
+            cmd, description=self._resolve_description(cmd),
+            arguments={name: self._serialize_argument(arg) for name, arg in cmd.arguments.items()})
+        if source_name:
+            self._save(source_name)
+
+    def update_descriptions(self, cmds):
+        """ Resolve and record the descriptions of `cmds` not cached yet, e.g. the commands listed by group help.
+        The resolved descriptions also replace the description loaders of `cmds`. """
+        source_names = set()
+        for cmd in cmds:
+            entry = self._get_entry(cmd)
+            if entry is not None and 'description' in entry:
+                continue
+            description = self._resolve_description(cmd)
+            if description is not None:
+                cmd.description = description
+            source_names.add(self._record(cmd, description=description))
+        for source_name in source_names - {None}:
+            self._save(source_name)
+
+    def apply_arguments(self, cmd):
+        """ Populate `cmd.arguments` from the cache. Return False if there is no valid entry. """
+        entry = self._get_entry(cmd)
+        if not entry or 'arguments' not in entry:
+            return False
+        for name, settings in entry.get('arguments', {}).items():
+            settings = dict(settings)
+            dest = settings.pop('dest', name)
+            cmd.arguments[name] = CLICommandArgument(dest, **settings)
+        logger.debug("Loaded %d arguments of '%s' from the argument cache.", len(cmd.arguments), cmd.name)
+        return True
+
+    def apply_description(self, cmd):
+        """ Replace the description loader of `cmd` with the cached description, if any. """
+        entry = self._get_entry(cmd)
+        if entry and entry.get('description') is not None:
+            cmd.description = entry['description']
+            return True
+        return False
+
+
+def is_completing_argument_value():
+    """ Whether tab completion is for the value of an option, which needs the real argument completers. """
+    comp_line = os.environ.get('COMP_LINE', '')
+    comp_point = int(os.environ.get('COMP_POINT', len(comp_line)))
+    words = comp_line[:comp_point].split()
+    if not comp_line[:comp_point] or comp_line[:comp_point][-1].isspace():
+        words.append('')
+    if len(words) < 2:
+        return False
+    current_word, previous_word = words[-1], words[-2]
+    return previous_word.startswith('-') and not current_word.startswith('-')
+
+
+def get_completion_args():
+    """ The complete words of the command line being completed, excluding the program name and the word under
+    the cursor. """
+    comp_line = os.environ.get('COMP_LINE', '')
+    comp_point = int(os.environ.get('COMP_POINT', len(comp_line)))
+    line = comp_line[:comp_point]
+    words = line.split()[1:]
+    if words and not line[-1].isspace():
+        words = words[:-1]
+    return words
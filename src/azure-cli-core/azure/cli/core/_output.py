@@ -5,6 +5,68 @@
 
 import knack.output
 
+STREAMING_OUTPUT_FORMATS = ['json', 'jsonc', 'tsv']
+
+
+class PagedResultStream(object):
+    """ A paged command result which is converted page by page while the output is written.
+
+    :param pages: Iterable of the pages of the SDK result
+    :param convert: Function to convert a page into a list of serializable items
+    """
+
+    def __init__(self, pages, convert):
+        self._pages = pages
+        self._convert = convert
+        self.query = None
+
+    def iter_pages(self):
+        from collections import OrderedDict
+        for page in self._pages:
+            items = self._convert(page)
+            if self.query:
+                from jmespath import Options
+                items = self.query.search(items, Options(OrderedDict))
+            if items:
+                yield items
+
+    def __iter__(self):
+        for page in self.iter_pages():
+            for item in page:
+                yield item
+
+
+def _stream_json(stream, write, color=False):
+    from knack.output import _ComplexEncoder
+    import json
+
+    if color:
+        from pygments import highlight, lexers, formatters
+        lexer, formatter = lexers.JsonLexer(ensurenl=False), formatters.TerminalFormatter()  # pylint: disable=no-member
+
+        def _write(text):
+            write(highlight(text, lexer, formatter))
+    else:
+        _write = write
+
+    separator = '[\n'
+    for page in stream.iter_pages():
+        chunks = []
+        for item in page:
+            text = json.dumps(item, ensure_ascii=False, indent=2, sort_keys=True, cls=_ComplexEncoder,
+                              separators=(',', ': '))
+            # indent the item as it would be within the list
+            chunks.append(separator + '  ' + text.replace('\n', '\n  '))
+            separator = ',\n'
+        _write(''.join(chunks))
+    _write('[]\n' if separator == '[\n' else '\n]\n')
+
+
+def _stream_tsv(stream, write):
+    from knack.output import _TsvOutput
+    for page in stream.iter_pages():
+        write(_TsvOutput.dump(page))
+
 
 class AzOutputProducer(knack.output.OutputProducer):
     def __init__(self, cli_ctx=None):
@@ -30,6 +92,33 @@ class AzOutputProducer(knack.output.OutputProducer):
     def format_none(_):
         return ""
 
+    def out(self, obj, formatter=None, out_file=None):
+        if not isinstance(obj.result, PagedResultStream):
+            return super(AzOutputProducer, self).out(obj, formatter=formatter, out_file=out_file)
+
+        import errno
+        import platform
+        import sys
+        import colorama
+
+        out_file = out_file or sys.stdout
+        if platform.system() == 'Windows':
+            out_file = colorama.AnsiToWin32(out_file).stream
+
+        def _write(text):
+            out_file.write(text)
+            out_file.flush()
+
+        try:
+            if formatter is knack.output.format_tsv:
+                _stream_tsv(obj.result, _write)
+            else:
+                _stream_json(obj.result, _write, color=formatter is knack.output.format_json_color)
+        except IOError as ex:
+            if ex.errno != errno.EPIPE:
+                raise
+        return None
+
     def check_valid_format_type(self, format_type):
         return format_type in self._FORMAT_DICT
 
@@ -120,6 +120,119 @@ def _delete_file(file_path):
             raise
 
 
+def _replace_file(src, dst):
+    try:
+        os.replace(src, dst)
+    except AttributeError:  # in Python 2.7
+        if is_windows():
+            _delete_file(dst)
+        os.rename(src, dst)
+
+
+def _get_file_stamp(file_path):
+    try:
+        st = os.stat(file_path)
+        return st.st_mtime, st.st_size
+    except OSError:
+        return None
+
+
+def _get_token_entry_key(entry):
+    if entry.get(_SERVICE_PRINCIPAL_ID):
+        return (_SERVICE_PRINCIPAL, (entry.get(_SERVICE_PRINCIPAL_ID) or '').lower(),
+                (entry.get(_SERVICE_PRINCIPAL_TENANT) or '').lower())
+    # the same identity ADAL uses for its cache entries
+    return (_USER, (entry.get('_authority') or '').lower(), (entry.get('resource') or '').lower(),
+            (entry.get('_clientId') or '').lower(), (entry.get(_TOKEN_ENTRY_USER_ID) or '').lower())
+
+
+class _TokenFileLock(object):
+    """ Advisory lock serializing read-merge-write cycles of the token file across processes. """
+
+    def __init__(self, token_file):
+        self._lock_file_path = token_file + '.lock'
+        self._lock_file = None
+
+    def __enter__(self):
+        self._lock_file = open(self._lock_file_path, 'a')
+        self._lock_file.seek(0)
+        if is_windows():
+            import msvcrt
+            # LK_LOCK retries every second for 10 seconds before raising
+            msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)  # pylint: disable=no-member
+        else:
+            import fcntl
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self._lock_file.seek(0)
+            if is_windows():
+                import msvcrt
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)  # pylint: disable=no-member
+            else:
+                import fcntl
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+_INDEXED_TOKEN_CACHE_CLS = None
+
+
+def _get_indexed_token_cache_cls():
+    """ ADAL token cache whose lookups by user and client ID use an index instead of scanning all entries. """
+    global _INDEXED_TOKEN_CACHE_CLS  # pylint: disable=global-statement
+    if _INDEXED_TOKEN_CACHE_CLS:
+        return _INDEXED_TOKEN_CACHE_CLS
+
+    import adal
+    from adal.constants import TokenResponseFields
+
+    def _index_key(user_id, client_id):
+        return (user_id or '').lower(), (client_id or '').lower()
+
+    def _entry_index_key(entry):
+        return _index_key(entry.get(TokenResponseFields.USER_ID), entry.get(TokenResponseFields._CLIENT_ID))  # pylint: disable=protected-access
+
+    class IndexedTokenCache(adal.TokenCache):
+
+        def __init__(self, state=None):
+            self._index = {}
+            super(IndexedTokenCache, self).__init__(state)
+
+        def _rebuild_index(self):
+            self._index = {}
+            for cache_key, entry in self._cache.items():
+                self._index.setdefault(_entry_index_key(entry), {})[cache_key] = entry
+
+        def add(self, entries):
+            with self._lock:
+                super(IndexedTokenCache, self).add(entries)
+                self._rebuild_index()
+
+        def remove(self, entries):
+            with self._lock:
+                super(IndexedTokenCache, self).remove(entries)
+                self._rebuild_index()
+
+        def deserialize(self, state):
+            with self._lock:
+                super(IndexedTokenCache, self).deserialize(state)
+                self._rebuild_index()
+
+        def _query_cache(self, is_mrrt, user_id, client_id):
+            if user_id is None or client_id is None:
+                return super(IndexedTokenCache, self)._query_cache(is_mrrt, user_id, client_id)
+            return [v for v in self._index.get(_index_key(user_id, client_id), {}).values()
+                    if is_mrrt is None or is_mrrt == v.get(TokenResponseFields.IS_MRRT)]
+
+    _INDEXED_TOKEN_CACHE_CLS = IndexedTokenCache
+    return _INDEXED_TOKEN_CACHE_CLS
+
+
 def get_credential_types(cli_ctx):
 
     class CredentialType(Enum):  # pylint: disable=too-few-public-methods
@@ -888,6 +1001,9 @@ class CredsCache(object):
         self._should_flush_to_disk = False
         self._async_persist = async_persist
         self._ctx = cli_ctx
+        # entries as last read from or written to the token file, used to merge only our own changes
+        self._persisted_entries = {}
+        self._token_file_stamp = None
         if async_persist:
             import atexit
             atexit.register(self.flush_to_disk)
@@ -898,22 +1014,68 @@ class CredsCache(object):
             self.flush_to_disk()
         self.adal_token_cache.has_state_changed = False
 
-    def flush_to_disk(self):
-        if self._should_flush_to_disk:
-            with os.fdopen(os.open(self._token_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600),
-                           'w+') as cred_file:
-                items = self.adal_token_cache.read_items()
-                all_creds = [entry for _, entry in items]
+    def _get_all_creds(self):
+        items = self.adal_token_cache.read_items()
+        all_creds = [entry for _, entry in items]
+
+        # trim away useless fields (needed for cred sharing with xplat)
+        for i in all_creds:
+            for key in TOKEN_FIELDS_EXCLUDED_FROM_PERSISTENCE:
+                i.pop(key, None)
 
-                # trim away useless fields (needed for cred sharing with xplat)
-                for i in all_creds:
-                    for key in TOKEN_FIELDS_EXCLUDED_FROM_PERSISTENCE:
-                        i.pop(key, None)
+        all_creds.extend(self._service_principal_creds)
+        return all_creds
 
-                all_creds.extend(self._service_principal_creds)
-                cred_file.write(json.dumps(all_creds))
+    def flush_to_disk(self):
+        if self._should_flush_to_disk:
+            current = collections.OrderedDict((_get_token_entry_key(e), e) for e in self._get_all_creds())
+            changed = [(k, v) for k, v in current.items() if self._persisted_entries.get(k) != v]
+            removed = [k for k in self._persisted_entries if k not in current]
+
+            with _TokenFileLock(self._token_file):
+                # merge our changes into what other processes may have written since we loaded the file
+                on_disk = collections.OrderedDict((_get_token_entry_key(e), e)
+                                                  for e in _load_tokens_from_file(self._token_file))
+                for k in removed:
+                    on_disk.pop(k, None)
+                on_disk.update(changed)
+
+                tmp_file = '{}.{}.tmp'.format(self._token_file, os.getpid())
+                with os.fdopen(os.open(tmp_file, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600),
+                               'w+') as cred_file:
+                    cred_file.write(json.dumps(list(on_disk.values())))
+                _replace_file(tmp_file, self._token_file)
+                self._token_file_stamp = _get_file_stamp(self._token_file)
+            self._persisted_entries = {k: deepcopy(v) for k, v in on_disk.items()}
+            self._should_flush_to_disk = False
+
+    def _sync_from_disk(self):
+        """ Pick up entries written by other processes since the token file was loaded, e.g. tokens they refreshed,
+        without discarding changes of this process which have not been flushed yet. """
+        if self._adal_token_cache_attr is None or _get_file_stamp(self._token_file) == self._token_file_stamp:
+            return
+        self._token_file_stamp = _get_file_stamp(self._token_file)
+        on_disk = collections.OrderedDict((_get_token_entry_key(e), e)
+                                          for e in _load_tokens_from_file(self._token_file))
+        token_cache = self._adal_token_cache_attr
+        has_state_changed = token_cache.has_state_changed
+        current = {_get_token_entry_key(e): e for _, e in token_cache.read_items()}
+        # only take entries this process has neither modified nor removed itself
+        stale_keys = [k for k, e in current.items()
+                      if self._persisted_entries.get(k) == e and on_disk.get(k) != e]
+        new_keys = [k for k in on_disk if k not in current and k not in self._persisted_entries]
+        token_cache.remove([current[k] for k in stale_keys])
+        token_cache.add([deepcopy(on_disk[k]) for k in stale_keys + new_keys
+                         if k in on_disk and not on_disk[k].get(_SERVICE_PRINCIPAL_ID)])
+        token_cache.has_state_changed = has_state_changed
+        for k in stale_keys + new_keys:
+            if k in on_disk:
+                self._persisted_entries[k] = deepcopy(on_disk[k])
+            else:
+                self._persisted_entries.pop(k, None)
 
     def retrieve_token_for_user(self, username, tenant, resource):
+        self._sync_from_disk()
         context = self._auth_ctx_factory(self._ctx, tenant, cache=self.adal_token_cache)
         token_entry = context.acquire_token(resource, username, _CLIENT_ID)
         if not token_entry:
@@ -952,11 +1114,12 @@ class CredsCache(object):
 
     def load_adal_token_cache(self):
         if self._adal_token_cache_attr is None:
-            import adal
+            self._token_file_stamp = _get_file_stamp(self._token_file)
             all_entries = _load_tokens_from_file(self._token_file)
+            self._persisted_entries = {_get_token_entry_key(e): deepcopy(e) for e in all_entries}
             self._load_service_principal_creds(all_entries)
             real_token = [x for x in all_entries if x not in self._service_principal_creds]
-            self._adal_token_cache_attr = adal.TokenCache(json.dumps(real_token))
+            self._adal_token_cache_attr = _get_indexed_token_cache_cls()(json.dumps(real_token))
         return self._adal_token_cache_attr
 
     def save_service_principal_cred(self, sp_entry):
@@ -1007,6 +1170,8 @@ class CredsCache(object):
     def remove_all_cached_creds(self):
         # we can clear file contents, but deleting it is simpler
         _delete_file(self._token_file)
+        self._persisted_entries = {}
+        self._token_file_stamp = None
 
 
 class ServicePrincipalAuth(object):
@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+
+from knack.events import EVENT_PARSER_GLOBAL_CREATE
+from knack.log import get_logger
+from knack.query import CLIQuery
+
+logger = get_logger(__name__)
+
+QUERY_CACHE_FILE_NAME = 'queryCache.json'
+QUERY_CACHE_SIZE = 64
+
+# nodes whose children are all evaluated against the current value
+_QUERY_COMBINING_NODES = ['multi_select_dict', 'multi_select_list', 'key_val_pair', 'comparator', 'or_expression',
+                          'and_expression', 'not_expression', 'function_expression']
+# nodes whose first child is evaluated against the current value and the others against its result
+_QUERY_CHAINING_NODES = ['subexpression', 'index_expression', 'pipe', 'projection', 'value_projection',
+                         'filter_projection', 'flatten']
+
+_query_caches = {}
+
+
+def _get_query_cache(cli_ctx):
+    from azure.cli.core._session import Session
+    filename = os.path.join(cli_ctx.config.config_dir, QUERY_CACHE_FILE_NAME)
+    cache = _query_caches.get(filename)
+    if cache is None:
+        cache = _query_caches[filename] = Session()
+        cache.load(filename)
+    return cache
+
+
+def compile_query(cli_ctx, raw_query):
+    """ Compile a JMESPath expression, reusing the syntax tree persisted by previous invocations. """
+    from jmespath import compile as compile_jmespath
+    from jmespath.parser import ParsedResult
+
+    cache = _get_query_cache(cli_ctx)
+    parsed = cache.get(raw_query)
+    if parsed is not None:
+        return ParsedResult(raw_query, parsed)
+
+    compiled = compile_jmespath(raw_query)
+    try:
+        while len(cache) >= QUERY_CACHE_SIZE:
+            del cache.data[next(iter(cache.data))]
+        cache[raw_query] = compiled.parsed
+    except (OSError, IOError, TypeError, ValueError) as ex:
+        logger.debug("Failed to cache query '%s': %s", raw_query, ex)
+    return compiled
+
+
+def _collect_query_fields(node, fields):
+    node_type = node.get('type')
+    if node_type == 'field':
+        fields.add(node['value'])
+        return True
+    if node_type in ['literal', 'index', 'slice', 'expref']:
+        return True
+    if node_type in _QUERY_CHAINING_NODES:
+        return _collect_query_fields(node['children'][0], fields)
+    if node_type in _QUERY_COMBINING_NODES:
+        return all(_collect_query_fields(child, fields) for child in node['children'])
+    # the query uses the whole value, e.g. '@'
+    return False
+
+
+def get_query_fields(query):
+    """ Get the top-level keys a query reads from the result, or from each item when the query projects
+    the result list, e.g. "[].{name:name, group:resourceGroup}". Returns None if the query may read any key. """
+    parsed = getattr(query, 'parsed', None)
+    if not parsed:
+        return None
+    nodes = [parsed]
+    if parsed['type'] in ['projection', 'filter_projection']:
+        left = parsed['children'][0]
+        if left['type'] == 'flatten':
+            left = left['children'][0]
+        if left['type'] == 'identity':
+            nodes = parsed['children'][1:]
+    fields = set()
+    if all(_collect_query_fields(node, fields) for node in nodes):
+        return fields
+    return None
+
+
+class AzCliQuery(CLIQuery):
+
+    def __init__(self, cli_ctx=None):
+        super(AzCliQuery, self).__init__(cli_ctx=cli_ctx)
+        # replace the --query argument of knack with one whose expressions are cached
+        self.cli_ctx.unregister_event(EVENT_PARSER_GLOBAL_CREATE, CLIQuery.on_global_arguments)
+        self.cli_ctx.register_event(EVENT_PARSER_GLOBAL_CREATE, AzCliQuery.on_global_arguments)
+
+    @staticmethod
+    def on_global_arguments(cli_ctx, **kwargs):
+
+        def jmespath_type(raw_query):
+            try:
+                return compile_query(cli_ctx, raw_query)
+            except KeyError:
+                # Raise a ValueError which argparse can handle
+                raise ValueError
+
+        arg_group = kwargs.get('arg_group')
+        arg_group.add_argument('--query', dest='_jmespath_query', metavar='JMESPATH',
+                               help='JMESPath query string. See http://jmespath.org/ for more'
+                                    ' information and examples.',
+                               type=jmespath_type)
@@ -26,7 +26,10 @@ from azure.cli.core.commands.constants import (
 from azure.cli.core.commands.parameters import (
     AzArgumentContext, patch_arg_make_required, patch_arg_make_optional)
 from azure.cli.core.extension import get_extension
-from azure.cli.core.util import get_command_type_kwarg, read_file_content, get_arg_list, poller_classes
+from azure.cli.core._output import PagedResultStream, STREAMING_OUTPUT_FORMATS
+from azure.cli.core._query import get_query_fields
+from azure.cli.core.commands.transform import TRANSFORM_SOURCE_KEYS
+from azure.cli.core.util import get_command_type_kwarg, read_file_content, get_arg_list, poller_classes, todict
 import azure.cli.core.telemetry as telemetry
 
 from knack.arguments import CLICommandArgument
@@ -35,7 +38,7 @@ from knack.deprecation import ImplicitDeprecated, resolve_deprecate_info
 from knack.invocation import CommandInvoker
 from knack.preview import ImplicitPreviewItem, PreviewItem, resolve_preview_info
 from knack.log import get_logger
-from knack.util import CLIError, CommandResultItem, todict
+from knack.util import CLIError, CommandResultItem
 from knack.events import EVENT_INVOKER_TRANSFORM_RESULT
 
 try:
@@ -45,6 +48,8 @@ except AttributeError:  # in Python 2.7
 
 logger = get_logger(__name__)
 DEFAULT_CACHE_TTL = '10'
+DEFAULT_MAX_CONCURRENT_IDS = 10
+MAX_THROTTLED_RETRIES = 3
 
 
 def _explode_list_args(args):
@@ -465,9 +470,65 @@ def get_property(items, name):
     return result
 
 
+def _get_retry_after(ex):
+    """ Return the seconds to wait if `ex` was raised for an HTTP 429 response, otherwise None. """
+    response = getattr(ex, 'response', None)
+    if getattr(response, 'status_code', None) != 429:
+        return None
+    try:
+        return max(float((getattr(response, 'headers', None) or {}).get('Retry-After')), 0)
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class _ConcurrencyLimiter(object):
+    """ Limits the number of `--ids` jobs running at once. The limit is halved when a job is throttled (HTTP 429)
+    and grows back by one after each streak of `limit` successful jobs. """
+
+    def __init__(self, max_limit):
+        import threading
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self._running = 0
+        self._successes = 0
+        self._resume_time = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while True:
+                wait_time = self._resume_time - time.time()
+                if wait_time > 0:
+                    self._condition.wait(wait_time)
+                elif self._running >= self.limit:
+                    self._condition.wait()
+                else:
+                    self._running += 1
+                    return
+
+    def release(self, retry_after=None):
+        with self._condition:
+            self._running -= 1
+            if retry_after is not None:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                self._resume_time = max(self._resume_time, time.time() + retry_after)
+                logger.warning('Request throttled. Reducing parallelism to %d and retrying in %.1f seconds.',
+                               self.limit, retry_after)
+            elif self.limit < self.max_limit:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
 # pylint: disable=too-few-public-methods
 class AzCliCommandInvoker(CommandInvoker):
 
+    _stream_output = False
+    _result_fields = None
+
     # pylint: disable=too-many-statements,too-many-locals,too-many-branches
     def execute(self, args):
         from knack.events import (EVENT_INVOKER_PRE_CMD_TBL_CREATE, EVENT_INVOKER_POST_CMD_TBL_CREATE,
@@ -477,6 +538,11 @@ class AzCliCommandInvoker(CommandInvoker):
         from azure.cli.core.commands.events import (
             EVENT_INVOKER_PRE_CMD_TBL_TRUNCATE, EVENT_INVOKER_PRE_LOAD_ARGUMENTS, EVENT_INVOKER_POST_LOAD_ARGUMENTS)
 
+        if self.cli_ctx.data['completer_active'] and not args:
+            # argcomplete passes the command line in COMP_LINE; use it to only load the command being completed
+            from azure.cli.core._argument_cache import get_completion_args
+            args = get_completion_args()
+
         # TODO: Can't simply be invoked as an event because args are transformed
         args = _pre_command_table_create(self.cli_ctx, args)
 
@@ -553,6 +619,15 @@ class AzCliCommandInvoker(CommandInvoker):
         self.cli_ctx.raise_event(EVENT_INVOKER_PRE_PARSE_ARGS, args=args)
         parsed_args = self.parser.parse_args(args)
 
+        self._result_fields = get_query_fields(getattr(parsed_args, '_jmespath_query', None))
+        stream_query = None
+        self._stream_output = self._can_stream_output(parsed_args)
+        if self._stream_output:
+            # the query is applied to each page of a streamed result rather than by the FILTER_RESULT handler
+            stream_query = parsed_args._jmespath_query  # pylint: disable=protected-access
+            parsed_args._jmespath_query = None  # pylint: disable=protected-access
+            self.data['query_active'] = bool(stream_query)
+
         self.cli_ctx.raise_event(EVENT_INVOKER_POST_PARSE_ARGS, command=parsed_args.command, args=parsed_args)
 
         # TODO: This fundamentally alters the way Knack.invocation works here. Cannot be customized
@@ -587,7 +662,9 @@ class AzCliCommandInvoker(CommandInvoker):
         for expanded_arg in _explode_list_args(parsed_args):
             cmd_copy = copy.copy(cmd)
             cmd_copy.cli_ctx = copy.copy(cmd.cli_ctx)
-            cmd_copy.cli_ctx.data = copy.deepcopy(cmd.cli_ctx.data)
+            # jobs only set top-level keys, so the data doesn't need to be deep copied
+            cmd_copy.cli_ctx.data = copy.copy(cmd.cli_ctx.data)
+            cmd_copy.cli_ctx.data['headers'] = dict(cmd.cli_ctx.data.get('headers', {}))
             expanded_arg.cmd = expanded_arg._cmd = cmd_copy
 
             if hasattr(expanded_arg, '_subscription'):
@@ -596,11 +673,15 @@ class AzCliCommandInvoker(CommandInvoker):
             self._validation(expanded_arg)
             jobs.append((expanded_arg, cmd_copy))
 
+        # only the result of a single job can be written as it arrives
+        self._stream_output = self._stream_output and len(jobs) == 1
+
         ids = getattr(parsed_args, '_ids', None) or [None] * len(jobs)
-        if self.cli_ctx.config.getboolean('core', 'disable_concurrent_ids', False) or len(ids) < 2:
+        max_parallel = self._get_max_concurrent_ids(parsed_args)
+        if max_parallel < 2 or len(ids) < 2:
             results, exceptions = self._run_jobs_serially(jobs, ids)
         else:
-            results, exceptions = self._run_jobs_concurrently(jobs, ids)
+            results, exceptions = self._run_jobs_concurrently(jobs, ids, max_parallel)
 
         # handle exceptions
         if len(exceptions) == 1 and not results:
@@ -616,6 +697,13 @@ class AzCliCommandInvoker(CommandInvoker):
         if results and len(results) == 1:
             results = results[0]
 
+        if isinstance(results, PagedResultStream):
+            results.query = stream_query
+        elif stream_query:
+            from collections import OrderedDict
+            from jmespath import Options
+            results = stream_query.search(results, Options(OrderedDict))
+
         event_data = {'result': results}
         self.cli_ctx.raise_event(EVENT_INVOKER_FILTER_RESULT, event_data=event_data)
 
@@ -646,41 +734,90 @@ class AzCliCommandInvoker(CommandInvoker):
             if _is_poller(result):
                 result = LongRunningOperation(cmd_copy.cli_ctx, 'Starting {}'.format(cmd_copy.name))(result)
             elif _is_paged(result):
+                if self._stream_output:
+                    return PagedResultStream(_iter_pages(result), lambda page: self._transform_result(page, cmd_copy))
                 result = list(result)
 
-            result = todict(result, AzCliCommandInvoker.remove_additional_prop_layer)
-            event_data = {'result': result}
-            cmd_copy.cli_ctx.raise_event(EVENT_INVOKER_TRANSFORM_RESULT, event_data=event_data)
-            return event_data['result']
+            return self._transform_result(result, cmd_copy)
         except Exception as ex:  # pylint: disable=broad-except
             if cmd_copy.exception_handler:
                 cmd_copy.exception_handler(ex)
                 return CommandResultItem(None, exit_code=1, error=ex)
             six.reraise(*sys.exc_info())
 
+    def _transform_result(self, result, cmd_copy):
+        fields = self._result_fields
+        if fields is not None:
+            # keep the keys read by the post processor and the transform handlers
+            fields = fields.union(['additionalProperties'], TRANSFORM_SOURCE_KEYS)
+        result = todict(result, AzCliCommandInvoker.remove_additional_prop_layer, fields)
+        event_data = {'result': result}
+        cmd_copy.cli_ctx.raise_event(EVENT_INVOKER_TRANSFORM_RESULT, event_data=event_data)
+        return event_data['result']
+
+    def _can_stream_output(self, parsed_args):
+        if not self.cli_ctx.config.getboolean('core', 'stream_output', False):
+            return False
+        if getattr(parsed_args, '_output_format', None) not in STREAMING_OUTPUT_FORMATS:
+            return False
+        query = getattr(parsed_args, '_jmespath_query', None)
+        return query is None or _is_streamable_query(query)
+
+    def _get_max_concurrent_ids(self, parsed_args):
+        if self.cli_ctx.config.getboolean('core', 'disable_concurrent_ids', False):
+            return 1
+        max_parallel = getattr(parsed_args, '_max_parallel', None)
+        if max_parallel is None:
+            max_parallel = self.cli_ctx.config.getint('core', 'max_concurrent_ids',
+                                                      fallback=DEFAULT_MAX_CONCURRENT_IDS)
+        return max(max_parallel, 1)
+
     def _run_jobs_serially(self, jobs, ids):
         results, exceptions = [], []
-        for job, id_arg in zip(jobs, ids):
+        for index, (job, id_arg) in enumerate(zip(jobs, ids)):
             expanded_arg, cmd_copy = job
+            start_time = time.time()
             try:
                 results.append(self._run_job(expanded_arg, cmd_copy))
             except(Exception, SystemExit) as ex:  # pylint: disable=broad-except
                 exceptions.append((ex, id_arg))
+            self._log_job_completion(index + 1, len(jobs), id_arg, start_time)
         return results, exceptions
 
-    def _run_jobs_concurrently(self, jobs, ids):
+    def _run_throttled_job(self, limiter, expanded_arg, cmd_copy):
+        for attempt in range(MAX_THROTTLED_RETRIES + 1):
+            limiter.acquire()
+            retry_after = None
+            try:
+                return self._run_job(expanded_arg, cmd_copy)
+            except Exception as ex:  # pylint: disable=broad-except
+                retry_after = _get_retry_after(ex)
+                if retry_after is None or attempt == MAX_THROTTLED_RETRIES:
+                    raise
+            finally:
+                limiter.release(retry_after)
+        return None
+
+    def _run_jobs_concurrently(self, jobs, ids, max_parallel=DEFAULT_MAX_CONCURRENT_IDS):
         from concurrent.futures import ThreadPoolExecutor, as_completed
-        tasks, results, exceptions = [], [], []
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            for expanded_arg, cmd_copy in jobs:
-                tasks.append(executor.submit(self._run_job, expanded_arg, cmd_copy))
+        results, exceptions = [], []
+        limiter = _ConcurrencyLimiter(max_parallel)
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            start_time = time.time()
+            tasks = {executor.submit(self._run_throttled_job, limiter, expanded_arg, cmd_copy): id_arg
+                     for (expanded_arg, cmd_copy), id_arg in zip(jobs, ids)}
             for index, task in enumerate(as_completed(tasks)):
                 try:
                     results.append(task.result())
                 except (Exception, SystemExit) as ex:  # pylint: disable=broad-except
-                    exceptions.append((ex, ids[index]))
+                    exceptions.append((ex, tasks[task]))
+                self._log_job_completion(index + 1, len(jobs), tasks[task], start_time)
         return results, exceptions
 
+    @staticmethod
+    def _log_job_completion(completed, total, id_arg, start_time):
+        logger.info("(%d/%d) Completed '%s' after %.2f seconds", completed, total, id_arg, time.time() - start_time)
+
     def resolve_warnings(self, cmd, parsed_args):
         self._resolve_preview_and_deprecation_warnings(cmd, parsed_args)
         self._resolve_extension_override_warning(cmd)
@@ -758,10 +895,11 @@ class AzCliCommandInvoker(CommandInvoker):
 
     @staticmethod
     def remove_additional_prop_layer(obj, converted_dic):
-        from msrest.serialization import Model
-        if isinstance(obj, Model):
+        # check the converted keys first as this runs for every dictionary of the result
+        if 'additionalProperties' in converted_dic:
+            from msrest.serialization import Model
             # let us make sure this is the additional properties auto-generated by SDK
-            if ('additionalProperties' in converted_dic and isinstance(obj.additional_properties, dict)):
+            if isinstance(obj, Model) and isinstance(obj.additional_properties, dict):
                 converted_dic.update(converted_dic.pop('additionalProperties'))
         return converted_dic
 
@@ -1029,6 +1167,26 @@ def _is_paged(obj):
     return False
 
 
+def _iter_pages(paged):
+    while True:
+        try:
+            yield paged.advance_page()
+        except StopIteration:
+            return
+
+
+def _is_streamable_query(query):
+    # projections and filters over the top level list can be applied to each page separately,
+    # e.g. "[].name" or "[?location=='westus'].{name:name, id:id}"
+    parsed = getattr(query, 'parsed', None) or {}
+    if parsed.get('type') not in ['projection', 'filter_projection']:
+        return False
+    left = parsed['children'][0]
+    if left['type'] == 'flatten':
+        left = left['children'][0]
+    return left['type'] == 'identity'
+
+
 def _is_poller(obj):
     # Since loading msrest is expensive, we avoid it until we have to
     if obj.__class__.__name__ in ['AzureOperationPoller', 'LROPoller']:
@@ -13,7 +13,8 @@ import re
 from six import string_types
 
 from azure.cli.core import AzCommandsLoader, EXCLUDED_PARAMS
-from azure.cli.core.commands import LongRunningOperation, _is_poller, cached_get, cached_put
+from azure.cli.core.commands import (LongRunningOperation, _is_poller, cached_get, cached_put,
+                                     DEFAULT_MAX_CONCURRENT_IDS)
 from azure.cli.core.commands.client_factory import get_mgmt_service_client
 from azure.cli.core.commands.events import EVENT_INVOKER_PRE_LOAD_ARGUMENTS
 from azure.cli.core.commands.validators import IterateValue
@@ -228,6 +229,10 @@ def register_ids_argument(cli_ctx):
                 'arg_group': group_name
             }
             command.add_argument('ids', '--ids', **id_kwargs)
+            command.add_argument('_max_parallel', '--max-parallel', type=int, arg_group=group_name,
+                                 help='The maximum number of resource IDs to process concurrently. Values less '
+                                      'than 2 process them one at a time. Default: the `core.max_concurrent_ids` '
+                                      'config value, or {}.'.format(DEFAULT_MAX_CONCURRENT_IDS))
 
     def parse_ids_arguments(_, command, args):
         namespace = args
@@ -4,6 +4,8 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import threading
+from collections import OrderedDict
 
 from azure.cli.core import __version__ as core_version
 import azure.cli.core._debug as _debug
@@ -18,6 +20,14 @@ logger = get_logger(__name__)
 UA_AGENT = "AZURECLI/{}".format(core_version)
 ENV_ADDITIONAL_USER_AGENT = 'AZURE_HTTP_USER_AGENT'
 
+# Management clients are reused across the jobs of one command invocation (e.g. `--ids` fan-out) and all of them
+# share one keep-alive connection pool, so concurrent jobs don't each pay for a TLS handshake.
+MGMT_CLIENT_CACHE_SIZE = 32
+HTTP_POOL_MAXSIZE = 32
+_mgmt_client_cache = OrderedDict()
+_mgmt_client_cache_lock = threading.Lock()
+_http_adapter = None
+
 
 def resolve_client_arg_name(operation, kwargs):
     if not isinstance(operation, str):
@@ -122,6 +132,16 @@ def _get_mgmt_service_client(cli_ctx,
     from azure.cli.core._profile import Profile
     logger.debug('Getting management service client client_type=%s', client_type.__name__)
     resource = resource or cli_ctx.cloud.endpoints.active_directory_resource_id
+    cache_key = _get_mgmt_client_cache_key(cli_ctx, client_type, subscription_bound, subscription_id, api_version,
+                                           base_url_bound, resource, sdk_profile, aux_subscriptions, kwargs)
+    if cache_key is not None:
+        with _mgmt_client_cache_lock:
+            cached = _mgmt_client_cache.pop(cache_key, None)
+            if cached:
+                _mgmt_client_cache[cache_key] = cached
+                logger.debug('Reusing management service client client_type=%s', client_type.__name__)
+                return cached
+
     profile = Profile(cli_ctx=cli_ctx)
     cred, subscription_id, _ = profile.get_login_credentials(subscription_id=subscription_id, resource=resource,
                                                              aux_subscriptions=aux_subscriptions)
@@ -143,9 +163,66 @@ def _get_mgmt_service_client(cli_ctx,
 
     configure_common_settings(cli_ctx, client)
 
+    if cache_key is not None:
+        _share_http_connection_pool(client)
+        with _mgmt_client_cache_lock:
+            _mgmt_client_cache[cache_key] = (client, subscription_id)
+            while len(_mgmt_client_cache) > MGMT_CLIENT_CACHE_SIZE:
+                _mgmt_client_cache.popitem(last=False)
+
     return client, subscription_id
 
 
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _get_mgmt_client_cache_key(cli_ctx, client_type, *args):
+    """ Clients are only reused within one command invocation, identified by its client request ID, since the
+    headers configured on a client are specific to the invocation. Returns None if the client cannot be reused. """
+    request_id = cli_ctx.data.get('headers', {}).get('x-ms-client-request-id')
+    if not request_id:
+        return None
+    key = (request_id, client_type) + _freeze(args)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _get_shared_http_adapter(max_retries):
+    global _http_adapter  # pylint: disable=global-statement
+    with _mgmt_client_cache_lock:
+        if _http_adapter is None:
+            from requests.adapters import HTTPAdapter
+            _http_adapter = HTTPAdapter(pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=max_retries)
+        return _http_adapter
+
+
+def _share_http_connection_pool(client):
+    """ Keep the connections of `client` alive and route the requests of every thread's session through one
+    connection pool shared by all management clients. """
+    config = client.config
+    if not hasattr(config, 'session_configuration_callback'):
+        return
+    config.keep_alive = True
+    adapter = _get_shared_http_adapter(config.retry_policy())
+    default_callback = config.session_configuration_callback
+
+    def _session_configuration_callback(session, global_config, local_config, **kwargs):
+        for protocol in ['http://', 'https://']:
+            if session.adapters.get(protocol) is not adapter:
+                session.mount(protocol, adapter)
+        return default_callback(session, global_config, local_config, **kwargs)
+
+    config.session_configuration_callback = _session_configuration_callback
+
+
 def get_data_service_client(cli_ctx, service_type, account_name, account_key, connection_string=None,
                             sas_token=None, socket_timeout=None, token_credential=None, endpoint_suffix=None):
     logger.debug('Getting data service client service_type=%s', service_type.__name__)
@@ -9,6 +9,9 @@ from azure.cli.core.util import b64_to_hex
 
 import knack.events as events
 
+# keys of the converted result which the transforms below read
+TRANSFORM_SOURCE_KEYS = ['id', 'x509Thumbprint']
+
 
 def register_global_transforms(cli_ctx):
     cli_ctx.register_event(events.EVENT_INVOKER_TRANSFORM_RESULT, _resource_group_transform)
@@ -286,6 +286,9 @@ def update_extension(cmd, extension_name, index_url=None, pip_extra_index_urls=N
                          pip_extra_index_urls=pip_extra_index_urls, pip_proxy=pip_proxy)
             logger.debug('Deleting backup of old extension at %s', backup_dir)
             shutil.rmtree(backup_dir)
+            # The command index is keyed by extension names only, so a new version must invalidate it explicitly
+            from azure.cli.core import CommandIndex
+            CommandIndex(cmd.cli_ctx).invalidate()
             # This gets the metadata for the extension *after* the update
             _augment_telemetry_with_ext_info(extension_name)
         except Exception as err:
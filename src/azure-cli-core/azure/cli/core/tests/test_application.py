@@ -119,6 +119,108 @@ class TestApplication(unittest.TestCase):
 
         os.remove(f.name)
 
+    def test_run_jobs_concurrently_retries_throttled_jobs(self):
+        from azure.cli.core.commands import AzCliCommandInvoker
+
+        class ThrottledError(Exception):
+            def __init__(self):
+                super(ThrottledError, self).__init__('Too many requests')
+                self.response = mock.MagicMock(status_code=429, headers={'Retry-After': '0'})
+
+        attempts = {}
+
+        def _run_job(expanded_arg, cmd_copy):  # pylint: disable=unused-argument
+            attempts[expanded_arg] = attempts.get(expanded_arg, 0) + 1
+            if expanded_arg == 'throttled' and attempts[expanded_arg] < 3:
+                raise ThrottledError()
+            if expanded_arg == 'failed':
+                raise CLIError('failed')
+            return expanded_arg
+
+        cli = DummyCli()
+        invoker = AzCliCommandInvoker(cli_ctx=cli, parser_cls=cli.parser_cls,
+                                      commands_loader_cls=cli.commands_loader_cls, help_cls=cli.help_cls)
+        jobs = [(name, None) for name in ['ok', 'throttled', 'failed']]
+        ids = ['id-ok', 'id-throttled', 'id-failed']
+        with mock.patch.object(invoker, '_run_job', side_effect=_run_job):
+            results, exceptions = invoker._run_jobs_concurrently(jobs, ids, 2)  # pylint: disable=protected-access
+
+        self.assertEqual(sorted(results), ['ok', 'throttled'])
+        self.assertEqual(attempts['throttled'], 3)
+        self.assertEqual(len(exceptions), 1)
+        self.assertEqual(exceptions[0][1], 'id-failed')
+
+    def test_concurrency_limiter_backs_off_when_throttled(self):
+        from azure.cli.core.commands import _ConcurrencyLimiter
+        limiter = _ConcurrencyLimiter(8)
+        limiter.acquire()
+        limiter.release(retry_after=0)
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release()
+        self.assertEqual(limiter.limit, 5)
+
+    def test_max_concurrent_ids(self):
+        from azure.cli.core.commands import AzCliCommandInvoker, DEFAULT_MAX_CONCURRENT_IDS
+        cli = DummyCli()
+        invoker = AzCliCommandInvoker(cli_ctx=cli, parser_cls=cli.parser_cls,
+                                      commands_loader_cls=cli.commands_loader_cls, help_cls=cli.help_cls)
+        get_max_concurrent_ids = invoker._get_max_concurrent_ids  # pylint: disable=protected-access
+        with mock.patch.object(cli.config, 'getboolean', return_value=False):
+            with mock.patch.object(cli.config, 'getint', side_effect=lambda s, o, fallback: fallback):
+                self.assertEqual(get_max_concurrent_ids(mock.MagicMock(_max_parallel=None)),
+                                 DEFAULT_MAX_CONCURRENT_IDS)
+                self.assertEqual(get_max_concurrent_ids(mock.MagicMock(_max_parallel=50)), 50)
+            with mock.patch.object(cli.config, 'getint', return_value=25):
+                self.assertEqual(get_max_concurrent_ids(mock.MagicMock(_max_parallel=None)), 25)
+        with mock.patch.object(cli.config, 'getboolean', return_value=True):
+            self.assertEqual(get_max_concurrent_ids(mock.MagicMock(_max_parallel=50)), 1)
+
+    def test_paged_result_streamed(self):
+        import json
+        from io import StringIO
+        from msrest.paging import Paged
+
+        class SamplePaged(Paged):
+            _attribute_map = {
+                'next_link': {'key': 'nextLink', 'type': 'str'},
+                'current_page': {'key': 'value', 'type': '[object]'}
+            }
+
+        resource_id = '/subscriptions/0/resourceGroups/rg/providers/p/t/a'
+        pages = {
+            '': {'value': [{'name': 'a', 'id': resource_id}], 'nextLink': 'p2'},
+            'p2': {'value': [{'name': 'b'}], 'nextLink': None}
+        }
+
+        def _handler(_):
+            return SamplePaged(lambda link: pages[link], {})
+
+        class TestCommandsLoader(AzCommandsLoader):
+
+            def load_command_table(self, args):
+                super(TestCommandsLoader, self).load_command_table(args)
+                self.command_table = {'test': AzCliCommand(self, 'test', _handler)}
+                return self.command_table
+
+        cli = DummyCli(commands_loader_cls=TestCommandsLoader)
+        for stream_output in [True, False]:
+            def _getboolean(section, option, fallback=False):  # pylint: disable=unused-argument
+                return stream_output if option == 'stream_output' else fallback
+
+            with mock.patch.object(cli.config, 'getboolean', side_effect=_getboolean):
+                for query, expected in [(None, [{'name': 'a', 'id': resource_id, 'resourceGroup': 'rg'}, {'name': 'b'}]),
+                                        ('[].name', ['a', 'b']),
+                                        ('[1].name', 'b')]:
+                    out_file = StringIO()
+                    args = ['test', '-o', 'json'] + (['--query', query] if query else [])
+                    self.assertEqual(cli.invoke(args, out_file=out_file), 0)
+                    self.assertEqual(json.loads(out_file.getvalue()), expected)
+                    streamed = cli.invocation._stream_output  # pylint: disable=protected-access
+                    self.assertEqual(streamed, stream_output and query != '[1].name')
+                    self.assertEqual(bool(cli.invocation.data['query_active']), bool(query))
+
 
 if __name__ == '__main__':
     unittest.main()
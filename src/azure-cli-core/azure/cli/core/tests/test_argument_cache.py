@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core import AzCommandsLoader
+from azure.cli.core._argument_cache import ArgumentCache, is_completing_argument_value, get_completion_args
+from azure.cli.core.mock import DummyCli
+
+
+def sample_get(resource_group_name, vm_name, expand=None):  # pylint: disable=unused-argument
+    """
+    Get a sample resource.
+
+    :param resource_group_name: The name of the resource group.
+    :param vm_name: The name of the virtual machine.
+    :param expand: The expand expression to apply on the operation.
+    """
+
+
+class TestCommandsLoader(AzCommandsLoader):
+
+    def load_command_table(self, args):
+        super(TestCommandsLoader, self).load_command_table(args)
+        with self.command_group('test', operations_tmpl='{}#{{}}'.format(__name__)) as g:
+            g.command('get', 'sample_get')
+        return self.command_table
+
+    def load_arguments(self, command):
+        super(TestCommandsLoader, self).load_arguments(command)
+        with self.argument_context('test get') as c:
+            c.argument('vm_name', options_list=['--name', '-n'], id_part='name')
+            c.argument('expand', choices=['a', 'b'])
+
+
+class TestArgumentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _load_command(self, cli, with_arguments=True):
+        loader = TestCommandsLoader(cli)
+        loader.cli_ctx.invocation = mock.MagicMock()
+        loader.cli_ctx.invocation.commands_loader = loader
+        loader.load_command_table(None)
+        cmd = loader.command_table['test get']
+        cmd.command_source = 'test'
+        if with_arguments:
+            loader.command_name = 'test get'
+            cmd.load_arguments()
+            loader.load_arguments('test get')
+            loader._update_command_definitions()  # pylint: disable=protected-access
+        return cmd
+
+    def _get_cache(self, cli):
+        cache = ArgumentCache(cli)
+        cache.cache_dir = self.cache_dir
+        return cache
+
+    def test_argument_cache_round_trip(self):
+        cli = DummyCli()
+        cache = self._get_cache(cli)
+        cmd = self._load_command(cli)
+        cache.update(cmd)
+
+        cached_cmd = self._load_command(cli, with_arguments=False)
+        cache = self._get_cache(cli)
+        self.assertTrue(cache.apply_arguments(cached_cmd))
+        self.assertEqual(sorted(cached_cmd.arguments), sorted(cmd.arguments))
+        self.assertEqual(cached_cmd.arguments['vm_name'].options_list, ['--name', '-n'])
+        self.assertEqual(cached_cmd.arguments['vm_name'].type.settings['id_part'], 'name')
+        self.assertEqual(cached_cmd.arguments['expand'].choices, ['a', 'b'])
+
+        self.assertTrue(cache.apply_description(cached_cmd))
+        self.assertEqual(cached_cmd.description, 'Get a sample resource.')
+
+    def test_argument_cache_stale(self):
+        cli = DummyCli()
+        cache = self._get_cache(cli)
+        cache.update(self._load_command(cli))
+
+        cached_cmd = self._load_command(cli, with_arguments=False)
+        with mock.patch('azure.cli.core.__version__', '0.0.1'):
+            cache = self._get_cache(cli)
+            self.assertFalse(cache.apply_arguments(cached_cmd))
+            self.assertFalse(cache.apply_description(cached_cmd))
+        self.assertEqual(cached_cmd.arguments, {})
+
+    def test_argument_cache_group_help(self):
+        cli = DummyCli()
+        cache = self._get_cache(cli)
+        cmd = self._load_command(cli, with_arguments=False)
+        self.assertFalse(cache.apply_description(cmd))
+        cache.update_descriptions([cmd])
+        self.assertEqual(cmd.description, 'Get a sample resource.')
+
+        cached_cmd = self._load_command(cli, with_arguments=False)
+        cache = self._get_cache(cli)
+        self.assertTrue(cache.apply_description(cached_cmd))
+        self.assertEqual(cached_cmd.description, 'Get a sample resource.')
+        # the arguments are still recorded the first time they are loaded
+        self.assertFalse(cache.apply_arguments(cached_cmd))
+        cache.update(self._load_command(cli))
+        self.assertTrue(self._get_cache(cli).apply_arguments(cached_cmd))
+        self.assertEqual(cached_cmd.arguments['expand'].choices, ['a', 'b'])
+
+    def test_completion_line_parsing(self):
+        def _env(line):
+            return {'COMP_LINE': line, 'COMP_POINT': str(len(line))}
+
+        with mock.patch.dict(os.environ, _env('az vm cre')):
+            self.assertEqual(get_completion_args(), ['vm'])
+            self.assertFalse(is_completing_argument_value())
+        with mock.patch.dict(os.environ, _env('az vm create --na')):
+            self.assertEqual(get_completion_args(), ['vm', 'create'])
+            self.assertFalse(is_completing_argument_value())
+        with mock.patch.dict(os.environ, _env('az vm create --resource-group ')):
+            self.assertEqual(get_completion_args(), ['vm', 'create', '--resource-group'])
+            self.assertTrue(is_completing_argument_value())
+        with mock.patch.dict(os.environ, _env('az vm create -g my')):
+            self.assertTrue(is_completing_argument_value())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+import mock
+
+from msrest.service_client import SDKClient
+from msrest import Configuration
+
+import azure.cli.core.commands.client_factory as client_factory
+from azure.cli.core.commands.client_factory import _get_mgmt_service_client
+from azure.cli.core.mock import DummyCli
+
+
+class SampleClient(SDKClient):
+
+    def __init__(self, credentials, subscription_id, base_url=None):
+        self.config = Configuration(base_url or 'https://management.azure.com')
+        self.credentials = credentials
+        self.subscription_id = subscription_id
+        super(SampleClient, self).__init__(credentials, self.config)
+
+
+class TestClientFactory(unittest.TestCase):
+
+    def setUp(self):
+        client_factory._mgmt_client_cache.clear()  # pylint: disable=protected-access
+
+    @mock.patch('azure.cli.core._profile.Profile.get_login_credentials', autospec=True)
+    def test_mgmt_client_reused_within_invocation(self, get_login_credentials_mock):
+        get_login_credentials_mock.return_value = (mock.MagicMock(), 'sub1', 'tenant1')
+        cli = DummyCli()
+        cli.refresh_request_id()
+
+        client, subscription_id = _get_mgmt_service_client(cli, SampleClient)
+        self.assertEqual(subscription_id, 'sub1')
+        self.assertIs(_get_mgmt_service_client(cli, SampleClient)[0], client)
+        self.assertEqual(get_login_credentials_mock.call_count, 1)
+        self.assertTrue(client.config.keep_alive)
+
+        # a different subscription gets its own client
+        self.assertIsNot(_get_mgmt_service_client(cli, SampleClient, subscription_id='sub2')[0], client)
+
+        # a new invocation gets a new client
+        cli.refresh_request_id()
+        self.assertIsNot(_get_mgmt_service_client(cli, SampleClient)[0], client)
+
+    @mock.patch('azure.cli.core._profile.Profile.get_login_credentials', autospec=True)
+    def test_mgmt_clients_share_connection_pool(self, get_login_credentials_mock):
+        import requests
+        get_login_credentials_mock.return_value = (mock.MagicMock(), 'sub1', 'tenant1')
+        cli = DummyCli()
+        cli.refresh_request_id()
+
+        clients = [_get_mgmt_service_client(cli, SampleClient, subscription_id=s)[0] for s in ['sub1', 'sub2']]
+        adapters = []
+        for client in clients:
+            session = requests.Session()
+            client.config.session_configuration_callback(session, client.config, {})
+            adapters.append(session.adapters['https://'])
+        self.assertIs(adapters[0], adapters[1])
+
+    def test_mgmt_client_not_cached_outside_invocation(self):
+        cli = DummyCli()
+        key = client_factory._get_mgmt_client_cache_key(cli, SampleClient, None)  # pylint: disable=protected-access
+        self.assertIsNone(key)
+
+
+if __name__ == '__main__':
+    unittest.main()
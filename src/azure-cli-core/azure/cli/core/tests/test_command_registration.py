@@ -220,6 +220,59 @@ class TestCommandRegistration(unittest.TestCase):
         self.assertTrue(isinstance(ext2.command_source, ExtensionCommandSource))
         self.assertTrue(ext2.command_source.overrides_command)
 
+    def test_command_index(self):
+        cli = DummyCli()
+        with mock.patch('importlib.import_module', TestCommandRegistration._mock_import_lib), \
+                mock.patch('pkgutil.iter_modules', TestCommandRegistration._mock_iter_modules), \
+                mock.patch('azure.cli.core.commands._load_command_loader',
+                           TestCommandRegistration._mock_load_command_loader), \
+                mock.patch('azure.cli.core.extension.get_extension_modname',
+                           TestCommandRegistration._mock_extension_modname), \
+                mock.patch('azure.cli.core.extension.get_extensions', TestCommandRegistration._mock_get_extensions):
+            self._verify_command_index(cli)
+
+    def _verify_command_index(self, cli):
+        import os
+        import tempfile
+        from azure.cli.core import CommandIndex
+        from azure.cli.core._session import INDEX
+
+        index_file = os.path.join(tempfile.mkdtemp(), 'commandIndex.json')
+        INDEX.load(index_file)
+        extensions = TestCommandRegistration._mock_get_extensions()
+        command_index = CommandIndex(cli)
+        self.assertIsNone(command_index.get(['hello', 'world'], [__name__], extensions))
+
+        # a full load builds the index
+        cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello', 'world'])
+        self.assertIn('hello world', cmd_tbl)
+        self.assertEqual(command_index.get(['hello', 'world'], [__name__], extensions),
+                         ([__name__], [e.name for e in extensions]))
+        self.assertEqual(command_index.get(['hello', '-h'], [__name__], extensions),
+                         ([__name__], [e.name for e in extensions]))
+        self.assertIsNone(command_index.get(['goodbye', 'world'], [__name__], extensions))
+        self.assertIsNone(command_index.get(['--help'], [__name__], extensions))
+        self.assertIsNone(command_index.get([], [__name__], extensions))
+
+        # a different set of installed modules or extensions makes the index unusable
+        self.assertIsNone(command_index.get(['hello', 'world'], ['other'], extensions))
+        self.assertIsNone(command_index.get(['hello', 'world'], [__name__], extensions[:1]))
+
+        # the loaded command table must serve the command or group, otherwise the index is outdated
+        self.assertTrue(command_index.matches(['hello', 'world', '--name', 'foo'], cmd_tbl))
+        self.assertTrue(command_index.matches(['hello', '-h'], cmd_tbl))
+        self.assertFalse(command_index.matches(['hello', 'planet'], cmd_tbl))
+
+        # a subsequent load served from the index returns the same commands
+        cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello', 'world'])
+        self.assertIn('hello world', cmd_tbl)
+        self.assertIn('hello noodle', cmd_tbl)
+
+        command_index.invalidate()
+        self.assertIsNone(command_index.get(['hello', 'world'], [__name__], extensions))
+        with open(index_file, 'r', encoding='utf-8-sig') as f:
+            self.assertEqual(f.read(), '{}')
+
     def test_argument_with_overrides(self):
 
         global_vm_name_type = CLIArgumentType(
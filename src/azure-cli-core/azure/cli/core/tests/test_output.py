@@ -41,6 +41,34 @@ class TestCoreCLIOutput(unittest.TestCase):
         yaml_output = output_producer.format_yaml(CommandResultItem(result=OrderedDict(account_dict)))
         self.assertEqual(account_dict, yaml.safe_load(yaml_output))
 
+    def test_paged_result_stream_output(self):
+        import json
+        from io import StringIO
+        from knack.output import format_json, format_tsv
+        from knack.util import CommandResultItem
+        from azure.cli.core._output import AzOutputProducer, PagedResultStream
+        from azure.cli.core.mock import DummyCli
+
+        pages = [[{'name': 'a', 'tags': {'x': 1}}, {'name': 'b', 'tags': None}], [], [{'name': u'c\u00e9'}]]
+        output_producer = AzOutputProducer(DummyCli())
+
+        for formatter in [format_json, format_tsv]:
+            expected = formatter(CommandResultItem(result=[item for page in pages for item in page]))
+            out_file = StringIO()
+            output_producer.out(CommandResultItem(result=PagedResultStream(pages, list)), formatter, out_file)
+            self.assertEqual(out_file.getvalue(), expected)
+
+        out_file = StringIO()
+        output_producer.out(CommandResultItem(result=PagedResultStream([[], []], list)), format_json, out_file)
+        self.assertEqual(out_file.getvalue(), format_json(CommandResultItem(result=[])))
+
+        from jmespath import compile as compile_jmespath
+        stream = PagedResultStream(pages, list)
+        stream.query = compile_jmespath('[?tags].name')
+        out_file = StringIO()
+        output_producer.out(CommandResultItem(result=stream), format_json, out_file)
+        self.assertEqual(json.loads(out_file.getvalue()), ['a'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1451,10 +1451,11 @@ class TestProfile(unittest.TestCase):
         # assert
         self.assertEqual(creds_cache.retrieve_secret_of_service_principal(test_sp['servicePrincipalId']), None)
 
+    @mock.patch('azure.cli.core._profile._replace_file', autospec=True)
     @mock.patch('azure.cli.core._profile._load_tokens_from_file', autospec=True)
     @mock.patch('os.fdopen', autospec=True)
     @mock.patch('os.open', autospec=True)
-    def test_credscache_add_new_sp_creds(self, _, mock_open_for_write, mock_read_file):
+    def test_credscache_add_new_sp_creds(self, _, mock_open_for_write, mock_read_file, _2):
         cli = DummyCli()
         test_sp = {
             "servicePrincipalId": "myapp",
@@ -1500,10 +1501,11 @@ class TestProfile(unittest.TestCase):
         self.assertEqual(creds_cache._service_principal_creds, [test_sp])
         self.assertFalse(mock_open_for_write.called)
 
+    @mock.patch('azure.cli.core._profile._replace_file', autospec=True)
     @mock.patch('azure.cli.core._profile._load_tokens_from_file', autospec=True)
     @mock.patch('os.fdopen', autospec=True)
     @mock.patch('os.open', autospec=True)
-    def test_credscache_add_preexisting_sp_new_secret(self, _, mock_open_for_write, mock_read_file):
+    def test_credscache_add_preexisting_sp_new_secret(self, _, mock_open_for_write, mock_read_file, _2):
         cli = DummyCli()
         test_sp = {
             "servicePrincipalId": "myapp",
@@ -1543,10 +1545,11 @@ class TestProfile(unittest.TestCase):
         # we know the matching did go through)
         self.assertRaises(ValueError, creds_cache.retrieve_token_for_service_principal, 'myapp', 'resource1', 'mytenant', False)
 
+    @mock.patch('azure.cli.core._profile._replace_file', autospec=True)
     @mock.patch('azure.cli.core._profile._load_tokens_from_file', autospec=True)
     @mock.patch('os.fdopen', autospec=True)
     @mock.patch('os.open', autospec=True)
-    def test_credscache_remove_creds(self, _, mock_open_for_write, mock_read_file):
+    def test_credscache_remove_creds(self, _, mock_open_for_write, mock_read_file, _2):
         cli = DummyCli()
         test_sp = {
             "servicePrincipalId": "myapp",
@@ -1573,11 +1576,12 @@ class TestProfile(unittest.TestCase):
         mock_open_for_write.assert_called_with(mock.ANY, 'w+')
         self.assertEqual(mock_open_for_write.call_count, 2)
 
+    @mock.patch('azure.cli.core._profile._replace_file', autospec=True)
     @mock.patch('azure.cli.core._profile._load_tokens_from_file', autospec=True)
     @mock.patch('os.fdopen', autospec=True)
     @mock.patch('os.open', autospec=True)
     @mock.patch('adal.AuthenticationContext', autospec=True)
-    def test_credscache_new_token_added_by_adal(self, mock_adal_auth_context, _, mock_open_for_write, mock_read_file):  # pylint: disable=line-too-long
+    def test_credscache_new_token_added_by_adal(self, mock_adal_auth_context, _, mock_open_for_write, mock_read_file, _2):  # pylint: disable=line-too-long
         cli = DummyCli()
         token_entry2 = {
             "accessToken": "new token",
@@ -1612,6 +1616,65 @@ class TestProfile(unittest.TestCase):
         self.assertEqual(token, 'new token')
         self.assertEqual(token_type, token_entry2['tokenType'])
 
+    def test_credscache_merges_concurrent_writes(self):
+        import shutil
+        import tempfile
+        cli = DummyCli()
+        token_dir = tempfile.mkdtemp()
+        token_file = os.path.join(token_dir, 'accessTokens.json')
+        with open(token_file, 'w') as f:
+            json.dump([self.token_entry1], f)
+        test_sp = {
+            "servicePrincipalId": "myapp",
+            "servicePrincipalTenant": "mytenant",
+            "accessToken": "Secret"
+        }
+        test_sp2 = {
+            "servicePrincipalId": "myapp2",
+            "servicePrincipalTenant": "mytenant2",
+            "accessToken": "Secret2"
+        }
+        try:
+            with mock.patch.dict(os.environ, {'AZURE_ACCESS_TOKEN_FILE': token_file}):
+                # two processes load the token file before either of them writes it
+                creds_cache1 = CredsCache(cli, async_persist=False)
+                creds_cache2 = CredsCache(cli, async_persist=False)
+                creds_cache1.load_adal_token_cache()
+                creds_cache2.load_adal_token_cache()
+
+                creds_cache1.save_service_principal_cred(test_sp)
+                creds_cache2.save_service_principal_cred(test_sp2)
+                with open(token_file) as f:
+                    persisted = json.load(f)
+                self.assertEqual(persisted, [self.token_entry1, test_sp, test_sp2])
+
+                # a logout in one process does not resurrect or drop entries of the other
+                creds_cache1.remove_cached_creds('myapp')
+                with open(token_file) as f:
+                    persisted = json.load(f)
+                self.assertEqual(persisted, [self.token_entry1, test_sp2])
+                self.assertFalse([f for f in os.listdir(token_dir) if f.endswith('.tmp')])
+        finally:
+            shutil.rmtree(token_dir, ignore_errors=True)
+
+    @mock.patch('azure.cli.core._profile._load_tokens_from_file', autospec=True)
+    def test_credscache_syncs_tokens_refreshed_by_other_process(self, mock_read_file):
+        cli = DummyCli()
+        mock_read_file.return_value = [self.token_entry1]
+        creds_cache = CredsCache(cli, async_persist=False)
+        creds_cache.load_adal_token_cache()
+
+        refreshed_entry = deepcopy(self.token_entry1)
+        refreshed_entry['accessToken'] = 'refreshed...secrets'
+        mock_read_file.return_value = [refreshed_entry]
+        with mock.patch('azure.cli.core._profile._get_file_stamp', return_value=(1, 1)):
+            creds_cache._sync_from_disk()
+
+        token_entries = creds_cache.adal_token_cache.find({'userId': self.user1.upper(),
+                                                           '_clientId': self.token_entry1['_clientId']})
+        self.assertEqual(token_entries, [refreshed_entry])
+        self.assertFalse(creds_cache.adal_token_cache.has_state_changed)
+
     @mock.patch('azure.cli.core._profile.get_file_json', autospec=True)
     def test_credscache_good_error_on_file_corruption(self, mock_read_file):
         mock_read_file.side_effect = ValueError('a bad error for you')
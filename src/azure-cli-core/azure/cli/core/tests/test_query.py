@@ -0,0 +1,114 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import shutil
+import tempfile
+import unittest
+from io import StringIO
+
+import mock
+from jmespath import compile as compile_jmespath
+
+from azure.cli.core import AzCommandsLoader
+from azure.cli.core.commands import AzCliCommand
+from azure.cli.core.mock import DummyCli
+import azure.cli.core._query as query_module
+from azure.cli.core._query import compile_query, get_query_fields
+
+
+class TestQuery(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.config_dir = self.config_dir
+        query_module._query_caches.clear()  # pylint: disable=protected-access
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+        query_module._query_caches.clear()  # pylint: disable=protected-access
+
+    def test_compile_query_cached(self):
+        data = [{'name': 'a', 'tags': {'env': 'test'}}, {'name': 'b', 'tags': None}]
+        queries = ["[?tags.env=='test'].{n:name}", "[0:1].name", "sort_by(@, &name)[].name"]
+        expected = [compile_jmespath(q).search(data) for q in queries]
+
+        self.assertEqual([compile_query(self.cli_ctx, q).search(data) for q in queries], expected)
+
+        # a new process loads the syntax trees instead of parsing the expressions
+        query_module._query_caches.clear()  # pylint: disable=protected-access
+        with mock.patch('jmespath.compile', side_effect=AssertionError):
+            self.assertEqual([compile_query(self.cli_ctx, q).search(data) for q in queries], expected)
+
+        with mock.patch.object(query_module, 'QUERY_CACHE_SIZE', 2):
+            compile_query(self.cli_ctx, 'name')
+        self.assertEqual(list(query_module._get_query_cache(self.cli_ctx)),  # pylint: disable=protected-access
+                         ["sort_by(@, &name)[].name", 'name'])
+
+        with self.assertRaises(ValueError):
+            compile_query(self.cli_ctx, '[?')
+
+    def test_get_query_fields(self):
+        cases = [
+            ('[].{name:name, env:tags.env, a:contains(id, `a`)}', {'name', 'tags', 'id'}),
+            ("[?location=='westus'].name", {'location', 'name'}),
+            ('[*].[name, properties.state]', {'name', 'properties'}),
+            ('{name:name, first:items[0].name}', {'name', 'items'}),
+            ('value[].name', {'value'}),
+            ('[]', None),
+            ('[0].name', None),
+            ('length(@)', None),
+            ('sort_by(@, &name)', None),
+        ]
+        for query, expected in cases:
+            self.assertEqual(get_query_fields(compile_jmespath(query)), expected, query)
+        self.assertIsNone(get_query_fields(None))
+
+    def test_query_prunes_result(self):
+        from msrest.serialization import Model
+
+        class SampleModel(Model):
+
+            def __init__(self, **kwargs):
+                super(SampleModel, self).__init__(**kwargs)
+                self.id = kwargs.get('id')
+                self.name = kwargs.get('name')
+                self.properties = kwargs.get('properties')
+
+        converted = []
+
+        class SampleProperties(object):
+            @property
+            def __dict__(self):
+                converted.append(self)
+                return {'state': 'Succeeded'}
+
+        def _handler(_):
+            return [SampleModel(id='/subscriptions/0/resourceGroups/rg{}/providers/p/t/n'.format(i),
+                                name='n{}'.format(i), properties=SampleProperties()) for i in range(2)]
+
+        class TestCommandsLoader(AzCommandsLoader):
+
+            def load_command_table(self, args):
+                super(TestCommandsLoader, self).load_command_table(args)
+                self.command_table = {'test': AzCliCommand(self, 'test', _handler)}
+                return self.command_table
+
+        cli = DummyCli(commands_loader_cls=TestCommandsLoader)
+        with mock.patch.object(cli.config, 'config_dir', self.config_dir):
+            out_file = StringIO()
+            cli.invoke(['test', '--query', '[].{name:name, group:resourceGroup}'], out_file=out_file)
+            self.assertEqual(json.loads(out_file.getvalue()),
+                             [{'name': 'n0', 'group': 'rg0'}, {'name': 'n1', 'group': 'rg1'}])
+            self.assertEqual(converted, [])
+
+            out_file = StringIO()
+            cli.invoke(['test', '--query', '[].properties.state'], out_file=out_file)
+            self.assertEqual(json.loads(out_file.getvalue()), ['Succeeded', 'Succeeded'])
+
+
+if __name__ == '__main__':
+    unittest.main()
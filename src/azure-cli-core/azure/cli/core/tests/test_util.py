@@ -14,7 +14,7 @@ import json
 from azure.cli.core.util import \
     (get_file_json, truncate_text, shell_safe_json_parse, b64_to_hex, hash_string, random_string,
      open_page_in_browser, can_launch_browser, handle_exception, ConfiguredDefaultSetter, send_raw_request,
-     should_disable_connection_verify)
+     should_disable_connection_verify, todict)
 
 
 class TestUtils(unittest.TestCase):
@@ -319,6 +319,50 @@ class TestHandleException(unittest.TestCase):
             self.assertEqual(config.use_local_config, False)
         self.assertTrue(config.use_local_config)
 
+    def test_todict(self):
+        import datetime
+        from enum import Enum
+        from knack.util import todict as knack_todict
+        from msrest.serialization import Model
+        from azure.cli.core.commands import AzCliCommandInvoker
+
+        class SampleEnum(Enum):
+            value_a = 'A'
+
+        class SampleModel(Model):
+            _attribute_map = {
+                'resource_name': {'key': 'resourceName', 'type': 'str'},
+                'additional_properties': {'key': '', 'type': '{object}'}
+            }
+
+            def __init__(self, **kwargs):
+                super(SampleModel, self).__init__(**kwargs)
+                self.resource_name = kwargs.get('resource_name')
+                self.additional_properties = kwargs.get('additional_properties')
+
+        Point = namedtuple('Point', 'x y')
+        child = SampleModel(resource_name='child', additional_properties={'extraProp': [1, 2]})
+        child.created_time = datetime.datetime(2020, 1, 2, 3, 4, 5)
+        child.duration = datetime.timedelta(minutes=5)
+        child._private = 'hidden'
+        child.callback = lambda: None
+        obj = {'models': [SampleModel(resource_name='parent', additional_properties={'child': child}), child],
+               'enum': SampleEnum.value_a, 'point': Point(1, [child]), 'tuple': (1, 2), 'none': None}
+
+        for post_processor in [None, AzCliCommandInvoker.remove_additional_prop_layer]:
+            expected = knack_todict(obj, post_processor)
+            result = todict(obj, post_processor)
+            self.assertEqual(result, expected)
+            self.assertEqual(json.dumps(result), json.dumps(expected))
+        self.assertEqual(result['models'][1], {'resourceName': 'child', 'extraProp': [1, 2],
+                                               'createdTime': '2020-01-02T03:04:05', 'duration': '0:05:00'})
+
+        # deeply nested results do not hit the recursion limit
+        nested = []
+        for _ in range(sys.getrecursionlimit() + 10):
+            nested = [nested]
+        self.assertIsInstance(todict(nested), list)
+
     @mock.patch('requests.request', autospec=True)
     def test_send_raw_requests(self, request_mock):
         from azure.cli.core.commands.client_factory import UA_AGENT
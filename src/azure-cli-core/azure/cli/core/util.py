@@ -364,6 +364,125 @@ def poller_classes():
     return (AzureOperationPoller, LROPoller)
 
 
+_TODICT_VALUE, _TODICT_DICT, _TODICT_LIST, _TODICT_ENUM, _TODICT_ISOFORMAT, _TODICT_STR, _TODICT_ASDICT, \
+    _TODICT_OBJECT = range(8)
+_todict_kinds = {}
+_todict_keys = {}
+
+
+def _get_todict_kind(obj):
+    from datetime import date, time, datetime, timedelta
+    from enum import Enum
+    obj_type = type(obj)
+    if issubclass(obj_type, dict):
+        kind = _TODICT_DICT
+    elif issubclass(obj_type, list):
+        kind = _TODICT_LIST
+    elif issubclass(obj_type, Enum):
+        kind = _TODICT_ENUM
+    elif issubclass(obj_type, (date, time, datetime)):
+        kind = _TODICT_ISOFORMAT
+    elif issubclass(obj_type, timedelta):
+        kind = _TODICT_STR
+    elif hasattr(obj, '_asdict'):
+        kind = _TODICT_ASDICT
+    elif hasattr(obj, '__dict__'):
+        kind = _TODICT_OBJECT
+    else:
+        kind = _TODICT_VALUE
+    _todict_kinds[obj_type] = kind
+    return kind
+
+
+def _get_todict_keys(obj_type):
+    """ Map of attribute names to output keys for a class, seeded from the _attribute_map of msrest models.
+    Private attributes map to None. """
+    from knack.util import to_camel_case
+    keys = {}
+    for name in getattr(obj_type, '_attribute_map', None) or {}:
+        keys[name] = None if name.startswith('_') else to_camel_case(name)
+    _todict_keys[obj_type] = keys
+    return keys
+
+
+def todict(obj, post_processor=None, fields=None):  # pylint: disable=too-many-branches,too-many-statements
+    """
+    Convert an object to a dictionary. Use 'post_processor(original_obj, dictionary)' to update the
+    dictionary in the process. If 'fields' is given, only those keys are converted for the object, or
+    for the items when the object is a list; e.g. the keys read by a --query.
+
+    Produces the same result as knack.util.todict, but converts without recursion and caches the kind of
+    each type and the output keys of each class, so large results of SDK models are converted quickly.
+    """
+    from knack.util import to_camel_case
+    kinds = _todict_kinds
+    root = [None]
+    top = root
+    # frames are (obj, parent, key) to convert obj into parent[key], or (obj, result, parent, key) to
+    # post-process a dictionary once all of its values are converted
+    stack = [(obj, root, 0)]
+    while stack:
+        frame = stack.pop()
+        if len(frame) == 4:
+            item, result, parent, key = frame
+            parent[key] = post_processor(item, result)
+            continue
+
+        item, parent, key = frame
+        kind = kinds.get(type(item))
+        if kind is None:
+            kind = _get_todict_kind(item)
+
+        if kind == _TODICT_LIST or kind == _TODICT_DICT or kind == _TODICT_OBJECT:
+            prune = fields is not None and (parent is root or parent is top)
+            if kind == _TODICT_LIST:
+                result = list(item)
+                values = enumerate(item)
+                if parent is root:
+                    top = result
+            elif kind == _TODICT_DICT:
+                result = {}
+                values = [(k, v) for k, v in item.items() if k in fields] if prune else item.items()
+            else:
+                keys = _todict_keys.get(type(item))
+                if keys is None:
+                    keys = _get_todict_keys(type(item))
+                result = {}
+                values = []
+                for name, value in item.__dict__.items():
+                    output_key = keys.get(name, False)
+                    if output_key is False:
+                        output_key = keys[name] = None if name.startswith('_') else to_camel_case(name)
+                    if output_key is not None and not callable(value) and (not prune or output_key in fields):
+                        values.append((output_key, value))
+
+            if post_processor and kind != _TODICT_LIST:
+                stack.append((item, result, parent, key))
+            else:
+                parent[key] = result
+            pending = []
+            for k, value in values:
+                value_kind = kinds.get(type(value))
+                if value_kind == _TODICT_VALUE:
+                    result[k] = value
+                else:
+                    # keep the position of the key, the value is filled in once converted
+                    result[k] = None
+                    pending.append((value, result, k))
+            stack.extend(reversed(pending))
+        elif kind == _TODICT_VALUE:
+            parent[key] = item
+        elif kind == _TODICT_ENUM:
+            parent[key] = item.value
+        elif kind == _TODICT_ISOFORMAT:
+            parent[key] = item.isoformat()
+        elif kind == _TODICT_STR:
+            parent[key] = str(item)
+        else:
+            stack.append((item._asdict(), parent, key))  # pylint: disable=protected-access
+    return root[0]
+
+
 def augment_no_wait_handler_args(no_wait_enabled, handler, handler_args):
     """ Populates handler_args with the appropriate args for no wait """
     h_args = get_arg_list(handler)
@@ -6,7 +6,11 @@
 import tarfile
 import os
 import re
+import stat
+import time
+import zlib
 import codecs
+import hashlib
 from io import open
 import requests
 from knack.log import get_logger
@@ -18,6 +22,12 @@ from ._constants import TASK_VALID_VSTS_URLS
 
 logger = get_logger(__name__)
 
+SOURCE_CACHE_DIR = 'acrSourceCache'
+# uploaded contexts are only kept by the registry for a limited time, so don't reuse them for too long
+SOURCE_CACHE_TTL = 30 * 60
+GZIP_CHUNK_SIZE = 4 * 1024 * 1024
+GZIP_COMPRESS_LEVEL = 6
+
 
 def upload_source_code(client,
                        registry_name,
@@ -26,10 +36,20 @@ def upload_source_code(client,
                        tar_file_path,
                        docker_file_path,
                        docker_file_in_tar):
+    source_files = _collect_source_files(source_location)
+    cache_key = _get_source_cache_key(client, registry_name, resource_group_name, source_files,
+                                      docker_file_path, docker_file_in_tar)
+    relative_path = _get_cached_source(cache_key)
+    if relative_path:
+        logger.warning("Source code is unchanged since the last upload. Sending the uploaded context to registry: "
+                       "%s...", registry_name)
+        return relative_path
+
     _pack_source_code(source_location,
                       tar_file_path,
                       docker_file_path,
-                      docker_file_in_tar)
+                      docker_file_in_tar,
+                      source_files=source_files)
 
     size = os.path.getsize(tar_file_path)
     unit = 'GiB'
@@ -60,21 +80,109 @@ def upload_source_code(client,
                          container_name=container_name,
                          blob_name=blob_name,
                          file_path=tar_file_path)
+    _set_cached_source(cache_key, relative_path)
     logger.warning("Sending context ({0:.3f} {1}) to registry: {2}...".format(
         size, unit, registry_name))
     return relative_path
 
 
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+def _get_source_cache():
+    from knack.util import ensure_dir
+    from azure.cli.core._environment import get_config_dir
+    from azure.cli.core._session import Session
+    cache_dir = os.path.join(get_config_dir(), SOURCE_CACHE_DIR)
+    ensure_dir(cache_dir)
+    session = Session()
+    session.load(os.path.join(cache_dir, 'uploads.json'))
+    return session
+
+
+def _get_source_cache_key(client, registry_name, resource_group_name, source_files,
+                          docker_file_path, docker_file_in_tar):
+    """Fingerprint the build context by the metadata of the files to pack, so that an unchanged context can be
+    detected without reading or compressing the files.
+    """
+    fingerprint = hashlib.sha256()
+    subscription_id = getattr(getattr(client, 'config', None), 'subscription_id', None)
+    for value in [subscription_id, resource_group_name, registry_name, docker_file_in_tar]:
+        fingerprint.update(u'{}\0'.format(value).encode('utf-8'))
+    entries = [(arcname, name) for name, arcname in source_files]
+    if docker_file_path:
+        entries.append((docker_file_in_tar, docker_file_path))
+    for arcname, name in entries:
+        try:
+            st = os.lstat(name)
+        except OSError:
+            return None
+        link = os.readlink(name) if stat.S_ISLNK(st.st_mode) else ''
+        fingerprint.update(u'{}\0{}\0{}\0{!r}\0{}\0'.format(
+            arcname, st.st_mode, st.st_size, st.st_mtime, link).encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
+def _get_cached_source(cache_key):
+    if not cache_key:
+        return None
+    try:
+        entry = _get_source_cache().get(cache_key)
+    except (OSError, IOError) as e:
+        logger.debug("Failed to load the source upload cache: %s", e)
+        return None
+    if entry and entry.get('time', 0) + SOURCE_CACHE_TTL > time.time():
+        return entry.get('relativePath')
+    return None
+
+
+def _set_cached_source(cache_key, relative_path):
+    if not cache_key or not relative_path:
+        return
+    try:
+        cache = _get_source_cache()
+        now = time.time()
+        cache.data = {k: v for k, v in cache.data.items() if v.get('time', 0) + SOURCE_CACHE_TTL > now}
+        cache.data[cache_key] = {'relativePath': relative_path, 'time': now}
+        cache.save_with_retry()
+    except (OSError, IOError) as e:
+        logger.debug("Failed to save the source upload cache: %s", e)
+
+
+def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar, source_files=None):
     logger.warning("Packing source code into tar to upload...")
 
+    if source_files is None:
+        source_files = _collect_source_files(source_location)
+
+    with _ParallelGzipFile(tar_file_path) as gzip_file:
+        with tarfile.open(fileobj=gzip_file, mode="w|") as tar:
+            for name, arcname in source_files:
+                tarinfo = tar.gettarinfo(name, arcname)
+                if tarinfo is None:
+                    raise CLIError("tarfile: unsupported type {}".format(name))
+                # append the tar header and data to the archive
+                if tarinfo.isreg():
+                    with open(name, "rb") as f:
+                        tar.addfile(tarinfo, f)
+                else:
+                    tar.addfile(tarinfo)
+
+            # Add the Dockerfile if it's specified.
+            # In the case of run, there will be no Dockerfile.
+            if docker_file_path:
+                docker_file_tarinfo = tar.gettarinfo(
+                    docker_file_path, docker_file_in_tar)
+                with open(docker_file_path, "rb") as f:
+                    tar.addfile(docker_file_tarinfo, f)
+
+
+def _collect_source_files(source_location):
+    """Get the (path, arcname) of the files and directories to pack, applying the .dockerignore rules. """
     ignore_list, ignore_list_size = _load_dockerignore_file(source_location)
     common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.warning("Excluding '%s' based on default ignore rules", tarinfo.name)
+        if name in common_vcs_ignore_list:
+            logger.warning("Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
         if ignore_list is None:
@@ -87,32 +195,28 @@ def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_f
             # at this point, current item should just inherit from parent
             if index >= parent_matching_rule_index:
                 break
-            if re.match(item.pattern, tarinfo.name):
+            if item.regex.match(name):
                 logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
+                             item.rule, name)
                 return item.ignore, index
 
         logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+                     name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
+    def _may_include_children(name, matching_rule_index):
+        # only an exception rule with a higher priority than the one ignoring the directory can include its children
+        prefix = name + '/'
+        return any(not item.ignore and (item.prefix.startswith(prefix) or prefix.startswith(item.prefix))
+                   for item in (ignore_list or [])[:matching_rule_index])
 
-        # Add the Dockerfile if it's specified.
-        # In the case of run, there will be no Dockerfile.
-        if docker_file_path:
-            docker_file_tarinfo = tar.gettarinfo(
-                docker_file_path, docker_file_in_tar)
-            with open(docker_file_path, "rb") as f:
-                tar.addfile(docker_file_tarinfo, f)
+    source_files = []
+    # need to set arcname to empty string as the archive root path
+    _collect_source_files_recursively(source_files, source_location, "", parent_ignored=False,
+                                      parent_matching_rule_index=ignore_list_size,
+                                      ignore_check=_ignore_check, may_include_children=_may_include_children)
+    return source_files
 
 
 class IgnoreRule(object):  # pylint: disable=too-few-public-methods
@@ -141,6 +245,9 @@ class IgnoreRule(object):  # pylint: disable=too-few-public-methods
                 if index < token_length:
                     self.pattern += "/"  # add back / if it's not the last
         self.pattern += "$"
+        self.regex = re.compile(self.pattern)
+        # the literal leading part of the paths the rule can match, used to skip the ignored directories
+        self.prefix = re.split(r'[*?\[\]\\^$+(){}|]', rule, maxsplit=1)[0]
 
 
 def _load_dockerignore_file(source_location):
@@ -169,31 +276,77 @@ def _load_dockerignore_file(source_location):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
-
-    if tarinfo is None:
-        raise CLIError("tarfile: unsupported type {}".format(name))
+def _collect_source_files_recursively(source_files, name, arcname, parent_ignored, parent_matching_rule_index,
+                                      ignore_check, may_include_children):
+    # match the rules against the name as it is stored in the archive
+    arcname = arcname.replace(os.sep, '/')
+    is_dir = stat.S_ISDIR(os.lstat(name).st_mode)
 
     # check if the file/dir is ignored
     ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        arcname, parent_ignored, parent_matching_rule_index)
 
     if not ignored:
-        # append the tar header and data to the archive
-        if tarinfo.isreg():
-            with open(name, "rb") as f:
-                tar.addfile(tarinfo, f)
-        else:
-            tar.addfile(tarinfo)
-
-    # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+        source_files.append((name, arcname))
+
+    # even the dir is ignored, its child items can still be included, so continue to scan unless no rule can do so
+    if is_dir and (not ignored or may_include_children(arcname, matching_rule_index)):
+        for f in sorted(os.listdir(name)):
+            _collect_source_files_recursively(source_files, os.path.join(name, f), os.path.join(arcname, f),
+                                              parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                                              ignore_check=ignore_check, may_include_children=may_include_children)
+
+
+class _ParallelGzipFile(object):
+    """A writable file which compresses the written data into a gzip file, compressing the chunks of data
+    concurrently as separate gzip members. Concatenated gzip members are decompressed as a single stream.
+    """
+
+    def __init__(self, file_path, chunk_size=GZIP_CHUNK_SIZE, compress_level=GZIP_COMPRESS_LEVEL):
+        from concurrent.futures import ThreadPoolExecutor
+        self._max_workers = max((os.cpu_count() if hasattr(os, 'cpu_count') else None) or 1, 1)
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+        self._file = open(file_path, "wb")
+        self._chunk_size = chunk_size
+        self._compress_level = compress_level
+        self._buffer = []
+        self._buffer_size = 0
+        self._pending = []
+
+    def _compress(self, data):
+        # zlib releases the GIL while compressing, so the chunks are compressed in parallel
+        compressor = zlib.compressobj(self._compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def _submit(self):
+        if self._buffer_size:
+            self._pending.append(self._executor.submit(self._compress, b''.join(self._buffer)))
+            self._buffer, self._buffer_size = [], 0
+        # keep the memory bounded and write the compressed chunks in order
+        while len(self._pending) > 2 * self._max_workers:
+            self._file.write(self._pending.pop(0).result())
+
+    def write(self, data):
+        self._buffer.append(bytes(data))
+        self._buffer_size += len(data)
+        if self._buffer_size >= self._chunk_size:
+            self._submit()
+
+    def close(self):
+        try:
+            self._submit()
+            for future in self._pending:
+                self._file.write(future.result())
+        finally:
+            self._pending = []
+            self._executor.shutdown()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 def check_remote_source_code(source_location):
@@ -10,6 +10,7 @@ except ImportError:
     from urlparse import urlparse, urlunparse
 
 import time
+import threading
 from json import loads
 from enum import Enum
 from base64 import b64encode
@@ -40,6 +41,10 @@ ALLOWED_HTTP_METHOD = ['get', 'patch', 'put', 'delete']
 AAD_TOKEN_BASE_ERROR_MESSAGE = "Unable to get AAD authorization tokens with message"
 ADMIN_USER_BASE_ERROR_MESSAGE = "Unable to get admin user credentials with message"
 ALLOWS_BASIC_AUTH = "allows_basic_auth"
+REGISTRY_MAX_CONCURRENCY = 16
+
+_registry_session = None
+_registry_session_lock = threading.Lock()
 
 
 class RepoAccessTokenPermission(Enum):
@@ -58,6 +63,21 @@ class HelmAccessTokenPermission(Enum):
     DELETE_PULL = 'delete,pull'
 
 
+def get_registry_session():
+    """Get the HTTP session shared by the registry requests, so that connections to a login server are kept
+    alive and reused across requests and threads.
+    """
+    global _registry_session  # pylint: disable=global-statement
+    with _registry_session_lock:
+        if _registry_session is None:
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=REGISTRY_MAX_CONCURRENCY, pool_maxsize=REGISTRY_MAX_CONCURRENCY)
+            session.mount('https://', adapter)
+            _registry_session = session
+    return _registry_session
+
+
 def _handle_challenge_phase(login_server,
                             repository,
                             artifact_repository,
@@ -82,7 +102,8 @@ def _handle_challenge_phase(login_server,
 
     login_server = login_server.rstrip('/')
 
-    challenge = requests.get('https://' + login_server + '/v2/', verify=(not should_disable_connection_verify()))
+    challenge = get_registry_session().get('https://' + login_server + '/v2/',
+                                           verify=(not should_disable_connection_verify()))
     if challenge.status_code != 401 or 'WWW-Authenticate' not in challenge.headers:
         from ._errors import CONNECTIVITY_CHALLENGE_ERROR
         if is_diagnostics_context:
@@ -136,8 +157,8 @@ def _get_aad_token_after_challenge(cli_ctx,
         'access_token': creds[1]
     }
 
-    response = requests.post(authhost, urlencode(content), headers=headers,
-                             verify=(not should_disable_connection_verify()))
+    response = get_registry_session().post(authhost, urlencode(content), headers=headers,
+                                           verify=(not should_disable_connection_verify()))
 
     if response.status_code not in [200]:
         from ._errors import CONNECTIVITY_REFRESH_TOKEN_ERROR
@@ -166,8 +187,8 @@ def _get_aad_token_after_challenge(cli_ctx,
         'scope': scope,
         'refresh_token': refresh_token
     }
-    response = requests.post(authhost, urlencode(content), headers=headers,
-                             verify=(not should_disable_connection_verify()))
+    response = get_registry_session().post(authhost, urlencode(content), headers=headers,
+                                           verify=(not should_disable_connection_verify()))
 
     if response.status_code not in [200]:
         from ._errors import CONNECTIVITY_ACCESS_TOKEN_ERROR
@@ -265,8 +286,8 @@ def _get_token_with_username_and_password(login_server,
         'scope': scope
     }
 
-    response = requests.post(authhost, urlencode(content), headers=headers,
-                             verify=(not should_disable_connection_verify()))
+    response = get_registry_session().post(authhost, urlencode(content), headers=headers,
+                                           verify=(not should_disable_connection_verify()))
 
     if response.status_code != 200:
         from ._errors import CONNECTIVITY_ACCESS_TOKEN_ERROR
@@ -328,7 +349,7 @@ def _get_credentials(cmd,  # pylint: disable=too-many-statements
     # Validate the login server is reachable
     url = 'https://' + login_server + '/v2/'
     try:
-        challenge = requests.get(url, verify=(not should_disable_connection_verify()))
+        challenge = get_registry_session().get(url, verify=(not should_disable_connection_verify()))
         if challenge.status_code == 403:
             raise CLIError("Looks like you don't have access to registry '{}'. "
                            "To see configured firewall rules, run 'az acr show --query networkRuleSet --name {}'. "
@@ -443,6 +464,62 @@ def get_access_credentials(cmd,
                             permission=permission)
 
 
+def get_repository_access_credentials(cmd,
+                                      registry_name,
+                                      permission,
+                                      tenant_suffix=None,
+                                      username=None,
+                                      password=None):
+    """Try to get credentials to access the catalog and any repository of a registry. The AAD or username and
+    password credentials are exchanged only once and the access token of each scope is reused.
+    :param str registry_name: The name of container registry
+    :param str permission: The requested permission on the repositories
+    :param str username: The username used to log into the container registry
+    :param str password: The password used to log into the container registry
+    :return: The login server, and a function returning the username and password to access a repository, or the
+        catalog if no repository is given
+    """
+    login_server, username, password = get_login_credentials(cmd, registry_name, tenant_suffix, username, password)
+
+    is_aad_token = username == EMPTY_GUID
+    token_params = _handle_challenge_phase(login_server, None, None, None, is_aad_token)
+    if ALLOWS_BASIC_AUTH in token_params:
+        return login_server, lambda repository=None: (username, password)
+
+    authurl = urlparse(token_params['realm'])
+    authhost = urlunparse((authurl[0], authurl[1], '/oauth2/token', '', '', ''))
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    if is_aad_token:
+        content = {
+            'grant_type': 'refresh_token',
+            'service': login_server,
+            'refresh_token': password
+        }
+    else:
+        content = {
+            'grant_type': 'password',
+            'service': token_params['service'],
+            'username': username,
+            'password': password
+        }
+    access_tokens = {}
+
+    def _get_repository_credentials(repository=None):
+        # catalog only has * as permission, even for a read operation
+        scope = 'repository:{}:{}'.format(repository, permission) if repository else 'registry:catalog:*'
+        if scope not in access_tokens:
+            response = get_registry_session().post(authhost, urlencode(dict(content, scope=scope)), headers=headers,
+                                                   verify=(not should_disable_connection_verify()))
+            if response.status_code != 200:
+                from ._errors import CONNECTIVITY_ACCESS_TOKEN_ERROR
+                raise CLIError(CONNECTIVITY_ACCESS_TOKEN_ERROR.format_error_message(login_server, response.status_code)
+                               .get_error_message())
+            access_tokens[scope] = loads(response.content.decode("utf-8"))["access_token"]
+        return EMPTY_GUID, access_tokens[scope]
+
+    return login_server, _get_repository_credentials
+
+
 def log_registry_response(response):
     """Log the HTTP request and response of a registry API call.
     :param Response response: The response object
@@ -511,10 +588,11 @@ def request_data_from_registry(http_method,
 
     for i in range(0, retry_times):
         errorMessage = None
+        retry_after = None
         try:
             if file_payload:
                 with open(file_payload, 'rb') as data_payload:
-                    response = requests.request(
+                    response = get_registry_session().request(
                         method=http_method,
                         url=url,
                         headers=headers,
@@ -523,7 +601,7 @@ def request_data_from_registry(http_method,
                         verify=(not should_disable_connection_verify())
                     )
             else:
-                response = requests.request(
+                response = get_registry_session().request(
                     method=http_method,
                     url=url,
                     headers=headers,
@@ -563,17 +641,27 @@ def request_data_from_registry(http_method,
                 raise RegistryException(
                     parse_error_message('Failed to request data due to a conflict.', response),
                     response.status_code)
+            retry_after = _get_retry_after(response)
             raise Exception(parse_error_message('Could not {} the requested data.'.format(http_method), response))
         except CLIError:
             raise
         except Exception as e:  # pylint: disable=broad-except
             errorMessage = str(e)
-            logger.debug('Retrying %s with exception %s', i + 1, errorMessage)
-            time.sleep(retry_interval)
+            if i + 1 < retry_times:
+                logger.debug('Retrying %s with exception %s', i + 1, errorMessage)
+                # back off exponentially up to retry_interval, unless a throttled registry says how long to wait
+                time.sleep(retry_after if retry_after is not None else min(2 ** i, retry_interval))
 
     raise CLIError(errorMessage)
 
 
+def _get_retry_after(response):
+    try:
+        return max(float(response.headers['Retry-After']), 0)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
 def parse_error_message(error_message, response):
     import json
     try:
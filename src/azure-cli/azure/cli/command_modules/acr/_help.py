@@ -405,6 +405,17 @@ examples:
     text: az acr repository list -n MyRegistry
 """
 
+helps['acr repository purge'] = """
+type: command
+short-summary: Delete the manifests matching filters from the repositories in an Azure Container Registry.
+long-summary: The manifests of all matching repositories are listed and deleted concurrently. Deleting a manifest also deletes all the tags referencing it.
+examples:
+  - name: Show the manifests tagged 'dev-*' older than 30 days in the 'hello-world' repository, without deleting them.
+    text: az acr repository purge -n MyRegistry --filter "hello-world:dev-.*" --ago 30d --dry-run
+  - name: Delete the manifests of every repository older than 7 days, keeping the latest 5 tagged manifests of each repository and deleting the untagged ones.
+    text: az acr repository purge -n MyRegistry --filter ".*" --ago 7d --keep 5 --untagged --yes
+"""
+
 helps['acr repository show'] = """
 type: command
 short-summary: Get the attributes of a repository or image in an Azure Container Registry.
@@ -427,6 +438,8 @@ examples:
     text: az acr repository show-manifests -n MyRegistry --repository MyRepository --top 10 --orderby time_desc
   - name: Show the detailed information of the latest 10 manifests ordered by timestamp of a repository in an Azure Container Registry.
     text: az acr repository show-manifests -n MyRegistry --repository MyRepository --top 10 --orderby time_desc --detail
+  - name: Show the latest 10 manifests ordered by timestamp of every repository in an Azure Container Registry.
+    text: az acr repository show-manifests -n MyRegistry --all-repositories --top 10 --orderby time_desc
 """
 
 helps['acr repository show-tags'] = """
@@ -439,6 +452,8 @@ examples:
     text: az acr repository show-tags -n MyRegistry --repository MyRepository --detail
   - name: Show the detailed information of the latest 10 tags ordered by timestamp of a repository in an Azure Container Registry.
     text: az acr repository show-tags -n MyRegistry --repository MyRepository --top 10 --orderby time_desc --detail
+  - name: Show tags of every repository in an Azure Container Registry.
+    text: az acr repository show-tags -n MyRegistry --all-repositories
 """
 
 helps['acr repository untag'] = """
@@ -777,6 +792,9 @@ examples:
   - name: Show logs for the last created run in the registry that built the image 'hello-world'.
     text: >
         az acr task logs -r MyRegistry --image hello-world
+  - name: Show logs for a particular run as JSON lines with the time each line was received.
+    text: >
+        az acr task logs -r MyRegistry --run-id runId --json-lines
 """
 
 helps['acr task run'] = """
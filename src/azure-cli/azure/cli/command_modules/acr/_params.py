@@ -30,7 +30,10 @@ from ._validators import (
     validate_secret_arg,
     validate_set,
     validate_set_secret,
-    validate_retention_days
+    validate_retention_days,
+    validate_purge_filters,
+    validate_purge_ago,
+    validate_purge_keep
 )
 from .scope_map import ScopeMapActions
 
@@ -105,6 +108,17 @@ def load_arguments(self, _):  # pylint: disable=too-many-statements
         c.argument('read_enabled', help='Indicates whether read operation is allowed.', arg_type=get_three_state_flag())
         c.argument('write_enabled', help='Indicates whether write or delete operation is allowed.', arg_type=get_three_state_flag())
 
+    for scope in ['acr repository show-tags', 'acr repository show-manifests']:
+        with self.argument_context(scope) as c:
+            c.argument('all_repositories', help='Show the results of every repository in the registry, fetched concurrently. Cannot be used with --repository.', action='store_true')
+
+    with self.argument_context('acr repository purge') as c:
+        c.argument('filters', options_list=['--filter'], action='append', required=True, validator=validate_purge_filters, help="The repositories and tags to purge in the format 'REPOSITORY_REGEX[:TAG_REGEX]'. A tagged manifest is purged only if all of its tags match. Multiple filters supported by passing --filter multiple times.")
+        c.argument('ago', validator=validate_purge_ago, help="Purge only the manifests last updated before this duration ago, in the format '[Nd][Nh][Nm]', e.g. '30d' or '1d12h'.")
+        c.argument('keep', type=int, validator=validate_purge_keep, help='The number of latest matching tagged manifests to keep in each repository.')
+        c.argument('untagged', action='store_true', help='Also purge the manifests without any tags in the matching repositories.')
+        c.argument('dry_run', action='store_true', help='Report the manifests that would be purged without deleting them.')
+
     with self.argument_context('acr repository untag') as c:
         c.argument('image', options_list=['--image', '-t'], help="The name of the image. May include a tag in the format 'name:tag'.")
 
@@ -221,6 +235,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-statements
         c.argument('run_status', help='The current status of run.', arg_type=get_enum_type(RunStatus))
         c.argument('top', help='Limit the number of latest runs in the results.')
 
+    with self.argument_context('acr task logs') as c:
+        c.argument('json_lines', help='Show each log line as a JSON object with the UTC time it was received.', action='store_true')
+
     with self.argument_context('acr task update-run') as c:
         c.argument('no_archive', help='Indicates whether the run should be archived.', arg_type=get_three_state_flag())
 
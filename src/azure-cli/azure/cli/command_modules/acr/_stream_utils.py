@@ -2,8 +2,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
-from io import BytesIO
+import json
 import time
+from datetime import datetime
 from random import uniform
 import colorama
 from knack.util import CLIError
@@ -15,7 +16,7 @@ from ._azure_utils import get_blob_info
 
 logger = get_logger(__name__)
 
-DEFAULT_CHUNK_SIZE = 1024 * 4
+DEFAULT_CHUNK_SIZE = 1024 * 1024
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -24,7 +25,8 @@ def stream_logs(client,
                 registry_name,
                 resource_group_name,
                 no_format=False,
-                raise_error_on_failure=False):
+                raise_error_on_failure=False,
+                json_lines=False):
     log_file_sas = None
     error_msg = "Could not get logs for ID: {}".format(run_id)
 
@@ -53,7 +55,8 @@ def stream_logs(client,
                      endpoint_suffix=endpoint_suffix),
                  container_name,
                  blob_name,
-                 raise_error_on_failure)
+                 raise_error_on_failure,
+                 json_lines)
 
 
 def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-statements, too-many-branches
@@ -62,20 +65,19 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
                  blob_service,
                  container_name,
                  blob_name,
-                 raise_error_on_failure):
+                 raise_error_on_failure,
+                 json_lines=False):
 
-    if not no_format:
+    if not no_format and not json_lines:
         colorama.init()
 
-    stream = BytesIO()
+    lines = _LogLineBuffer(json_lines)
     metadata = {}
     start = 0
-    end = byte_size - 1
     available = 0
-    sleep_time = 1
+    min_sleep_time = 0.5
+    sleep_time = min_sleep_time
     max_sleep_time = 15
-    num_fails = 0
-    num_fails_for_backoff = 3
     consecutive_sleep_in_sec = 0
 
     # Try to get the initial properties so there's no waiting.
@@ -88,96 +90,68 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     except (AttributeError, AzureHttpError):
         pass
 
-    while (_blob_is_not_complete(metadata) or start < available):
-        while start < available:
-            # Success! Reset our polling backoff.
-            sleep_time = 1
-            num_fails = 0
-            consecutive_sleep_in_sec = 0
+    try:
+        while (_blob_is_not_complete(metadata) or start < available):
+            while start < available:
+                # Success! Poll again quickly while the log is growing.
+                sleep_time = min_sleep_time
+                consecutive_sleep_in_sec = 0
+
+                try:
+                    # Only request the bytes that are known to be available.
+                    chunk = blob_service.get_blob_to_bytes(
+                        container_name=container_name,
+                        blob_name=blob_name,
+                        start_range=start,
+                        end_range=min(start + byte_size, available) - 1).content or b''
+                    if not chunk:
+                        break
+                    start += len(chunk)
+                    lines.write(chunk)
+                except AzureHttpError as ae:
+                    if ae.status_code != 404:
+                        raise CLIError(ae)
+                    break
 
             try:
-                old_byte_size = len(stream.getvalue())
-                blob_service.get_blob_to_stream(
-                    container_name=container_name,
-                    blob_name=blob_name,
-                    start_range=start,
-                    end_range=end,
-                    stream=stream)
-
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't print \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        print(flush.decode('utf-8', errors='ignore'))
-                        break
+                props = blob_service.get_blob_properties(
+                    container_name=container_name, blob_name=blob_name)
+                metadata = props.metadata
+                available = props.properties.content_length
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
-            except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    print(curr_bytes.decode('utf-8', errors='ignore'))
+            except CLIError:
+                raise
+            except Exception as err:
+                raise CLIError(err)
+
+            if consecutive_sleep_in_sec > timeout_in_seconds:
+                # Flush anything remaining in the buffer - this would be the case
+                # if the file has expired and we weren't able to detect any \r\n
+                lines.flush()
+
+                logger.warning("Failed to find any new logs in %d seconds. "
+                               "Client will stop polling for additional logs.", consecutive_sleep_in_sec)
                 return
 
-        try:
-            props = blob_service.get_blob_properties(
-                container_name=container_name, blob_name=blob_name)
-            metadata = props.metadata
-            available = props.properties.content_length
-        except AzureHttpError as ae:
-            if ae.status_code != 404:
-                raise CLIError(ae)
-        except KeyboardInterrupt:
-            if curr_bytes:
-                print(curr_bytes.decode('utf-8', errors='ignore'))
-            return
-        except Exception as err:
-            raise CLIError(err)
-
-        if consecutive_sleep_in_sec > timeout_in_seconds:
-            # Flush anything remaining in the buffer - this would be the case
-            # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                print(curr_bytes.decode('utf-8', errors='ignore'))
-
-            logger.warning("Failed to find any new logs in %d seconds. Client will stop polling for additional logs.",
-                           consecutive_sleep_in_sec)
-            return
-
-        # If no new data available but not complete, sleep before trying to process additional data.
-        if (_blob_is_not_complete(metadata) and start >= available):
-            num_fails += 1
-
-            logger.debug(
-                "Failed to find new content %d times in a row", num_fails)
-            if num_fails >= num_fails_for_backoff:
-                num_fails = 0
+            # If the log didn't grow and is not complete, back off before polling it again.
+            if (_blob_is_not_complete(metadata) and start >= available):
+                rnd = uniform(0, sleep_time / 2)
+                total_sleep_time = sleep_time + rnd
+                consecutive_sleep_in_sec += total_sleep_time
+                logger.debug("Base sleep time: %.1f, random delay: %.1f, total: %.1f, consecutive: %.1f",
+                             sleep_time, rnd, total_sleep_time, consecutive_sleep_in_sec)
+                time.sleep(total_sleep_time)
                 sleep_time = min(sleep_time * 2, max_sleep_time)
-                logger.debug("Resetting failure count to %d", num_fails)
-
-            rnd = uniform(1, 2)  # 1.0 <= x < 2.0
-            total_sleep_time = sleep_time + rnd
-            consecutive_sleep_in_sec += total_sleep_time
-            logger.debug("Base sleep time: %d, random delay: %d, total: %d, consecutive: %d",
-                         sleep_time, rnd, total_sleep_time, consecutive_sleep_in_sec)
-            time.sleep(total_sleep_time)
+    except KeyboardInterrupt:
+        lines.flush()
+        return
 
     # One final check to see if there's anything in the buffer to flush
     # E.g., metadata has been set and start == available, but the log file
     # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-    if curr_bytes:
-        print(curr_bytes.decode('utf-8', errors='ignore'))
+    lines.flush()
 
     build_status = _get_run_status(metadata).lower()
     logger.debug("status was: '%s'", build_status)
@@ -207,3 +181,40 @@ def _get_run_status(metadata):
         if key.lower() == 'complete':
             return metadata[key]
     return 'inprogress'
+
+
+class _LogLineBuffer(object):
+    """Prints the complete lines of the log as the chunks arrive. The bytes after the last \r\n are kept in a
+    list of chunks, so that each byte is only scanned and copied once.
+    """
+
+    def __init__(self, json_lines=False):
+        self.json_lines = json_lines
+        self.pending = []
+
+    def write(self, chunk):
+        # the \r of the last \r\n may be at the end of the previous chunk
+        tail = self.pending[-1][-1:] if self.pending else b''
+        index = (tail + chunk).rfind(b'\r\n')
+        if index < 0:
+            self.pending.append(chunk)
+            return
+        newline = index + 1 - len(tail)
+        text = b''.join(self.pending) + chunk[:newline]  # won't print \n
+        self.pending = [chunk[newline + 1:]] if newline + 1 < len(chunk) else []
+        self._print(text)
+
+    def flush(self):
+        if self.pending:
+            text = b''.join(self.pending)
+            self.pending = []
+            self._print(text)
+
+    def _print(self, text):
+        text = text.decode('utf-8', errors='ignore')
+        if not self.json_lines:
+            print(text)
+            return
+        timestamp = datetime.utcnow().isoformat() + 'Z'
+        for line in text.split('\n'):
+            print(json.dumps({'time': timestamp, 'line': line.rstrip('\r')}))
@@ -85,3 +85,33 @@ def validate_retention_days(namespace):
     days = namespace.days
     if days and (days < 0 or days > 365):
         raise CLIError("Invalid value for days: should be from 0 to 365")
+
+
+def validate_purge_filters(namespace):
+    """Compiles each filter in REPOSITORY_REGEX[:TAG_REGEX] format into a pair of anchored regular expressions. """
+    import re
+    filters = []
+    for item in namespace.filters or []:
+        repository, _, tag = item.partition(':')
+        try:
+            filters.append((re.compile('(?:{})$'.format(repository)), re.compile('(?:{})$'.format(tag or '.*'))))
+        except re.error as e:
+            raise CLIError("Invalid filter '{}': {}".format(item, e))
+    namespace.filters = filters
+
+
+def validate_purge_ago(namespace):
+    """Converts a duration in [Nd][Nh][Nm] format, e.g. '30d' or '1d12h', into a timedelta. """
+    import re
+    from datetime import timedelta
+    if namespace.ago:
+        match = re.match(r'^(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?$', namespace.ago)
+        if not match or not any(match.groups()):
+            raise CLIError("Invalid value for ago: should be a duration like '30d', '12h' or '1d6h30m'")
+        days, hours, minutes = (int(x or 0) for x in match.groups())
+        namespace.ago = timedelta(days=days, hours=hours, minutes=minutes)
+
+
+def validate_purge_keep(namespace):
+    if namespace.keep is not None and namespace.keep < 0:
+        raise CLIError("Invalid value for keep: should be a number of manifests greater than or equal to 0")
@@ -169,6 +169,7 @@ def load_command_table(self, _):  # pylint: disable=too-many-statements
         g.command('show', 'acr_repository_show')
         g.command('update', 'acr_repository_update')
         g.command('delete', 'acr_repository_delete')
+        g.command('purge', 'acr_repository_purge')
         g.command('untag', 'acr_repository_untag')
 
     with self.command_group('acr webhook', acr_webhook_util) as g:
@@ -15,8 +15,10 @@ from ._utils import user_confirmation
 from ._docker_utils import (
     request_data_from_registry,
     get_access_credentials,
+    get_repository_access_credentials,
     RegistryException,
-    RepoAccessTokenPermission
+    RepoAccessTokenPermission,
+    REGISTRY_MAX_CONCURRENCY
 )
 
 logger = get_logger(__name__)
@@ -27,6 +29,7 @@ ORDERBY_PARAMS = {
     'time_desc': 'timedesc'
 }
 DEFAULT_PAGINATION = 100
+PURGE_RETRY_TIMES = 5
 
 
 def _get_repository_path(repository=None):
@@ -75,7 +78,19 @@ def _obtain_data_from_registry(login_server,
                                result_index,
                                top=None,
                                orderby=None):
-    result_list = []
+    return list(_iter_data_from_registry(login_server, path, username, password, result_index, top, orderby))
+
+
+def _iter_data_from_registry(login_server,
+                             path,
+                             username,
+                             password,
+                             result_index,
+                             top=None,
+                             orderby=None):
+    """Iterate the items of a list from a registry, requesting the next page only when the items of the previous
+    one have been consumed.
+    """
     execute_next_http_call = True
 
     params = {
@@ -100,8 +115,8 @@ def _obtain_data_from_registry(login_server,
             result_index=result_index,
             params=params)
 
-        if result:
-            result_list += result
+        for item in result or []:
+            yield item
 
         if top is not None and top <= 0:
             break
@@ -116,8 +131,6 @@ def _obtain_data_from_registry(login_server,
             params = {y[0]: unquote(y[1]) for y in (x.split('=', 2) for x in tokens[1].split('&'))}
             execute_next_http_call = True
 
-    return result_list
-
 
 def acr_repository_list(cmd,
                         registry_name,
@@ -142,25 +155,62 @@ def acr_repository_list(cmd,
         top=top)
 
 
-def acr_repository_show_tags(cmd,
-                             registry_name,
-                             repository,
-                             top=None,
-                             orderby=None,
-                             resource_group_name=None,  # pylint: disable=unused-argument
-                             tenant_suffix=None,
-                             username=None,
-                             password=None,
-                             detail=False):
-    login_server, username, password = get_access_credentials(
+def _list_all_repositories(cmd,
+                           registry_name,
+                           tenant_suffix,
+                           username,
+                           password,
+                           result_key,
+                           list_repository):
+    """List the items of every repository in a registry, fetching the repositories concurrently.
+    :param str result_key: The key of the listed items of a repository in the results
+    :param list_repository: A function listing the items of a repository with the given login server,
+        repository, username and password
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    login_server, get_credentials = get_repository_access_credentials(
         cmd=cmd,
         registry_name=registry_name,
+        permission=RepoAccessTokenPermission.METADATA_READ.value,
         tenant_suffix=tenant_suffix,
         username=username,
+        password=password)
+
+    username, password = get_credentials()
+    repositories = _obtain_data_from_registry(
+        login_server=login_server,
+        path='/v2/_catalog',
+        username=username,
         password=password,
-        repository=repository,
-        permission=RepoAccessTokenPermission.METADATA_READ.value)
+        result_index='repositories')
+
+    def _list(repository):
+        username, password = get_credentials(repository)
+        try:
+            return list_repository(login_server, repository, username, password)
+        except RegistryException as e:
+            # The repository was deleted after the catalog was listed
+            if e.status_code == 404:
+                logger.warning("Skipping repository '%s': %s", repository, str(e))
+                return None
+            raise
+
+    with ThreadPoolExecutor(max_workers=REGISTRY_MAX_CONCURRENCY) as executor:
+        results = list(executor.map(_list, repositories))
+
+    return [{'repository': repository, result_key: result}
+            for repository, result in zip(repositories, results) if result is not None]
+
 
+def _validate_repository_or_all(repository, all_repositories):
+    if all_repositories and repository:
+        raise CLIError('Usage error: --repository | --all-repositories')
+    if not all_repositories and not repository:
+        raise CLIError('Usage error: please specify --repository or --all-repositories.')
+
+
+def _get_tags(login_server, repository, username, password, top=None, orderby=None, detail=False):
     try:
         raw_result = _obtain_data_from_registry(
             login_server=login_server,
@@ -194,25 +244,7 @@ def acr_repository_show_tags(cmd,
     return raw_result
 
 
-def acr_repository_show_manifests(cmd,
-                                  registry_name,
-                                  repository,
-                                  top=None,
-                                  orderby=None,
-                                  resource_group_name=None,  # pylint: disable=unused-argument
-                                  tenant_suffix=None,
-                                  username=None,
-                                  password=None,
-                                  detail=False):
-    login_server, username, password = get_access_credentials(
-        cmd=cmd,
-        registry_name=registry_name,
-        tenant_suffix=tenant_suffix,
-        username=username,
-        password=password,
-        repository=repository,
-        permission=RepoAccessTokenPermission.METADATA_READ.value)
-
+def _get_manifests(login_server, repository, username, password, top=None, orderby=None, detail=False):
     raw_result = _obtain_data_from_registry(
         login_server=login_server,
         path=_get_manifest_path(repository),
@@ -233,6 +265,68 @@ def acr_repository_show_manifests(cmd,
     return raw_result
 
 
+def acr_repository_show_tags(cmd,
+                             registry_name,
+                             repository=None,
+                             top=None,
+                             orderby=None,
+                             resource_group_name=None,  # pylint: disable=unused-argument
+                             tenant_suffix=None,
+                             username=None,
+                             password=None,
+                             detail=False,
+                             all_repositories=False):
+    _validate_repository_or_all(repository, all_repositories)
+
+    if all_repositories:
+        return _list_all_repositories(
+            cmd, registry_name, tenant_suffix, username, password, 'tags',
+            lambda login_server, repo, user, secret: _get_tags(
+                login_server, repo, user, secret, top=top, orderby=orderby, detail=detail))
+
+    login_server, username, password = get_access_credentials(
+        cmd=cmd,
+        registry_name=registry_name,
+        tenant_suffix=tenant_suffix,
+        username=username,
+        password=password,
+        repository=repository,
+        permission=RepoAccessTokenPermission.METADATA_READ.value)
+
+    return _get_tags(login_server, repository, username, password, top=top, orderby=orderby, detail=detail)
+
+
+def acr_repository_show_manifests(cmd,
+                                  registry_name,
+                                  repository=None,
+                                  top=None,
+                                  orderby=None,
+                                  resource_group_name=None,  # pylint: disable=unused-argument
+                                  tenant_suffix=None,
+                                  username=None,
+                                  password=None,
+                                  detail=False,
+                                  all_repositories=False):
+    _validate_repository_or_all(repository, all_repositories)
+
+    if all_repositories:
+        return _list_all_repositories(
+            cmd, registry_name, tenant_suffix, username, password, 'manifests',
+            lambda login_server, repo, user, secret: _get_manifests(
+                login_server, repo, user, secret, top=top, orderby=orderby, detail=detail))
+
+    login_server, username, password = get_access_credentials(
+        cmd=cmd,
+        registry_name=registry_name,
+        tenant_suffix=tenant_suffix,
+        username=username,
+        password=password,
+        repository=repository,
+        permission=RepoAccessTokenPermission.METADATA_READ.value)
+
+    return _get_manifests(login_server, repository, username, password, top=top, orderby=orderby, detail=detail)
+
+
 def acr_repository_show(cmd,
                         registry_name,
                         repository=None,
@@ -424,6 +518,132 @@ def acr_repository_delete(cmd,
         password=password)[0]
 
 
+def acr_repository_purge(cmd,
+                         registry_name,
+                         filters,
+                         ago=None,
+                         keep=0,
+                         untagged=False,
+                         dry_run=False,
+                         resource_group_name=None,  # pylint: disable=unused-argument
+                         tenant_suffix=None,
+                         username=None,
+                         password=None,
+                         yes=False):
+    from datetime import datetime
+    from concurrent.futures import ThreadPoolExecutor
+
+    login_server, get_credentials = get_repository_access_credentials(
+        cmd=cmd,
+        registry_name=registry_name,
+        permission=RepoAccessTokenPermission.DELETE_META_READ.value,
+        tenant_suffix=tenant_suffix,
+        username=username,
+        password=password)
+
+    catalog_username, catalog_password = get_credentials()
+    targets = []
+    for repository in _iter_data_from_registry(
+            login_server=login_server,
+            path='/v2/_catalog',
+            username=catalog_username,
+            password=catalog_password,
+            result_index='repositories'):
+        tag_filters = [tag_filter for repository_filter, tag_filter in filters if repository_filter.match(repository)]
+        if tag_filters:
+            targets.append((repository, tag_filters))
+
+    cutoff = datetime.utcnow() - ago if ago else None
+
+    def _find(target):
+        repository, tag_filters = target
+        username, password = get_credentials(repository)
+        return _find_manifests_to_purge(
+            login_server, repository, username, password, tag_filters, cutoff, keep, untagged)
+
+    with ThreadPoolExecutor(max_workers=REGISTRY_MAX_CONCURRENCY) as executor:
+        manifests = [item for items in executor.map(_find, targets) for item in items]
+
+        message = "This operation will delete {} manifest(s) in {} repositories".format(
+            len(manifests), len({item['repository'] for item in manifests}))
+        if dry_run or not manifests:
+            logger.warning("%s.", message.replace('will delete', 'would delete'))
+            return manifests
+        if yes:
+            logger.warning("%s.", message)
+        else:
+            user_confirmation("{} and all the tags referencing them.\nAre you sure you want to continue?"
+                              .format(message))
+
+        def _delete(item):
+            username, password = get_credentials(item['repository'])
+            try:
+                request_data_from_registry(
+                    http_method='delete',
+                    login_server=login_server,
+                    path='/v2/{}/manifests/{}'.format(item['repository'], item['digest']),
+                    username=username,
+                    password=password,
+                    retry_times=PURGE_RETRY_TIMES)
+            except RegistryException as e:
+                # The manifest was already deleted, e.g. by a retention policy
+                if e.status_code != 404:
+                    logger.warning("Failed to delete '%s@%s': %s", item['repository'], item['digest'], str(e))
+                    return False
+            except CLIError as e:
+                logger.warning("Failed to delete '%s@%s': %s", item['repository'], item['digest'], str(e))
+                return False
+            return True
+
+        deleted = list(executor.map(_delete, manifests))
+
+    failed = deleted.count(False)
+    if failed:
+        raise CLIError("Failed to delete {} of {} manifest(s).".format(failed, len(manifests)))
+    return manifests
+
+
+def _find_manifests_to_purge(login_server, repository, username, password, tag_filters, cutoff, keep, untagged):
+    """Find the manifests of a repository older than the cutoff, which are either untagged or have all of their
+    tags matched by the filters, keeping the latest `keep` tagged ones. The manifests are listed from the oldest
+    so that the listing stops at the first manifest updated after the cutoff.
+    """
+    from datetime import datetime
+
+    tagged, untagged_manifests = [], []
+    for item in _iter_data_from_registry(
+            login_server=login_server,
+            path=_get_manifest_path(repository),
+            username=username,
+            password=password,
+            result_index='manifests',
+            orderby='time_asc'):
+        timestamp = item.get('lastUpdateTime')
+        if not timestamp:
+            continue
+        if cutoff and datetime.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S') >= cutoff:
+            break
+        if not item.get('changeableAttributes', {}).get('deleteEnabled', True):
+            continue
+
+        tags = item.get('tags') or []
+        manifest = {
+            'repository': repository,
+            'digest': item['digest'],
+            'tags': tags,
+            'lastUpdateTime': timestamp
+        }
+        if not tags:
+            if untagged:
+                untagged_manifests.append(manifest)
+        elif all(any(tag_filter.match(tag) for tag_filter in tag_filters) for tag in tags):
+            tagged.append(manifest)
+
+    if keep:
+        tagged = tagged[:-keep]
+    return tagged + untagged_manifests
+
+
 def _validate_parameters(repository, image):
     if bool(repository) == bool(image):
         raise CLIError('Usage error: --image IMAGE | --repository REPOSITORY')
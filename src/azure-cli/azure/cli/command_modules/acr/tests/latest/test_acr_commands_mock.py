@@ -4,9 +4,10 @@
 # --------------------------------------------------------------------------------------------
 
 try:
-    from urllib.parse import urlencode
+    from urllib.parse import urlencode, parse_qsl
 except ImportError:
     from urllib import urlencode
+    from urlparse import parse_qsl
 import json
 import unittest
 import mock
@@ -21,8 +22,16 @@ from azure.cli.command_modules.acr.repository import (
     acr_repository_show,
     acr_repository_update,
     acr_repository_delete,
+    acr_repository_purge,
     acr_repository_untag
 )
+from azure.cli.command_modules.acr._validators import validate_purge_filters, validate_purge_ago, validate_purge_keep
+from azure.cli.command_modules.acr._stream_utils import _stream_logs
+from azure.cli.command_modules.acr._archive_utils import (
+    upload_source_code,
+    _collect_source_files,
+    _pack_source_code
+)
 from azure.cli.command_modules.acr.helm import (
     acr_helm_list,
     acr_helm_show,
@@ -39,6 +48,7 @@ from azure.cli.command_modules.acr._docker_utils import (
 )
 from azure.cli.command_modules.acr._docker_utils import ResourceNotFound
 from azure.cli.core.mock import DummyCli
+from knack.util import CLIError
 
 
 TEST_TENANT = 'testtenant'
@@ -52,7 +62,7 @@ TEST_REPOSITORY = 'testrepository'
 class AcrMockCommandsTests(unittest.TestCase):
 
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_list(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -91,7 +101,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_show_tags(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -144,8 +154,60 @@ class AcrMockCommandsTests(unittest.TestCase):
             json=None,
             verify=mock.ANY)
 
+    @mock.patch('azure.cli.command_modules.acr._docker_utils.get_login_credentials', autospec=True)
+    @mock.patch('requests.Session.post')
+    @mock.patch('requests.Session.get')
+    @mock.patch('requests.Session.request')
+    def test_repository_show_tags_all_repositories(self, mock_requests_request, mock_requests_get, mock_requests_post,
+                                                   mock_get_login_credentials):
+        cmd = self._setup_cmd()
+        login_server = 'testregistry.azurecr.io'
+        mock_get_login_credentials.return_value = login_server, EMPTY_GUID, TEST_ACR_REFRESH_TOKEN
+        self._setup_mock_token_requests(mock.MagicMock(), mock_requests_get, mock_requests_post, login_server)
+
+        results = {
+            '/v2/_catalog': {'repositories': ['testrepo1', 'testrepo2', 'deletedrepo']},
+            '/acr/v1/testrepo1/_tags': {'tags': [{'name': 'testtag1'}]},
+            '/acr/v1/testrepo2/_tags': {'tags': [{'name': 'testtag2'}, {'name': 'testtag3'}]}
+        }
+
+        def _request(method, url, **kwargs):
+            path = url[len('https://' + login_server):]
+            response = mock.MagicMock()
+            response.headers = {}
+            response.status_code = 200 if path in results else 404
+            response.content = json.dumps(results.get(path, {})).encode()
+            response.json.return_value = results.get(path, {})
+            return response
+
+        mock_requests_request.side_effect = _request
+
+        self.assertEqual(acr_repository_show_tags(cmd, 'testregistry', all_repositories=True), [
+            {'repository': 'testrepo1', 'tags': ['testtag1']},
+            {'repository': 'testrepo2', 'tags': ['testtag2', 'testtag3']}
+        ])
+
+        # the registry is challenged once and an access token is requested once per scope
+        mock_requests_get.assert_called_once_with('https://{}/v2/'.format(login_server), verify=mock.ANY)
+        scopes = sorted(dict(parse_qsl(c[0][1]))['scope'] for c in mock_requests_post.call_args_list)
+        self.assertEqual(scopes, ['registry:catalog:*'] + ['repository:{}:metadata_read'.format(r)
+                                                           for r in ['deletedrepo', 'testrepo1', 'testrepo2']])
+        mock_requests_request.assert_any_call(
+            method='get',
+            url='https://testregistry.azurecr.io/acr/v1/testrepo2/_tags',
+            headers=get_authorization_header(EMPTY_GUID, TEST_ACR_ACCESS_TOKEN),
+            params={
+                'n': 100,
+                'orderby': None
+            },
+            json=None,
+            verify=mock.ANY)
+
+        with self.assertRaises(CLIError):
+            acr_repository_show_tags(cmd, 'testregistry', 'testrepository', all_repositories=True)
+
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_show_manifests(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -194,7 +256,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_show(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -246,7 +308,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_show(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -308,7 +370,7 @@ class AcrMockCommandsTests(unittest.TestCase):
 
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
     @mock.patch('azure.cli.command_modules.acr.repository._get_manifest_digest', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_repository_delete(self, mock_requests_delete, mock_get_manifest_digest, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -371,10 +433,81 @@ class AcrMockCommandsTests(unittest.TestCase):
             json=None,
             verify=mock.ANY)
 
+    @mock.patch('azure.cli.command_modules.acr.repository.get_repository_access_credentials', autospec=True)
+    @mock.patch('requests.Session.request')
+    def test_repository_purge(self, mock_requests_request, mock_get_repository_access_credentials):
+        from datetime import datetime
+        cmd = self._setup_cmd()
+        login_server = 'testregistry.azurecr.io'
+        mock_get_repository_access_credentials.return_value = (
+            login_server, lambda repository=None: ('username', 'password'))
+
+        def _manifest(digest, tags, timestamp, delete_enabled=True):
+            return {'digest': digest, 'tags': tags, 'lastUpdateTime': timestamp,
+                    'changeableAttributes': {'deleteEnabled': delete_enabled}}
+
+        now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        results = {
+            '/v2/_catalog': {'repositories': ['hello', 'other']},
+            '/acr/v1/hello/_manifests': {'manifests': [
+                _manifest('sha256:1', None, '2019-01-01T00:00:00Z'),
+                _manifest('sha256:2', ['dev-1'], '2019-01-02T00:00:00.1234567Z'),
+                _manifest('sha256:3', ['dev-2', 'latest'], '2019-01-03T00:00:00Z'),
+                _manifest('sha256:4', ['dev-3'], '2019-01-04T00:00:00Z'),
+                _manifest('sha256:5', ['dev-4'], '2019-01-05T00:00:00Z', delete_enabled=False),
+                _manifest('sha256:6', ['dev-5'], now)]}
+        }
+        requests = []
+
+        def _request(method, url, **kwargs):
+            path = url[len('https://' + login_server):]
+            requests.append((method, path, kwargs['params']))
+            response = mock.MagicMock()
+            response.headers = {}
+            response.status_code = 200 if method == 'get' else 202
+            response.json.return_value = results.get(path, {})
+            if path == '/v2/_catalog':
+                # The catalog has a second, empty page
+                if 'last' in kwargs['params']:
+                    response.json.return_value = {'repositories': []}
+                else:
+                    response.headers = {'link': '<{}?last=next&n=100>; rel="next"'.format(path)}
+            return response
+
+        mock_requests_request.side_effect = _request
+
+        namespace = mock.MagicMock(filters=['hello:dev-.*'], ago='30d')
+        validate_purge_filters(namespace)
+        validate_purge_ago(namespace)
+        expected = [
+            {'repository': 'hello', 'digest': 'sha256:2', 'tags': ['dev-1'], 'lastUpdateTime': '2019-01-02T00:00:00.1234567Z'},
+            {'repository': 'hello', 'digest': 'sha256:1', 'tags': [], 'lastUpdateTime': '2019-01-01T00:00:00Z'}
+        ]
+
+        # Dry run reports the manifests and stops listing at the first manifest newer than --ago
+        self.assertEqual(acr_repository_purge(cmd, 'testregistry', namespace.filters, ago=namespace.ago, keep=1,
+                                              untagged=True, dry_run=True), expected)
+        self.assertEqual(requests, [
+            ('get', '/v2/_catalog', {'n': 100, 'orderby': None}),
+            ('get', '/v2/_catalog', {'last': 'next', 'n': '100'}),
+            ('get', '/acr/v1/hello/_manifests', {'n': 100, 'orderby': 'timeasc'})])
+
+        del requests[:]
+        self.assertEqual(acr_repository_purge(cmd, 'testregistry', namespace.filters, ago=namespace.ago, keep=1,
+                                              untagged=True, yes=True), expected)
+        self.assertEqual(sorted(path for method, path, _ in requests if method == 'delete'),
+                         ['/v2/hello/manifests/sha256:1', '/v2/hello/manifests/sha256:2'])
+
+        with self.assertRaises(CLIError):
+            validate_purge_ago(mock.MagicMock(ago='30 days'))
+        with self.assertRaises(CLIError):
+            validate_purge_keep(mock.MagicMock(keep=-1))
+        validate_purge_keep(mock.MagicMock(keep=0))
+
     @mock.patch('azure.cli.core._profile.Profile.get_subscription_id', autospec=True)
     @mock.patch('azure.cli.command_modules.acr._docker_utils.get_registry_by_name', autospec=True)
-    @mock.patch('requests.post', autospec=True)
-    @mock.patch('requests.get', autospec=True)
+    @mock.patch('requests.Session.post')
+    @mock.patch('requests.Session.get')
     @mock.patch('azure.cli.core._profile.Profile.get_raw_token', autospec=True)
     def test_get_docker_credentials(self, mock_get_raw_token, mock_requests_get, mock_requests_post,
                                     mock_get_registry_by_name, mock_get_subscription):
@@ -498,7 +631,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.helm.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_helm_list(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -535,7 +668,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.helm.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_helm_show(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -578,7 +711,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.helm.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_helm_delete(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -610,7 +743,7 @@ class AcrMockCommandsTests(unittest.TestCase):
             verify=mock.ANY)
 
     @mock.patch('azure.cli.command_modules.acr.helm.get_access_credentials', autospec=True)
-    @mock.patch('requests.request', autospec=True)
+    @mock.patch('requests.Session.request')
     def test_helm_push(self, mock_requests_get, mock_get_access_credentials):
         cmd = self._setup_cmd()
 
@@ -659,6 +792,84 @@ class AcrMockCommandsTests(unittest.TestCase):
                 data=mock_open.return_value.__enter__.return_value,
                 verify=mock.ANY)
 
+    @mock.patch('azure.cli.command_modules.acr._archive_utils.BlockBlobService', autospec=True)
+    @mock.patch('azure.cli.command_modules.acr._archive_utils.get_blob_info', autospec=True)
+    def test_upload_source_code(self, mock_get_blob_info, mock_block_blob_service):
+        import os
+        import shutil
+        import tarfile
+        import tempfile
+        source_location = tempfile.mkdtemp()
+        config_dir = tempfile.mkdtemp()
+        tar_file_path = os.path.join(config_dir, 'source.tar.gz')
+        try:
+            for path in ['.git/HEAD', 'node_modules/a/index.js', 'node_modules/keep/index.js', 'src/main.py']:
+                if not os.path.isdir(os.path.dirname(os.path.join(source_location, path))):
+                    os.makedirs(os.path.dirname(os.path.join(source_location, path)))
+                with open(os.path.join(source_location, path), 'w') as f:
+                    f.write(path * 1000)
+            with open(os.path.join(source_location, '.dockerignore'), 'w') as f:
+                f.write('node_modules\n!node_modules/keep\n')
+
+            # The ignored directories without any exception rule are not walked
+            with mock.patch('os.listdir', side_effect=os.listdir) as mock_listdir:
+                source_files = _collect_source_files(source_location)
+            self.assertEqual([arcname for _, arcname in source_files], [
+                '', '.dockerignore', 'node_modules/keep', 'node_modules/keep/index.js', 'src', 'src/main.py'])
+            self.assertNotIn(os.path.join(source_location, '.git'),
+                             [call[0][0] for call in mock_listdir.call_args_list])
+            self.assertNotIn(os.path.join(source_location, 'node_modules', 'a'),
+                             [call[0][0] for call in mock_listdir.call_args_list])
+
+            # The chunks compressed in parallel are read back as a single gzip stream
+            with mock.patch('azure.cli.command_modules.acr._archive_utils.GZIP_CHUNK_SIZE', 1024):
+                _pack_source_code(source_location, tar_file_path, os.path.join(source_location, 'src', 'main.py'),
+                                  'Dockerfile')
+            with tarfile.open(tar_file_path, 'r:gz') as tar:
+                self.assertEqual(tar.extractfile('src/main.py').read(), b'src/main.py' * 1000)
+                self.assertEqual(tar.extractfile('Dockerfile').read(), b'src/main.py' * 1000)
+
+            # An unchanged context is uploaded only once
+            client = mock.MagicMock()
+            client.get_build_source_upload_url.return_value = mock.MagicMock(
+                upload_url='https://account.blob.core.windows.net/container/blob?sas', relative_path='source/blob')
+            mock_get_blob_info.return_value = ('account', 'core.windows.net', 'container', 'blob', 'sas')
+            with mock.patch.dict(os.environ, {'AZURE_CONFIG_DIR': config_dir}):
+                for _ in range(2):
+                    self.assertEqual(upload_source_code(client, 'testregistry', 'testrg', source_location,
+                                                        tar_file_path, '', ''), 'source/blob')
+            self.assertEqual(client.get_build_source_upload_url.call_count, 1)
+            self.assertEqual(mock_block_blob_service.return_value.create_blob_from_path.call_count, 1)
+        finally:
+            shutil.rmtree(source_location, ignore_errors=True)
+            shutil.rmtree(config_dir, ignore_errors=True)
+
+    @mock.patch('time.sleep')
+    def test_stream_logs(self, mock_sleep):
+        log = b'step 1\r\nstep 2\r\nstep 3 failed'
+        sizes = [0, 0, 10, len(log)]
+
+        def _get_blob_properties(container_name, blob_name):
+            size = sizes.pop(0) if len(sizes) > 1 else sizes[0]
+            return mock.MagicMock(metadata={'Complete': 'failed'} if size == len(log) else {},
+                                  properties=mock.MagicMock(content_length=size))
+
+        blob_service = mock.MagicMock()
+        blob_service.get_blob_properties.side_effect = _get_blob_properties
+        blob_service.get_blob_to_bytes.side_effect = lambda container_name, blob_name, start_range, end_range: \
+            mock.MagicMock(content=log[start_range:end_range + 1])
+
+        with mock.patch('azure.cli.command_modules.acr._stream_utils.print', create=True) as mock_print:
+            with self.assertRaises(CLIError):
+                _stream_logs(True, 7, 60, blob_service, 'container', 'blob', True, json_lines=True)
+
+        # Each available byte is downloaded once, and the lines split across chunks are printed whole
+        ranges = [(c[1]['start_range'], c[1]['end_range']) for c in blob_service.get_blob_to_bytes.call_args_list]
+        self.assertEqual(ranges, [(0, 6), (7, 9), (10, 16), (17, 23), (24, 28)])
+        self.assertEqual([json.loads(c[0][0])['line'] for c in mock_print.call_args_list],
+                         ['step 1', 'step 2', 'step 3 failed'])
+        self.assertEqual(mock_sleep.call_count, 1)
+
     def _setup_cmd(self):
         cmd = mock.MagicMock()
         cmd.cli_ctx = DummyCli()
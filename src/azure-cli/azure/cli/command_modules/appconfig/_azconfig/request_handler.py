@@ -5,6 +5,7 @@
 
 # pylint: disable=too-few-public-methods
 
+import threading
 import time
 import azure.cli.command_modules.appconfig._azconfig.constants as constants
 import azure.cli.command_modules.appconfig._azconfig.utils as utils
@@ -17,6 +18,9 @@ class RequestHandler(object):
     def __init__(self, connection_string, request_options):
         self.connection_string = connection_string
         self.request_options = request_options
+        # when throttled, all the requests sent concurrently through this handler wait until this time
+        self._resume_time = 0
+        self._resume_time_lock = threading.Lock()
 
     def execute(self, request, request_sessions):
         """Exectutes the request with passed parameters applying request options
@@ -36,6 +40,7 @@ class RequestHandler(object):
         current_retry = 0
 
         while True:
+            self._wait_until_resumed()
             start = time.time()
 
             request.headers.update(utils.sign_request(
@@ -59,7 +64,19 @@ class RequestHandler(object):
                             response.reason, retry_after_ms)
                     raise exceptions.ServiceUnavailableException(
                         response.reason, retry_after_ms)
-                time.sleep(retry_after_ms)
+                self._pause(retry_after_ms)
                 current_retry += 1
             else:
                 return response
+
+    def _pause(self, seconds):
+        with self._resume_time_lock:
+            self._resume_time = max(self._resume_time, time.time() + seconds)
+
+    def _wait_until_resumed(self):
+        while True:
+            with self._resume_time_lock:
+                delay = self._resume_time - time.time()
+            if delay <= 0:
+                return
+            time.sleep(delay)
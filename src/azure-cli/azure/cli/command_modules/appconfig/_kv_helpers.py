@@ -9,6 +9,7 @@ import io
 import json
 import re
 import sys
+from collections import OrderedDict
 
 import chardet
 import javaproperties
@@ -20,6 +21,8 @@ from knack.util import CLIError
 from ._constants import FeatureFlagConstants, KeyVaultConstants
 from ._utils import resolve_connection_string, user_confirmation
 from ._azconfig.azconfig_client import AzconfigClient
+from ._azconfig.constants import StatusCodes
+from ._azconfig.exceptions import HTTPException
 from ._azconfig.models import (KeyValue,
                                ModifyKeyValueOptions,
                                QueryKeyValueCollectionOptions)
@@ -30,6 +33,8 @@ from._featuremodels import (map_keyvalue_to_featureflag,
 logger = get_logger(__name__)
 FEATURE_MANAGEMENT_KEYWORDS = ["FeatureManagement", "featureManagement", "feature_management", "feature-management"]
 ENABLED_FOR_KEYWORDS = ["EnabledFor", "enabledFor", "enabled_for", "enabled-for"]
+# the requests in flight when writing many key-values, within the connection pool size of the client session
+MAX_CONCURRENT_WRITES = 10
 
 
 class FeatureManagementReservedKeywords(object):
@@ -259,9 +264,34 @@ def __read_kv_from_config_store(cmd, name=None, connection_string=None, key=None
     return key_values
 
 
-def __write_kv_and_features_to_config_store(cmd, key_values, features=None, name=None, connection_string=None, label=None, preserve_labels=False):
-    if not key_values and not features:
+def __read_kv_changes_from_config_store(cmd, sync_destination, name=None, connection_string=None, key=None, label=None, prefix_to_remove=""):
+    '''
+    Reads the key-values of a configuration store with the ones changed and deleted since the previous sync to the
+    destination. The returned KeyValueSync records them once saved.
+    '''
+    from ._kv_sync import KeyValueSync
+    connection_string = resolve_connection_string(cmd, name, connection_string)
+    try:
+        kv_sync = KeyValueSync(cmd, connection_string, key=key, label=label, destination=sync_destination)
+        key_values, changed_kvs, deleted_kvs = kv_sync.read(AzconfigClient(connection_string))
+        # the changed key-values are also in key_values
+        for kv in key_values + deleted_kvs:
+            if kv.key.startswith(prefix_to_remove):
+                kv.key = kv.key[len(prefix_to_remove):]
+    except Exception as exception:
+        raise CLIError(str(exception))
+    return key_values, changed_kvs, deleted_kvs, kv_sync
+
+
+def __write_kv_and_features_to_config_store(cmd, key_values, features=None, name=None, connection_string=None, label=None, preserve_labels=False,
+                                            kvs_to_delete=None, skip_unchanged=True):
+    if not key_values and not features and not kvs_to_delete:
         return
+    current_kvs = None
+    if skip_unchanged:
+        # the key-values currently in the store, to skip the unchanged ones and make the writes conditional on their ETags
+        current_kvs = __read_kv_from_config_store(cmd, name=name, connection_string=connection_string, key=None, label=label)
+    kvs_to_delete = kvs_to_delete or []
     try:
         # write all keyvalues to target store
         connection_string = resolve_connection_string(
@@ -271,15 +301,83 @@ def __write_kv_and_features_to_config_store(cmd, key_values, features=None, name
             key_values.extend(__convert_featureflag_list_to_keyvalue_list(features))
 
         if not preserve_labels:
-            for kv in key_values:
+            for kv in key_values + kvs_to_delete:
                 kv.label = label
-                azconfig_client.set_keyvalue(kv, ModifyKeyValueOptions())
-        else:
-            for kv in key_values:
-                azconfig_client.set_keyvalue(kv, ModifyKeyValueOptions())
 
+        # the last occurrence of a key wins, as when they were written one after the other
+        key_values = list(OrderedDict(((kv.key, kv.label), kv) for kv in key_values).values())
+        kvs_to_write = key_values
+        if current_kvs is not None:
+            dict_current_kvs = {(kv.key, kv.label): kv for kv in current_kvs}
+            kvs_to_write = [kv for kv in key_values if not __is_kv_unchanged(kv, dict_current_kvs.get((kv.key, kv.label), None))]
+            logger.info("Skipping %d unchanged key-values, writing %d key-values", len(key_values) - len(kvs_to_write), len(kvs_to_write))
+
+        written, failed_kv, error = __write_kvs_concurrently(azconfig_client, kvs_to_write, kvs_to_delete=kvs_to_delete, current_kvs=current_kvs)
     except Exception as exception:
         raise CLIError(str(exception))
+    if failed_kv is not None:
+        logger.error('Failed after writing %d out of %d keys', written, len(kvs_to_write) + len(kvs_to_delete))
+        raise CLIError(__get_write_error_message(failed_kv, error))
+
+
+def __is_kv_unchanged(kv, current_kv):
+    if current_kv is None:
+        return False
+    return (kv.value, kv.content_type or None, kv.tags or {}) == (current_kv.value, current_kv.content_type or None, current_kv.tags or {})
+
+
+def __write_kvs_concurrently(azconfig_client, kvs_to_set, kvs_to_delete=None, current_kvs=None):
+    '''
+    Sets and deletes key-values with up to MAX_CONCURRENT_WRITES requests in flight, stopping at the first failure.
+    When the current key-values of the store are given, a key-value is only updated if its ETag is unchanged since
+    and only added if it still doesn't exist, so that concurrent changes to the store are not overwritten.
+
+    Returns the number of key-values written, and the key-value which failed with its exception, if any.
+    '''
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+    dict_current_kvs = None if current_kvs is None else {(kv.key, kv.label): kv for kv in current_kvs}
+
+    def _set(kv):
+        if dict_current_kvs is None:
+            return azconfig_client.set_keyvalue(kv, ModifyKeyValueOptions())
+        current_kv = dict_current_kvs.get((kv.key, kv.label), None)
+        if current_kv is None:
+            return azconfig_client.add_keyvalue(kv, ModifyKeyValueOptions())
+        kv.etag = current_kv.etag
+        return azconfig_client.update_keyvalue(kv, ModifyKeyValueOptions())
+
+    def _delete(kv):
+        if dict_current_kvs is None:
+            return azconfig_client.delete_keyvalue_by_key_label(kv.key, kv.label, ModifyKeyValueOptions())
+        return azconfig_client.delete_keyvalue(kv, ModifyKeyValueOptions())
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_WRITES) as executor:
+        futures = OrderedDict()
+        for kv in kvs_to_set:
+            futures[executor.submit(_set, kv)] = kv
+        for kv in kvs_to_delete or []:
+            futures[executor.submit(_delete, kv)] = kv
+        _, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in not_done:
+            future.cancel()
+
+    written = 0
+    failed_kv, error = None, None
+    for future, kv in futures.items():
+        if future.cancelled():
+            continue
+        if future.exception() is None:
+            written += 1
+        elif failed_kv is None:
+            failed_kv, error = kv, future.exception()
+    return written, failed_kv, error
+
+
+def __get_write_error_message(kv, exception):
+    key = "'{}'".format(kv.key) if kv.label is None else "'{}' with label '{}'".format(kv.key, kv.label)
+    if (isinstance(exception, HTTPException) and exception.status == StatusCodes.PRECONDITION_FAILED) or isinstance(exception, ValueError):
+        return "Key {} was modified in the configuration store while being written. Please try again.".format(key)
+    return "Failed to write key {}: {}".format(key, exception)
 
 
 def __is_feature_flag(kv):
@@ -0,0 +1,135 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+from knack.log import get_logger
+
+from ._azconfig.models import (KeyValue,
+                               QueryFields,
+                               QueryKeyValueCollectionOptions,
+                               QueryKeyValueOptions)
+from ._azconfig.utils import get_endpoint_from_connection_string
+
+logger = get_logger(__name__)
+
+SYNC_STATE_DIR = os.path.join('appconfig', 'sync')
+
+
+class KeyValueSync(object):
+    '''
+    The key-values of a configuration store as of the previous sync to a destination, recorded under the config
+    directory. The next sync reads the values of the key-values changed since then from the revisions of the store,
+    and only lists the ETags of the others.
+
+    :ivar str key:
+        Key filter of the synced key-values.
+    :ivar str label:
+        Label filter of the synced key-values.
+    :ivar bool synced_before:
+        Whether the last read found a previous sync to the destination.
+    '''
+
+    def __init__(self, cmd, connection_string, key, label, destination):
+        self.key = key
+        self.label = QueryKeyValueCollectionOptions.empty_label if not label else label
+        sync_id = hashlib.sha256(json.dumps(
+            [get_endpoint_from_connection_string(connection_string), key, self.label, destination],
+            sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        self._file_path = os.path.join(cmd.cli_ctx.config.config_dir, SYNC_STATE_DIR, sync_id + '.json')
+        self._state = None
+        self.synced_before = False
+
+    def read(self, azconfig_client):
+        '''
+        Returns all the key-values, and the key-values changed and deleted since the previous sync.
+        The changed key-values are also in all the key-values.
+        '''
+        previous_state = self._load()
+        if previous_state is None:
+            key_values = list(azconfig_client.get_keyvalues(
+                QueryKeyValueCollectionOptions(key_filter=self.key, label_filter=self.label)))
+            self._state = self._to_state(key_values)
+            return key_values, list(key_values), []
+
+        self.synced_before = True
+        previous_kvs = {(kv.key, kv.label): kv for kv in map(self._from_entry, previous_state['keyValues'])}
+        # the revisions are listed from the newest, so only the ones since the previous sync are read
+        revisions = {}
+        if previous_state['lastModified']:
+            for revision in azconfig_client.read_keyvalue_revisions(
+                    QueryKeyValueCollectionOptions(key_filter=self.key, label_filter=self.label)):
+                if revision.last_modified and revision.last_modified < previous_state['lastModified']:
+                    break
+                revisions.setdefault(revision.etag, revision)
+
+        # the ETags of the current key-values tell the deleted key-values, and the changes missing from the revisions
+        key_values = []
+        changed_kvs = []
+        for current_kv in azconfig_client.get_keyvalues(QueryKeyValueCollectionOptions(
+                key_filter=self.key, label_filter=self.label,
+                fields=[QueryFields.KEY, QueryFields.LABEL, QueryFields.ETAG, QueryFields.LAST_MODIFIED])):
+            previous_kv = previous_kvs.pop((current_kv.key, current_kv.label), None)
+            if previous_kv is not None and previous_kv.etag == current_kv.etag:
+                key_values.append(previous_kv)
+                continue
+            kv = revisions.get(current_kv.etag, None)
+            if kv is None:
+                logger.debug("Key '%s' changed since the last sync is not in the revisions.", current_kv.key)
+                kv = azconfig_client.get_keyvalue(current_kv.key, QueryKeyValueOptions(
+                    label=QueryKeyValueOptions.empty_label if current_kv.label is None else current_kv.label))
+                if kv is None:
+                    continue
+            key_values.append(kv)
+            changed_kvs.append(kv)
+
+        self._state = self._to_state(key_values)
+        return key_values, changed_kvs, list(previous_kvs.values())
+
+    def save(self):
+        '''
+        Records the key-values returned by the last read, once they are synced to the destination.
+        '''
+        from knack.util import ensure_dir
+        from azure.cli.core._session import Session
+        if self._state is None:
+            return
+        ensure_dir(os.path.dirname(self._file_path))
+        session = Session()
+        session.filename = self._file_path
+        session.data = self._state
+        session.save_with_retry()
+
+    def _load(self):
+        from azure.cli.core._session import Session
+        if not os.path.isfile(self._file_path):
+            return None
+        session = Session()
+        session.load(self._file_path)
+        if 'keyValues' not in session.data:
+            return None
+        return session.data
+
+    @classmethod
+    def _to_state(cls, key_values):
+        # the state is serialized when read, as the caller modifies the keys and labels for the destination
+        return {'lastModified': max([kv.last_modified for kv in key_values if kv.last_modified] or [None]),
+                'keyValues': [cls._to_entry(kv) for kv in key_values]}
+
+    @staticmethod
+    def _to_entry(kv):
+        return {'key': kv.key, 'label': kv.label, 'value': kv.value, 'contentType': kv.content_type,
+                'tags': kv.tags, 'etag': kv.etag, 'lastModified': kv.last_modified, 'locked': kv.locked}
+
+    @staticmethod
+    def _from_entry(entry):
+        kv = KeyValue(entry['key'], value=entry['value'], label=entry['label'], tags=entry['tags'],
+                      content_type=entry['contentType'])
+        kv.etag = entry['etag']
+        kv.last_modified = entry['lastModified']
+        kv.locked = entry['locked']
+        return kv
@@ -119,6 +119,7 @@ def load_arguments(self, _):
         c.argument('destination', options_list=['--destination', '-d'], arg_type=get_enum_type(['file', 'appconfig', 'appservice']), validator=validate_export, help="The destination of exporting. Note that exporting feature flags to appservice is not supported.")
         c.argument('yes', help="Do not prompt for preview.")
         c.argument('skip_features', help="Export only key values and exclude all feature flags. By default, all features with the specified label will be exported to file or appconfig. Not applicable for appservice.", arg_type=get_three_state_flag())
+        c.argument('incremental', arg_type=get_three_state_flag(), help="Sync incrementally: record the exported key-values locally, and only read the key-values changed since the previous export to the same destination from the revisions of the store. Only the changes are written to appconfig or appservice, deleted key-values are also deleted from appconfig. Assumes the destination is not modified by anything else.")
 
     with self.argument_context('appconfig kv export', arg_group='File') as c:
         c.argument('path', help='Local configuration file path. Required for file arguments.')
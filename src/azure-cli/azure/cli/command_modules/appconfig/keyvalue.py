@@ -6,6 +6,7 @@
 # pylint: disable=line-too-long, too-many-locals
 
 import json
+import os
 import time
 
 from itertools import chain
@@ -16,6 +17,7 @@ from ._constants import FeatureFlagConstants, KeyVaultConstants
 from ._utils import resolve_connection_string, user_confirmation
 from ._azconfig.azconfig_client import AzconfigClient
 from ._azconfig.constants import StatusCodes
+from ._azconfig.utils import get_endpoint_from_connection_string
 from ._azconfig.exceptions import HTTPException
 from ._azconfig.models import (KeyValue,
                                ModifyKeyValueOptions,
@@ -25,7 +27,9 @@ from ._kv_helpers import (__compare_kvs_for_restore, __read_kv_from_file, __read
                           __write_kv_and_features_to_file, __read_kv_from_config_store,
                           __write_kv_and_features_to_config_store, __discard_features_from_retrieved_kv, __read_kv_from_app_service,
                           __write_kv_to_app_service, __serialize_kv_list_to_comparable_json_object, __serialize_features_from_kv_list_to_comparable_json_object,
-                          __serialize_feature_list_to_comparable_json_object, __print_features_preview, __print_preview, __print_restore_preview)
+                          __serialize_feature_list_to_comparable_json_object, __print_features_preview, __print_preview, __print_restore_preview,
+                          __write_kvs_concurrently, __get_write_error_message, __read_kv_changes_from_config_store)
+from ._featuremodels import map_keyvalue_to_featureflag
 from .feature import list_feature
 
 logger = get_logger(__name__)
@@ -151,10 +155,12 @@ def export_config(cmd,
                   dest_label=None,
                   preserve_labels=False,
                   # to-app-service parameters
-                  appservice_account=None):
+                  appservice_account=None,
+                  incremental=False):
     src_features = []
     dest_features = []
     dest_kvs = []
+    kv_syncs = []
     destination = destination.lower()
     format_ = format_.lower() if format_ else None
     naming_convention = naming_convention.lower()
@@ -168,18 +174,43 @@ def export_config(cmd,
             # as we check preserve_labels again before labelling KVs.
             dest_label = label
 
-    # fetch key values from user's configstore
-    src_kvs = __read_kv_from_config_store(
-        cmd, name=name, connection_string=connection_string, key=key, label=label, prefix_to_remove=prefix)
+    if incremental:
+        # the destination of the sync, by which the key-values synced to it before are recorded
+        sync_destination = {'destination': destination, 'prefix': prefix, 'skip_features': skip_features,
+                            'path': os.path.abspath(path) if path else None, 'format': format_, 'separator': separator,
+                            'naming_convention': naming_convention,
+                            'dest_store': dest_name or (get_endpoint_from_connection_string(dest_connection_string) if dest_connection_string else None),
+                            'dest_label': dest_label, 'preserve_labels': preserve_labels, 'appservice_account': appservice_account}
+        src_kvs, changed_kvs, deleted_kvs, kv_sync = __read_kv_changes_from_config_store(
+            cmd, sync_destination, name=name, connection_string=connection_string, key=key, label=label, prefix_to_remove=prefix)
+        kv_syncs.append(kv_sync)
+        for kvs in (src_kvs, changed_kvs, deleted_kvs):
+            __discard_features_from_retrieved_kv(kvs)
+    else:
+        # fetch key values from user's configstore
+        src_kvs = __read_kv_from_config_store(
+            cmd, name=name, connection_string=connection_string, key=key, label=label, prefix_to_remove=prefix)
 
-    # We need to separate KV from feature flags
-    __discard_features_from_retrieved_kv(src_kvs)
+        # We need to separate KV from feature flags
+        __discard_features_from_retrieved_kv(src_kvs)
 
     if not skip_features:
         # Get all Feature flags with matching label
-        if destination == 'file':
-            if format_ == 'properties':
-                skip_features = True
+        if destination == 'file' and format_ == 'properties':
+            skip_features = True
+        elif destination in ('file', 'appconfig'):
+            if incremental:
+                sync_destination['features'] = True
+                feature_kvs, changed_feature_kvs, deleted_feature_kvs, kv_sync = __read_kv_changes_from_config_store(
+                    cmd, sync_destination, name=name, connection_string=connection_string, key=FeatureFlagConstants.FEATURE_FLAG_PREFIX + '*', label=label)
+                kv_syncs.append(kv_sync)
+                feature_kvs, changed_feature_kvs, deleted_feature_kvs = (
+                    [kv for kv in kvs if kv.content_type == FeatureFlagConstants.FEATURE_FLAG_CONTENT_TYPE]
+                    for kvs in (feature_kvs, changed_feature_kvs, deleted_feature_kvs))
+                changed_kvs.extend(changed_feature_kvs)
+                deleted_kvs.extend(deleted_feature_kvs)
+                # src_features is a list of FeatureFlag objects
+                src_features = [map_keyvalue_to_featureflag(keyvalue=kv, show_conditions=True) for kv in feature_kvs]
             else:
                 # src_features is a list of FeatureFlag objects
                 src_features = list_feature(cmd,
@@ -188,14 +219,6 @@ def export_config(cmd,
                                             name=name,
                                             connection_string=connection_string,
                                             all_=True)
-        elif destination == 'appconfig':
-            # src_features is a list of FeatureFlag objects
-            src_features = list_feature(cmd,
-                                        feature='*',
-                                        label=QueryKeyValueCollectionOptions.empty_label if label is None else label,
-                                        name=name,
-                                        connection_string=connection_string,
-                                        all_=True)
 
     # if customer needs preview & confirmation
     if not yes:
@@ -229,6 +252,8 @@ def export_config(cmd,
                 new_json=__serialize_feature_list_to_comparable_json_object(features=src_features))
 
         if not need_kv_change and not need_feature_change:
+            for kv_sync in kv_syncs:
+                kv_sync.save()
             return
 
         user_confirmation("Do you want to continue? \n")
@@ -239,10 +264,23 @@ def export_config(cmd,
                                         format_=format_, separator=separator, skip_features=skip_features,
                                         naming_convention=naming_convention)
     elif destination == 'appconfig':
-        __write_kv_and_features_to_config_store(cmd, key_values=src_kvs, features=src_features, name=dest_name,
-                                                connection_string=dest_connection_string, label=dest_label, preserve_labels=preserve_labels)
+        if incremental:
+            # only the changes since the previous sync are applied, the first sync skips the unchanged key-values
+            __write_kv_and_features_to_config_store(cmd, key_values=changed_kvs, name=dest_name, connection_string=dest_connection_string,
+                                                    label=dest_label, preserve_labels=preserve_labels, kvs_to_delete=deleted_kvs,
+                                                    skip_unchanged=not all(kv_sync.synced_before for kv_sync in kv_syncs))
+        else:
+            __write_kv_and_features_to_config_store(cmd, key_values=src_kvs, features=src_features, name=dest_name,
+                                                    connection_string=dest_connection_string, label=dest_label, preserve_labels=preserve_labels)
     elif destination == 'appservice':
-        __write_kv_to_app_service(cmd, key_values=src_kvs, appservice_account=appservice_account)
+        if not incremental:
+            __write_kv_to_app_service(cmd, key_values=src_kvs, appservice_account=appservice_account)
+        elif changed_kvs:
+            # app settings are merged, so only the changed ones are written
+            __write_kv_to_app_service(cmd, key_values=changed_kvs, appservice_account=appservice_account)
+
+    for kv_sync in kv_syncs:
+        kv_sync.save()
 
 
 def set_key(cmd,
@@ -557,8 +595,9 @@ def restore_key(cmd,
                                                       label_filter=label)
 
     try:
-        restore_keyvalues = azconfig_client.get_keyvalues(query_option_then)
-        current_keyvalues = azconfig_client.get_keyvalues(query_option_now)
+        # the iterables query the store each time they are iterated
+        restore_keyvalues = list(azconfig_client.get_keyvalues(query_option_then))
+        current_keyvalues = list(azconfig_client.get_keyvalues(query_option_now))
         kvs_to_restore, kvs_to_modify, kvs_to_delete = __compare_kvs_for_restore(restore_keyvalues, current_keyvalues)
 
         if not yes:
@@ -568,24 +607,13 @@ def restore_key(cmd,
                 return
 
         keys_to_restore = len(kvs_to_restore) + len(kvs_to_modify) + len(kvs_to_delete)
-        restored_so_far = 0
-
-        for kv in chain(kvs_to_restore, kvs_to_modify):
-            try:
-                azconfig_client.set_keyvalue(kv, ModifyKeyValueOptions())
-                restored_so_far += 1
-            except HTTPException as exception:
-                logger.error('Error while setting the keyvalue:%s', kv)
-                logger.error('Failed after restoring %d out of %d keys', restored_so_far, keys_to_restore)
-                raise CLIError(str(exception))
-        for kv in kvs_to_delete:
-            try:
-                azconfig_client.delete_keyvalue(kv, ModifyKeyValueOptions())
-                restored_so_far += 1
-            except HTTPException as exception:
-                logger.error('Error while setting the keyvalue:%s', kv)
-                logger.error('Failed after restoring %d out of %d keys', restored_so_far, keys_to_restore)
-                raise CLIError(str(exception))
+        restored_so_far, failed_kv, error = __write_kvs_concurrently(azconfig_client,
+                                                                     chain(kvs_to_restore, kvs_to_modify),
+                                                                     kvs_to_delete=kvs_to_delete,
+                                                                     current_kvs=current_keyvalues)
+        if failed_kv is not None:
+            logger.error('Failed after restoring %d out of %d keys', restored_so_far, keys_to_restore)
+            raise CLIError(__get_write_error_message(failed_kv, error))
 
         logger.debug('Successfully restored %d out of %d keys', restored_so_far, keys_to_restore)
     except Exception as exception:
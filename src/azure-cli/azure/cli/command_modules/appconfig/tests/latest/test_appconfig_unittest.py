@@ -0,0 +1,312 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import copy
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+try:
+    import unittest.mock as mock
+except ImportError:
+    import mock
+
+from knack.util import CLIError
+
+from azure.cli.command_modules.appconfig._azconfig.azconfig_client import AzconfigClient
+from azure.cli.command_modules.appconfig._azconfig.exceptions import HTTPException
+from azure.cli.command_modules.appconfig._azconfig.models import ClientOptions, KeyValue, QueryKeyValueOptions
+from azure.cli.command_modules.appconfig._azconfig.request_handler import RequestHandler
+from azure.cli.command_modules.appconfig._azconfig.request_message import RequestMessage
+from azure.cli.command_modules.appconfig._kv_sync import KeyValueSync
+from azure.cli.command_modules.appconfig.keyvalue import export_config
+from azure.cli.command_modules.appconfig._kv_helpers import (
+    MAX_CONCURRENT_WRITES,
+    __write_kv_and_features_to_config_store as write_kvs_to_config_store,
+    __write_kvs_concurrently as write_kvs_concurrently)
+
+CONNECTION_STRING = 'Endpoint=https://teststore.azconfig.io;Id=0-l0-s0:id;Secret=c2VjcmV0'
+KV_HELPERS = 'azure.cli.command_modules.appconfig._kv_helpers.'
+KEYVALUE = 'azure.cli.command_modules.appconfig.keyvalue.'
+
+
+def _kv(key, value, label=None, etag=None):
+    kv = KeyValue(key, value=value, label=label)
+    kv.etag = etag
+    return kv
+
+
+def _response(status_code=200, headers=None, json_body=None):
+    response = mock.MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = json_body or {'key': 'key', 'value': 'value', 'etag': 'etag'}
+    return response
+
+
+class _FakeAzconfigClient(object):
+    """A configuration store whose key-values are changed in order, one per second. """
+
+    def __init__(self):
+        self.kvs = {}
+        self.revisions = []
+        self.get_keyvalue_calls = []
+        self._time = 0
+
+    def set(self, key, value, label=None, record_revision=True):
+        self._time += 1
+        kv = _kv(key, value, label=label, etag='etag{}'.format(self._time))
+        kv.last_modified = '2020-01-01T00:00:{:02d}+00:00'.format(self._time)
+        self.kvs[(key, label)] = kv
+        if record_revision:
+            self.revisions.insert(0, copy.copy(kv))
+
+    def delete(self, key, label=None):
+        del self.kvs[(key, label)]
+
+    def get_keyvalues(self, _):
+        return [copy.copy(kv) for _, kv in sorted(self.kvs.items())]
+
+    def read_keyvalue_revisions(self, _):
+        return iter(copy.copy(kv) for kv in self.revisions)
+
+    def get_keyvalue(self, key, query_options):
+        label = None if query_options.label == QueryKeyValueOptions.empty_label else query_options.label
+        self.get_keyvalue_calls.append((key, label))
+        kv = self.kvs.get((key, label), None)
+        return copy.copy(kv) if kv else None
+
+
+class AppConfigKeyValueSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx.config.config_dir = self.config_dir
+        self.client = _FakeAzconfigClient()
+        self.client.set('color', 'red')
+        self.client.set('size', 'large')
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def _sync(self):
+        kv_sync = KeyValueSync(self.cmd, CONNECTION_STRING, key=None, label=None,
+                               destination={'destination': 'file', 'path': 'appsettings.json'})
+        key_values, changed_kvs, deleted_kvs = kv_sync.read(self.client)
+        kv_sync.save()
+        return kv_sync, key_values, changed_kvs, deleted_kvs
+
+    @staticmethod
+    def _values(key_values):
+        return sorted((kv.key, kv.value) for kv in key_values)
+
+    def test_first_sync_reads_all_keys(self):
+        kv_sync, key_values, changed_kvs, deleted_kvs = self._sync()
+        self.assertFalse(kv_sync.synced_before)
+        self.assertEqual(self._values(key_values), [('color', 'red'), ('size', 'large')])
+        self.assertEqual(self._values(changed_kvs), [('color', 'red'), ('size', 'large')])
+        self.assertEqual(deleted_kvs, [])
+
+        # the unchanged key-values are taken from the previous sync
+        kv_sync, key_values, changed_kvs, deleted_kvs = self._sync()
+        self.assertTrue(kv_sync.synced_before)
+        self.assertEqual(self._values(key_values), [('color', 'red'), ('size', 'large')])
+        self.assertEqual((changed_kvs, deleted_kvs), ([], []))
+        self.assertEqual(self.client.get_keyvalue_calls, [])
+
+    def test_sync_reads_changed_key_from_revisions(self):
+        self._sync()
+        self.client.set('color', 'blue')
+
+        _, key_values, changed_kvs, deleted_kvs = self._sync()
+        self.assertEqual(self._values(key_values), [('color', 'blue'), ('size', 'large')])
+        self.assertEqual(self._values(changed_kvs), [('color', 'blue')])
+        self.assertEqual(deleted_kvs, [])
+        self.assertEqual(self.client.get_keyvalue_calls, [])
+
+    def test_sync_reports_deleted_key(self):
+        self._sync()
+        self.client.delete('size')
+
+        _, key_values, changed_kvs, deleted_kvs = self._sync()
+        self.assertEqual(self._values(key_values), [('color', 'red')])
+        self.assertEqual(changed_kvs, [])
+        self.assertEqual(self._values(deleted_kvs), [('size', 'large')])
+
+    def test_sync_gets_changed_key_missing_from_revisions(self):
+        self._sync()
+        self.client.set('color', 'blue', record_revision=False)
+
+        _, key_values, changed_kvs, _ = self._sync()
+        self.assertEqual(self._values(key_values), [('color', 'blue'), ('size', 'large')])
+        self.assertEqual(self._values(changed_kvs), [('color', 'blue')])
+        self.assertEqual(self.client.get_keyvalue_calls, [('color', None)])
+
+
+class AppConfigIncrementalExportTest(unittest.TestCase):
+
+    @mock.patch(KEYVALUE + '__write_kv_and_features_to_config_store')
+    @mock.patch(KEYVALUE + '__read_kv_changes_from_config_store')
+    def test_export_writes_only_changes_before_saving_sync(self, read_changes_mock, write_mock):
+        unchanged_kv, changed_kv, deleted_kv = _kv('size', 'large'), _kv('color', 'blue'), _kv('shape', 'round')
+        kv_sync = mock.MagicMock(synced_before=True)
+        read_changes_mock.return_value = ([unchanged_kv, changed_kv], [changed_kv], [deleted_kv], kv_sync)
+        calls = mock.MagicMock()
+        calls.attach_mock(write_mock, 'write')
+        calls.attach_mock(kv_sync.save, 'save')
+
+        export_config(mock.MagicMock(), 'appconfig', connection_string=CONNECTION_STRING, yes=True,
+                      skip_features=True, dest_connection_string=CONNECTION_STRING, incremental=True)
+
+        write_mock.assert_called_once_with(mock.ANY, key_values=[changed_kv], name=None,
+                                           connection_string=CONNECTION_STRING, label=None, preserve_labels=False,
+                                           kvs_to_delete=[deleted_kv], skip_unchanged=False)
+        self.assertEqual([c[0] for c in calls.mock_calls], ['write', 'save'])
+
+    @mock.patch(KEYVALUE + '__write_kv_and_features_to_config_store')
+    @mock.patch(KEYVALUE + '__read_kv_changes_from_config_store')
+    def test_export_does_not_save_sync_when_write_fails(self, read_changes_mock, write_mock):
+        kv_sync = mock.MagicMock(synced_before=True)
+        read_changes_mock.return_value = ([], [_kv('color', 'blue')], [], kv_sync)
+        write_mock.side_effect = CLIError('Failed to write key')
+
+        with self.assertRaises(CLIError):
+            export_config(mock.MagicMock(), 'appconfig', connection_string=CONNECTION_STRING, yes=True,
+                          skip_features=True, dest_connection_string=CONNECTION_STRING, incremental=True)
+        kv_sync.save.assert_not_called()
+
+
+class AppConfigWriteKeyValuesTest(unittest.TestCase):
+
+    @mock.patch(KV_HELPERS + 'AzconfigClient', autospec=True)
+    @mock.patch(KV_HELPERS + 'resolve_connection_string', return_value=CONNECTION_STRING)
+    @mock.patch(KV_HELPERS + '__read_kv_from_config_store')
+    def test_write_skips_unchanged_keys(self, read_mock, _, client_mock):
+        read_mock.return_value = [_kv('unchanged', 'same', etag='etag1'), _kv('changed', 'old', etag='etag2')]
+        client = client_mock.return_value
+
+        key_values = [_kv('unchanged', 'same'), _kv('changed', 'new'), _kv('new', 'value')]
+        write_kvs_to_config_store(mock.MagicMock(), key_values, connection_string=CONNECTION_STRING)
+
+        # existing keys are only updated if their ETag is unchanged since read, and new keys only added if still missing
+        client.set_keyvalue.assert_not_called()
+        self.assertEqual([(c[0][0].key, c[0][0].etag) for c in client.update_keyvalue.call_args_list],
+                         [('changed', 'etag2')])
+        self.assertEqual([c[0][0].key for c in client.add_keyvalue.call_args_list], ['new'])
+
+    @mock.patch(KV_HELPERS + 'AzconfigClient', autospec=True)
+    @mock.patch(KV_HELPERS + 'resolve_connection_string', return_value=CONNECTION_STRING)
+    @mock.patch(KV_HELPERS + '__read_kv_from_config_store')
+    def test_write_reports_key_modified_concurrently(self, read_mock, _, client_mock):
+        read_mock.return_value = [_kv('color', 'red', label='prod', etag='etag1')]
+        client_mock.return_value.update_keyvalue.side_effect = HTTPException(412, 'Precondition Failed', {}, b'')
+
+        with self.assertRaises(CLIError) as context:
+            write_kvs_to_config_store(mock.MagicMock(), [_kv('color', 'blue')], connection_string=CONNECTION_STRING,
+                                      label='prod')
+        self.assertEqual(str(context.exception),
+                         "Key 'color' with label 'prod' was modified in the configuration store while being written. "
+                         "Please try again.")
+
+        client_mock.return_value.update_keyvalue.side_effect = ValueError('Etag of the keyvalue cannot be null')
+        with self.assertRaises(CLIError) as context:
+            write_kvs_to_config_store(mock.MagicMock(), [_kv('color', 'blue')], connection_string=CONNECTION_STRING,
+                                      label='prod')
+        self.assertIn('was modified in the configuration store', str(context.exception))
+
+        read_mock.return_value = []
+        client_mock.return_value.add_keyvalue.side_effect = HTTPException(500, 'Internal Server Error', {}, b'')
+        with self.assertRaises(CLIError) as context:
+            write_kvs_to_config_store(mock.MagicMock(), [_kv('color', 'blue')], connection_string=CONNECTION_STRING)
+        self.assertIn("Failed to write key 'color': Status code: 500", str(context.exception))
+
+    def test_write_cancels_pending_writes_after_failure(self):
+        release = threading.Event()
+        client = mock.MagicMock()
+
+        def _set_keyvalue(kv, _):
+            if kv.key == 'key0':
+                raise HTTPException(500, 'Internal Server Error', {}, b'')
+            release.wait(1)
+
+        client.set_keyvalue.side_effect = _set_keyvalue
+        kvs = [_kv('key{}'.format(i), 'value') for i in range(100)]
+
+        threading.Timer(0.2, release.set).start()
+        written, failed_kv, error = write_kvs_concurrently(client, kvs)
+
+        self.assertEqual(failed_kv.key, 'key0')
+        self.assertEqual(error.status, 500)
+        # only the writes already in flight when the first one failed complete
+        self.assertLessEqual(client.set_keyvalue.call_count, MAX_CONCURRENT_WRITES + 1)
+        self.assertEqual(written, client.set_keyvalue.call_count - 1)
+
+    def test_write_sends_conditional_headers(self):
+        client = AzconfigClient(CONNECTION_STRING)
+        client._request_handler = mock.MagicMock()
+        client._request_handler.execute.return_value = _response()
+
+        client.add_keyvalue(_kv('new', 'value'))
+        headers = client._request_handler.execute.call_args[0][0].headers
+        self.assertEqual(headers['If-None-Match'], '"*"')
+        self.assertNotIn('If-Match', headers)
+
+        client.update_keyvalue(_kv('existing', 'value', etag='etag1'))
+        headers = client._request_handler.execute.call_args[0][0].headers
+        self.assertEqual(headers['If-Match'], '"etag1"')
+        self.assertNotIn('If-None-Match', headers)
+
+
+class AppConfigRequestHandlerTest(unittest.TestCase):
+
+    def test_throttling_pauses_all_requests(self):
+        handler = RequestHandler(CONNECTION_STRING, ClientOptions())
+        paused = threading.Event()
+        lock = threading.Lock()
+        pause = handler._pause
+
+        def _pause(seconds):
+            pause(seconds)
+            paused.set()
+        sent = []
+
+        def _request(*args, **kwargs):
+            with lock:
+                sent.append(time.time())
+                if len(sent) > 1:
+                    return _response()
+            return _response(429, headers={'retry-after-ms': '300'})
+
+        handler._pause = _pause
+        session = mock.MagicMock()
+        session.request.side_effect = _request
+
+        def _execute():
+            handler.execute(RequestMessage('GET', {}, 'https://teststore.azconfig.io/kv', ''), session)
+
+        first = threading.Thread(target=_execute)
+        first.start()
+        paused.wait(1)
+        # the request sent while the first one is throttled waits until the pause is over as well
+        _execute()
+        first.join()
+
+        self.assertEqual(len(sent), 3)
+        self.assertGreaterEqual(min(sent[1:]) - sent[0], 0.29)
+
+    def test_wait_until_resumed_waits_for_the_latest_pause(self):
+        handler = RequestHandler(CONNECTION_STRING, ClientOptions())
+        start = time.time()
+        handler._pause(0.2)
+        handler._pause(0.1)
+        handler._wait_until_resumed()
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+
+if __name__ == '__main__':
+    unittest.main()
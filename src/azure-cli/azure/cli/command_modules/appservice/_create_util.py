@@ -28,29 +28,103 @@ def web_client_factory(cli_ctx, **_):
     return get_mgmt_service_client(cli_ctx, WebSiteManagementClient)
 
 
-def zip_contents_from_dir(dirPath, lang):
-    relroot = os.path.abspath(os.path.join(dirPath, os.pardir))
-    path_and_file = os.path.splitdrive(dirPath)[1]
-    file_val = os.path.split(path_and_file)[1]
-    zip_file_path = relroot + os.path.sep + file_val + ".zip"
+def zip_contents_from_dir(dirPath, lang, zip_file_path=None, incremental=False):
+    """Zip the contents of the directory. When incremental, the entries of the previous zip at zip_file_path whose
+    file has the same size, modification time and mode are copied without compressing the file again.
+    """
+    if zip_file_path is None:
+        relroot = os.path.abspath(os.path.join(dirPath, os.pardir))
+        path_and_file = os.path.splitdrive(dirPath)[1]
+        file_val = os.path.split(path_and_file)[1]
+        zip_file_path = relroot + os.path.sep + file_val + ".zip"
     abs_src = os.path.abspath(dirPath)
-    with zipfile.ZipFile("{}".format(zip_file_path), "w", zipfile.ZIP_DEFLATED) as zf:
-        for dirname, subdirs, files in os.walk(dirPath):
-            # skip node_modules folder for Node apps,
-            # since zip_deployment will perform the build operation
-            if lang.lower() == NODE_RUNTIME_NAME:
-                subdirs[:] = [d for d in subdirs if 'node_modules' not in d]
-            elif lang.lower() == NETCORE_RUNTIME_NAME:
-                subdirs[:] = [d for d in subdirs if d not in ['obj', 'bin']]
-            elif lang.lower() == PYTHON_RUNTIME_NAME:
-                subdirs[:] = [d for d in subdirs if 'env' not in d]  # Ignores dir that contain env
-            for filename in files:
-                absname = os.path.abspath(os.path.join(dirname, filename))
-                arcname = absname[len(abs_src) + 1:]
-                zf.write(absname, arcname)
+    previous_zip = None
+    if incremental and os.path.isfile(zip_file_path):
+        try:
+            previous_zip = zipfile.ZipFile(zip_file_path, "r")
+        except (zipfile.BadZipfile, IOError, OSError) as ex:
+            logger.warning("Unable to reuse the previous zip file '%s': %s", zip_file_path, ex)
+    new_zip_file_path = zip_file_path + ".tmp" if previous_zip else zip_file_path
+    reused = 0
+    try:
+        with zipfile.ZipFile("{}".format(new_zip_file_path), "w", zipfile.ZIP_DEFLATED) as zf:
+            for dirname, subdirs, files in os.walk(dirPath):
+                # skip node_modules folder for Node apps,
+                # since zip_deployment will perform the build operation
+                if lang.lower() == NODE_RUNTIME_NAME:
+                    subdirs[:] = [d for d in subdirs if 'node_modules' not in d]
+                elif lang.lower() == NETCORE_RUNTIME_NAME:
+                    subdirs[:] = [d for d in subdirs if d not in ['obj', 'bin']]
+                elif lang.lower() == PYTHON_RUNTIME_NAME:
+                    subdirs[:] = [d for d in subdirs if 'env' not in d]  # Ignores dir that contain env
+                for filename in files:
+                    absname = os.path.abspath(os.path.join(dirname, filename))
+                    arcname = absname[len(abs_src) + 1:]
+                    previous_info = _get_unchanged_zip_entry(previous_zip, absname, arcname)
+                    if previous_info:
+                        _copy_zip_entry(previous_zip, zf, previous_info)
+                        reused += 1
+                    else:
+                        zf.write(absname, arcname)
+    finally:
+        if previous_zip:
+            previous_zip.close()
+    if previous_zip:
+        logger.warning("Reused %d unchanged files from the previous zip file", reused)
+        os.remove(zip_file_path)
+        os.rename(new_zip_file_path, zip_file_path)
     return zip_file_path
 
 
+def _get_unchanged_zip_entry(previous_zip, absname, arcname):
+    import time
+    if previous_zip is None:
+        return None
+    try:
+        info = previous_zip.getinfo(arcname.replace(os.sep, '/'))
+    except KeyError:
+        return None
+    st = os.stat(absname)
+    date_time = time.localtime(st.st_mtime)[0:6]
+    # zip files store the modification time in 2 seconds precision
+    date_time = date_time[0:5] + (date_time[5] // 2 * 2,)
+    # skip the encrypted entries and the ones followed by a data descriptor
+    if info.flag_bits & 0x09 or info.file_size != st.st_size or info.date_time != date_time or \
+            info.external_attr >> 16 != st.st_mode & 0xFFFF:
+        return None
+    return info
+
+
+def _copy_zip_entry(source, target, info):
+    """Copy the compressed data of an entry from a zip file to another, without decompressing it. """
+    import struct
+    source.fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, source.fp.read(zipfile.sizeFileHeader))
+    # skip the file name and the extra field following the local file header
+    source.fp.seek(header[10] + header[11], os.SEEK_CUR)
+
+    zinfo = zipfile.ZipInfo(info.filename, info.date_time)
+    zinfo.compress_type = info.compress_type
+    zinfo.external_attr = info.external_attr
+    zinfo.CRC = info.CRC
+    zinfo.compress_size = info.compress_size
+    zinfo.file_size = info.file_size
+    zinfo.header_offset = target.fp.tell()
+    target.fp.write(zinfo.FileHeader())
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = source.fp.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise zipfile.BadZipfile("Truncated entry '{}'".format(info.filename))
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+    target.filelist.append(zinfo)
+    target.NameToInfo[zinfo.filename] = zinfo
+    # where the central directory is written when the zip file is closed
+    target.start_dir = target.fp.tell()
+    target._didModify = True  # pylint: disable=protected-access
+
+
 def get_runtime_version_details(file_path, lang_name):
     version_detected = None
     version_to_create = None
@@ -1645,7 +1645,14 @@ examples:
 helps['webapp log tail'] = """
 type: command
 short-summary: Start live log tracing for a web app.
-long-summary: This command may not work with web apps running on Linux.
+long-summary: >
+    This command may not work with web apps running on Linux. When the logs of several instances or apps (with --ids)
+    are streamed, their lines are merged by timestamp and prefixed with the app and instance they come from.
+examples:
+  - name: Stream the errors logged by every instance of a scaled-out web app.
+    text: az webapp log tail -n MyWebapp -g MyResourceGroup --all-instances --filter "(?i)error"
+  - name: Stream the logs of two web apps to a file rotated every 10 MB.
+    text: az webapp log tail --ids {webappId1} {webappId2} --log-file webapp.log --max-file-size 10
 """
 
 helps['webapp restart'] = """
@@ -1751,6 +1758,9 @@ examples:
   - name: Create a web app and deploy as a static HTML app.
     text: >
         az webapp up -n MyUniqueAppName --html
+  - name: Deploy new code to an app, compressing only the files changed since the previous deployment.
+    text: >
+        az webapp up -n MyUniqueAppName --incremental
 """
 
 helps['webapp update'] = """
@@ -0,0 +1,182 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import codecs
+import heapq
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+
+from six.moves.queue import Queue, Empty
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# how long the lines are held to be merged with the lines of the other sources by timestamp
+MERGE_DELAY = 1.0
+# the lines buffered between the streams and the output, beyond which the streams wait for the output
+MAX_BUFFERED_LINES = 10000
+DEFAULT_MAX_FILE_SIZE = 100 * 1024 * 1024
+MAX_FILE_BACKUPS = 5
+
+_TIMESTAMP_RE = re.compile(r'^(\d{4}-\d{2}-\d{2})[T ](\d{2}:\d{2}:\d{2})(?:\.(\d+))?')
+
+
+def open_log_stream(url, user_name, password, instance=None):
+    import certifi
+    import urllib3
+    from knack.util import CLIError
+    try:
+        import urllib3.contrib.pyopenssl
+        urllib3.contrib.pyopenssl.inject_into_urllib3()
+    except ImportError:
+        pass
+
+    http = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+    headers = urllib3.util.make_headers(basic_auth='{0}:{1}'.format(user_name, password))
+    if instance:
+        # the ARR affinity cookie routes the request to a specific instance of a scaled-out app
+        headers['Cookie'] = 'ARRAffinity={}'.format(instance)
+    r = http.request(
+        'GET',
+        url,
+        headers=headers,
+        preload_content=False
+    )
+    if r.status != 200:
+        raise CLIError("Failed to connect to '{}' with status code '{}' and reason '{}'".format(
+            url, r.status, r.reason))
+    return r
+
+
+def _get_timestamp(line):
+    match = _TIMESTAMP_RE.match(line)
+    if not match:
+        return None
+    # pad the fraction so that the timestamps compare as strings
+    return '{} {}.{}'.format(match.group(1), match.group(2), (match.group(3) or '').ljust(7, '0')[:7])
+
+
+class LogTail(object):
+    """Follows the log streams of several apps, slots or instances concurrently. When there are several streams,
+    their lines are held for MERGE_DELAY seconds to print them in timestamp order, prefixed with their source.
+    Lines not matching the filter are dropped before being buffered.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, line_filter=None, log_file=None, max_file_size=DEFAULT_MAX_FILE_SIZE):
+        self.line_filter = re.compile(line_filter) if line_filter else None
+        self.lines = Queue(maxsize=MAX_BUFFERED_LINES)
+        self.sources = 0
+        self.apps = set()
+        self.sequence = itertools.count()
+        self.output = _RotatingFile(log_file, max_file_size) if log_file else None
+
+    @classmethod
+    def get_shared(cls, **kwargs):
+        """The tail shared by the apps of --ids, whose commands run one after the other or concurrently. """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(**kwargs)
+            return cls._shared
+
+    def add_app(self, app, app_count):
+        """Records an app as registered, whether its sources could be added or not. Returns whether it is the last of
+        the app_count apps, which then runs the tail for all of them, so that the apps are registered without blocking
+        however the commands of --ids are scheduled.
+        """
+        with self._shared_lock:
+            self.apps.add(app)
+            if len(self.apps) < app_count:
+                return False
+            if LogTail._shared is self:
+                LogTail._shared = None
+            return True
+
+    def add_source(self, label, url, user_name, password, instance=None):
+        t = threading.Thread(target=self._read, args=(label, url, user_name, password, instance))
+        t.daemon = True
+        t.start()
+        with self._shared_lock:
+            self.sources += 1
+
+    def _read(self, label, url, user_name, password, instance):
+        try:
+            r = open_log_stream(url, user_name, password, instance)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning("Failed to stream the logs of %s: %s", label, ex)
+            return
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ''
+        timestamp = ''
+        try:
+            for chunk in r.stream():
+                lines = (pending + decoder.decode(chunk)).split('\n')
+                pending = lines.pop()
+                for line in lines:
+                    # lines without a timestamp, e.g. stack traces, stay after the line they continue
+                    timestamp = _get_timestamp(line) or timestamp
+                    if not self.line_filter or self.line_filter.search(line):
+                        self.lines.put((timestamp, next(self.sequence), time.time(), label, line.rstrip('\r')))
+        finally:
+            r.release_conn()
+        logger.warning("The log stream of %s ended", label)
+
+    def run(self):
+        """Print the lines until interrupted. """
+        merged = []
+        while True:
+            try:
+                item = self.lines.get(timeout=0.2)
+                heapq.heappush(merged, item)
+                while len(merged) < MAX_BUFFERED_LINES:
+                    heapq.heappush(merged, self.lines.get_nowait())
+            except Empty:
+                pass
+            delay = MERGE_DELAY if self.sources > 1 else 0
+            now = time.time()
+            batch = []
+            while merged and (merged[0][2] + delay <= now or len(merged) >= MAX_BUFFERED_LINES):
+                _, _, _, label, line = heapq.heappop(merged)
+                batch.append('[{}] {}'.format(label, line) if self.sources > 1 else line)
+            if batch:
+                self._write('\n'.join(batch) + '\n')
+
+    def _write(self, text):
+        if self.output:
+            self.output.write(text)
+            return
+        # write the encoded text at once, replacing the characters stdout can't encode
+        encoding = sys.stdout.encoding or 'utf-8'
+        out = getattr(sys.stdout, 'buffer', sys.stdout)
+        out.write(text.encode(encoding, 'replace'))
+        out.flush()
+
+
+class _RotatingFile(object):
+    """Writes to a file which is rotated to file.1 ... file.N when it exceeds max_size bytes. """
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self.file = open(path, 'ab')
+
+    def write(self, text):
+        self.file.write(text.encode('utf-8'))
+        self.file.flush()
+        if self.file.tell() >= self.max_size:
+            self.file.close()
+            for index in range(MAX_FILE_BACKUPS - 1, 0, -1):
+                if os.path.exists('{}.{}'.format(self.path, index)):
+                    if os.path.exists('{}.{}'.format(self.path, index + 1)):
+                        os.remove('{}.{}'.format(self.path, index + 1))
+                    os.rename('{}.{}'.format(self.path, index), '{}.{}'.format(self.path, index + 1))
+            os.rename(self.path, '{}.1'.format(self.path))
+            self.file = open(self.path, 'ab')
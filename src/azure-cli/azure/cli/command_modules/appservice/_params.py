@@ -298,6 +298,12 @@ def load_arguments(self, _):
 
     with self.argument_context('webapp log tail') as c:
         c.argument('provider', help="By default all live traces configured by `az webapp log config` will be shown, but you can scope to certain providers/folders, e.g. 'application', 'http', etc. For details, check out https://github.com/projectkudu/kudu/wiki/Diagnostic-Log-Stream")
+        c.argument('instances', options_list=['--instance'], action='append', help="The ID of a scaled-out instance to stream the logs of. Multiple instances supported by passing --instance multiple times.")
+        c.argument('all_instances', action='store_true', help="Stream the logs of every instance of the app concurrently.")
+        c.argument('log_filter', options_list=['--filter'], help="Only show the lines matching this regular expression.")
+        c.argument('log_file', help="Write the logs to this file instead of the console, rotating it when it exceeds --max-file-size.")
+        c.argument('max_file_size', type=int, help="The size in MB beyond which the log file is rotated. Default: 100.")
+        c.ignore('app_count')
 
     with self.argument_context('webapp log download') as c:
         c.argument('log_file', default='webapp_logs.zip', type=file_type, completer=FilesCompleter(), help='the downloaded zipped log file path')
@@ -421,6 +427,7 @@ def load_arguments(self, _):
         c.argument('launch_browser', help="Launch the created app using the default browser", default=False, action='store_true', options_list=['--launch-browser', '-b'])
         c.argument('logs', help="Configure default logging required to enable viewing log stream immediately after launching the webapp", default=False, action='store_true')
         c.argument('html', help="Ignore app detection and deploy as an html app", default=False, action='store_true')
+        c.argument('incremental', help="Keep the zip of the deployed contents in the CLI config directory, and only compress the files changed since the previous deployment from the same folder", default=False, action='store_true')
 
     with self.argument_context('webapp ssh') as c:
         c.argument('port', options_list=['--port', '-p'],
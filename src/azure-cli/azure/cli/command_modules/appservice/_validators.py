@@ -97,6 +97,12 @@ def validate_app_or_slot_exists_in_rg(cmd, namespace):
         raise CLIError(app.response.text)
 
 
+def validate_log_tail(cmd, namespace):
+    validate_app_or_slot_exists_in_rg(cmd, namespace)
+    # the commands of the apps of --ids register their logs with a shared tail, which the last one runs
+    namespace.app_count = len(getattr(namespace, '_ids', None) or []) or 1
+
+
 def validate_app_exists_in_rg(cmd, namespace):
     client = web_client_factory(cmd.cli_ctx)
     webapp = namespace.name
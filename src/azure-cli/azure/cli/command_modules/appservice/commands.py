@@ -8,7 +8,8 @@ from azure.cli.core.commands import CliCommandType
 from azure.cli.core.util import empty_on_404
 
 from ._client_factory import cf_web_client, cf_plans, cf_webapps
-from ._validators import validate_app_exists_in_rg, validate_app_or_slot_exists_in_rg, validate_asp_sku
+from ._validators import (validate_app_exists_in_rg, validate_app_or_slot_exists_in_rg, validate_asp_sku,
+                          validate_log_tail)
 
 
 def output_slots_in_table(slots):
@@ -178,7 +179,7 @@ def load_command_table(self, _):
         g.custom_command('update-token', 'update_git_token', exception_handler=ex_handler_factory())
 
     with self.command_group('webapp log') as g:
-        g.custom_command('tail', 'get_streaming_log', validator=validate_app_or_slot_exists_in_rg)
+        g.custom_command('tail', 'get_streaming_log', validator=validate_log_tail)
         g.custom_command('download', 'download_historical_logs')
         g.custom_command('config', 'config_diagnostics', validator=validate_app_or_slot_exists_in_rg)
         g.custom_show_command('show', 'show_diagnostic_settings', validator=validate_app_or_slot_exists_in_rg)
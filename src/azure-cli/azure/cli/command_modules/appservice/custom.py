@@ -62,6 +62,9 @@ from ._constants import (RUNTIME_TO_DEFAULT_VERSION, NODE_VERSION_DEFAULT_FUNCTI
 
 logger = get_logger(__name__)
 
+ZIP_DEPLOY_RETRIES = 3
+ZIP_DEPLOY_RETRY_DELAY = 5  # seconds
+
 # pylint:disable=no-member,too-many-lines,too-many-locals
 
 # region "Common routines shared with quick-start extensions."
@@ -356,18 +359,17 @@ def enable_zip_deploy(cmd, resource_group_name, name, src, timeout=None, slot=No
     headers['content-type'] = 'application/octet-stream'
     headers['User-Agent'] = UA_AGENT
 
-    import requests
     import os
-    from azure.cli.core.util import should_disable_connection_verify
-    # Read file content
-    with open(os.path.realpath(os.path.expanduser(src)), 'rb') as fs:
-        zip_content = fs.read()
-        logger.warning("Starting zip deployment. This operation can take a while to complete ...")
-        res = requests.post(zip_url, data=zip_content, headers=headers, verify=not should_disable_connection_verify())
-        logger.warning("Deployment endpoint responded with status code %d", res.status_code)
-
+    logger.warning("Starting zip deployment. This operation can take a while to complete ...")
+    res, retried = _post_zip_with_retry(cmd, zip_url, os.path.realpath(os.path.expanduser(src)), headers)
+    logger.warning("Deployment endpoint responded with status code %d", res.status_code)
+
+    # a conflict after a failed attempt is likely the deployment started by that attempt, whose response was lost
+    if res.status_code == 409 and retried:
+        logger.warning("A deployment is already in progress, which may have been started by the failed attempt. "
+                       "Tracking the latest deployment ...")
     # check if there's an ongoing process
-    if res.status_code == 409:
+    elif res.status_code == 409:
         raise CLIError("There may be an ongoing deployment or your app setting has WEBSITE_RUN_FROM_PACKAGE. "
                        "Please track your deployment in {} and ensure the WEBSITE_RUN_FROM_PACKAGE app setting "
                        "is removed.".format(deployment_status_url))
@@ -378,6 +380,68 @@ def enable_zip_deploy(cmd, resource_group_name, name, src, timeout=None, slot=No
     return response
 
 
+def _post_zip_with_retry(cmd, zip_url, zip_path, headers, retries=ZIP_DEPLOY_RETRIES):
+    """Upload the zip file from disk without loading it in memory, retrying the upload on connection errors and
+    server errors. Kudu doesn't accept partial uploads, so each attempt sends the whole file again.
+    """
+    import requests
+    from azure.cli.core.util import should_disable_connection_verify
+    for attempt in range(retries):
+        last_attempt = attempt + 1 >= retries
+        try:
+            with open(zip_path, 'rb') as fs:
+                data = _ProgressFileReader(fs, _get_upload_progress_callback(cmd, 'Uploading'))
+                res = requests.post(zip_url, data=data, headers=headers, verify=not should_disable_connection_verify())
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as ex:
+            if last_attempt:
+                raise CLIError("Failed to upload the zip file: {}".format(ex))
+            logger.warning("Failed to upload the zip file: %s. Retrying ...", ex)
+        else:
+            if res.status_code < 500 or last_attempt:
+                return res, attempt > 0
+            logger.warning("Deployment endpoint responded with status code %d. Retrying ...", res.status_code)
+        time.sleep(ZIP_DEPLOY_RETRY_DELAY * 2 ** attempt)
+    raise CLIError("Failed to upload the zip file.")
+
+
+class _ProgressFileReader(object):  # pylint: disable=too-few-public-methods
+    """Reads a file for a streamed request body, reporting the progress of the reads. """
+
+    def __init__(self, stream, progress_callback):
+        import os
+        self.stream = stream
+        self.progress_callback = progress_callback
+        self.total = os.fstat(stream.fileno()).st_size
+        self.current = 0
+        self.reported = 0
+
+    def __len__(self):
+        return self.total
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.current += len(data)
+        # report every 0.1% rather than on each read of a few KiB
+        if self.current == self.total or (self.current - self.reported) * 1000 >= self.total:
+            self.reported = self.current
+            self.progress_callback(self.current, self.total)
+        return data
+
+
+def _get_upload_progress_callback(cmd, action):
+    # https://gist.github.com/vladignatyev/06860ec2040cb497f0f3
+    def progress_callback(current, total):
+        if not total:
+            return
+        total_length = 30
+        filled_length = int(round(total_length * current) / float(total))
+        percents = round(100.0 * current / float(total), 1)
+        progress_bar = '=' * filled_length + '-' * (total_length - filled_length)
+        progress_message = '{} {} {}%'.format(action, progress_bar, percents)
+        cmd.cli_ctx.get_progress_controller().add(message=progress_message)
+    return progress_callback
+
+
 def add_remote_build_app_settings(cmd, resource_group_name, name, slot):
     settings = get_app_settings(cmd, resource_group_name, name, slot)
     enable_oryx_build = None
@@ -448,17 +512,8 @@ def upload_zip_to_storage(cmd, resource_group_name, name, src, slot=None):
     if not block_blob_service.exists(container_name):
         block_blob_service.create_container(container_name)
 
-    # https://gist.github.com/vladignatyev/06860ec2040cb497f0f3
-    def progress_callback(current, total):
-        total_length = 30
-        filled_length = int(round(total_length * current) / float(total))
-        percents = round(100.0 * current / float(total), 1)
-        progress_bar = '=' * filled_length + '-' * (total_length - filled_length)
-        progress_message = 'Uploading {} {}%'.format(progress_bar, percents)
-        cmd.cli_ctx.get_progress_controller().add(message=progress_message)
-
     block_blob_service.create_blob_from_path(container_name, blob_name, src, validate_content=True,
-                                             progress_callback=progress_callback)
+                                             progress_callback=_get_upload_progress_callback(cmd, 'Uploading'))
 
     now = datetime.datetime.now()
     blob_start = now - datetime.timedelta(minutes=10)
@@ -1916,19 +1971,41 @@ def show_cors(cmd, resource_group_name, name, slot=None):
     return configs.cors
 
 
-def get_streaming_log(cmd, resource_group_name, name, provider=None, slot=None):
-    scm_url = _get_scm_url(cmd, resource_group_name, name, slot)
-    streaming_url = scm_url + '/logstream'
-    if provider:
-        streaming_url += ('/' + provider.lstrip('/'))
-
-    user, password = _get_site_credential(cmd.cli_ctx, resource_group_name, name, slot)
-    t = threading.Thread(target=_get_log, args=(streaming_url, user, password))
-    t.daemon = True
-    t.start()
+def get_streaming_log(cmd, resource_group_name, name, provider=None, slot=None, instances=None,
+                      all_instances=False, log_filter=None, log_file=None, max_file_size=None, app_count=1):
+    from ._log_stream import LogTail, DEFAULT_MAX_FILE_SIZE
+    # the apps of --ids share a tail to merge their lines
+    tail = LogTail.get_shared(line_filter=log_filter, log_file=log_file,
+                              max_file_size=(max_file_size or 0) * 1024 * 1024 or DEFAULT_MAX_FILE_SIZE)
+    app, added = (resource_group_name, name, slot), 0
+    try:
+        scm_url = _get_scm_url(cmd, resource_group_name, name, slot)
+        streaming_url = scm_url + '/logstream'
+        if provider:
+            streaming_url += ('/' + provider.lstrip('/'))
+
+        user, password = _get_site_credential(cmd.cli_ctx, resource_group_name, name, slot)
+        if all_instances:
+            instances = [i.name for i in _generic_site_operation(cmd.cli_ctx, resource_group_name, name,
+                                                                 'list_instance_identifiers', slot)]
+
+        label = '{}/{}'.format(name, slot) if slot else name
+        for instance in instances or [None]:
+            tail.add_source('{} {}'.format(label, instance[:8]) if instance else label,
+                            streaming_url, user, password, instance)
+            added += 1
+    except Exception as ex:  # pylint: disable=broad-except
+        # the last app registered still streams the logs of the others
+        if not tail.add_app(app, app_count) or tail.sources <= added:
+            raise
+        logger.warning("Failed to stream the logs of %s: %s", name, ex)
+    else:
+        if not tail.add_app(app, app_count):
+            return
 
-    while True:
-        time.sleep(100)  # so that ctrl+c can stop the command
+    if log_file:
+        logger.warning("Writing the logs to '%s'...", log_file)
+    tail.run()
 
 
 def download_historical_logs(cmd, resource_group_name, name, log_file=None, slot=None):
@@ -1945,41 +2022,15 @@ def _get_site_credential(cli_ctx, resource_group_name, name, slot=None):
     return (creds.publishing_user_name, creds.publishing_password)
 
 
-def _get_log(url, user_name, password, log_file=None):
-    import certifi
-    import urllib3
-    try:
-        import urllib3.contrib.pyopenssl
-        urllib3.contrib.pyopenssl.inject_into_urllib3()
-    except ImportError:
-        pass
-
-    http = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
-    headers = urllib3.util.make_headers(basic_auth='{0}:{1}'.format(user_name, password))
-    r = http.request(
-        'GET',
-        url,
-        headers=headers,
-        preload_content=False
-    )
-    if r.status != 200:
-        raise CLIError("Failed to connect to '{}' with status code '{}' and reason '{}'".format(
-            url, r.status, r.reason))
-    if log_file:  # download logs
-        with open(log_file, 'wb') as f:
-            while True:
-                data = r.read(1024)
-                if not data:
-                    break
-                f.write(data)
-    else:  # streaming
-        std_encoding = sys.stdout.encoding
-        for chunk in r.stream():
-            if chunk:
-                # Extra encode() and decode for stdout which does not surpport 'utf-8'
-                print(chunk.decode(encoding='utf-8', errors='replace')
-                      .encode(std_encoding, errors='replace')
-                      .decode(std_encoding, errors='replace'), end='')  # each line of log has CRLF.
+def _get_log(url, user_name, password, log_file):
+    from ._log_stream import open_log_stream
+    r = open_log_stream(url, user_name, password)
+    with open(log_file, 'wb') as f:
+        while True:
+            data = r.read(1024)
+            if not data:
+                break
+            f.write(data)
     r.release_conn()
 
 
@@ -3001,7 +3052,7 @@ def get_history_triggered_webjob(cmd, resource_group_name, name, webjob_name, sl
 
 
 def webapp_up(cmd, name, resource_group_name=None, plan=None, location=None, sku=None, dryrun=False, logs=False,  # pylint: disable=too-many-statements,
-              launch_browser=False, html=False):
+              launch_browser=False, html=False, incremental=False):
     import os
     AppServicePlan = cmd.get_models('AppServicePlan')
     src_dir = os.getcwd()
@@ -3113,13 +3164,24 @@ def webapp_up(cmd, name, resource_group_name=None, plan=None, location=None, sku
     # Zip contents & Deploy
     logger.warning("Creating zip with contents of dir %s ...", src_dir)
     # zip contents & deploy
-    zip_file_path = zip_contents_from_dir(src_dir, language)
-    enable_zip_deploy(cmd, rg_name, name, zip_file_path)
-    # Remove the file after deployment, handling exception if user removed the file manually
-    try:
-        os.remove(zip_file_path)
-    except OSError:
-        pass
+    if incremental:
+        # keep the zip of each source directory to reuse its unchanged entries in the next deployment
+        import hashlib
+        from knack.util import ensure_dir
+        zip_dir = os.path.join(cmd.cli_ctx.config.config_dir, 'webappUpPackages')
+        ensure_dir(zip_dir)
+        zip_file_path = os.path.join(zip_dir, '{}.zip'.format(
+            hashlib.sha256(os.path.abspath(src_dir).encode('utf-8')).hexdigest()))
+        zip_contents_from_dir(src_dir, language, zip_file_path=zip_file_path, incremental=True)
+        enable_zip_deploy(cmd, rg_name, name, zip_file_path)
+    else:
+        zip_file_path = zip_contents_from_dir(src_dir, language)
+        enable_zip_deploy(cmd, rg_name, name, zip_file_path)
+        # Remove the file after deployment, handling exception if user removed the file manually
+        try:
+            os.remove(zip_file_path)
+        except OSError:
+            pass
 
     if launch_browser:
         logger.warning("Launching app using default browser")
@@ -3198,11 +3260,14 @@ def create_tunnel(cmd, resource_group_name, name, port=None, slot=None, timeout=
 
     logger.warning('Ctrl + C to close')
 
-    if timeout:
-        time.sleep(int(timeout))
-    else:
-        while t.isAlive():
-            time.sleep(5)
+    try:
+        if timeout:
+            time.sleep(int(timeout))
+        else:
+            while t.isAlive():
+                time.sleep(5)
+    finally:
+        logger.info('Tunnel statistics: %s', tunnel_server.get_stats())
 
 
 def create_tunnel_and_session(cmd, resource_group_name, name, port=None, slot=None, timeout=None):
@@ -26,7 +26,11 @@ from azure.cli.command_modules.appservice.custom import (set_deployment_user,
                                                          validate_container_app_create_options,
                                                          restore_deleted_webapp,
                                                          list_snapshots,
-                                                         restore_snapshot)
+                                                         restore_snapshot,
+                                                         enable_zip_deploy)
+from azure.cli.command_modules.appservice._create_util import zip_contents_from_dir
+from azure.cli.command_modules.appservice.tunnel import TunnelServer
+from azure.cli.command_modules.appservice._log_stream import LogTail
 
 # pylint: disable=line-too-long
 from vsts_cd_manager.continuous_delivery_manager import ContinuousDeliveryResult
@@ -310,6 +314,38 @@ class TestWebappMocked(unittest.TestCase):
             # assert
             site_op_mock.assert_called_with(cli_ctx_mock, 'rg', 'web1', 'list_publishing_credentials', None)
 
+    @mock.patch('azure.cli.command_modules.appservice._log_stream.LogTail.run', autospec=True)
+    @mock.patch('azure.cli.command_modules.appservice._log_stream.LogTail.add_source', autospec=True)
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_site_credential', autospec=True)
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_scm_url', autospec=True)
+    def test_log_stream_runs_once_all_ids_registered(self, get_scm_url_mock, get_site_credential_mock,
+                                                     add_source_mock, run_mock):
+        def _get_scm_url(cmd, resource_group_name, name, slot=None):
+            if name == 'web2':
+                raise CLIError('web2 not found')
+            return 'https://{}.scm.azurewebsites.net'.format(name)
+
+        def _add_source(tail, label, url, user_name, password, instance=None):
+            tail.sources += 1
+
+        get_scm_url_mock.side_effect = _get_scm_url
+        get_site_credential_mock.return_value = ('usr', 'pwd')
+        add_source_mock.side_effect = _add_source
+        cmd_mock = mock.MagicMock()
+
+        # the commands of --ids run one after the other, so only the last one may block
+        self.assertIsNone(get_streaming_log(cmd_mock, 'rg', 'web1', app_count=3))
+        with self.assertRaises(CLIError):
+            get_streaming_log(cmd_mock, 'rg', 'web2', app_count=3)
+        run_mock.assert_not_called()
+        get_streaming_log(cmd_mock, 'rg', 'web3', app_count=3)
+
+        run_mock.assert_called_once_with(mock.ANY)
+        tail = run_mock.call_args[0][0]
+        self.assertEqual(tail.sources, 2)
+        self.assertEqual([c[0][1] for c in add_source_mock.call_args_list], ['web1', 'web3'])
+        self.assertIsNone(LogTail._shared)
+
     @mock.patch('azure.cli.command_modules.appservice.custom._generic_site_operation', autospec=True)
     def test_restore_deleted_webapp(self, site_op_mock):
         cmd_mock = mock.MagicMock()
@@ -403,6 +439,158 @@ class TestWebappMocked(unittest.TestCase):
         self.assertFalse(validate_container_app_create_options(None, None, test_multi_container_config, None))
         self.assertFalse(validate_container_app_create_options(None, None, None, None))
 
+    @mock.patch('time.sleep')
+    @mock.patch('azure.cli.command_modules.appservice.custom._check_zip_deployment_status', return_value='deployed')
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_scm_url', return_value='https://mysite.scm.azurewebsites.net')
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_site_credential', return_value=('usr', 'pwd'))
+    @mock.patch('requests.post')
+    def test_enable_zip_deploy_retry(self, post_mock, get_site_credential_mock, get_scm_url_mock,
+                                     check_status_mock, sleep_mock):
+        import os
+        import tempfile
+        import requests
+        zip_content = b'zip' * 1000
+        bodies = []
+
+        def _post(url, data, headers, verify):
+            bodies.append((len(data), data.read()))
+            if len(bodies) == 1:
+                raise requests.exceptions.ConnectionError('connection reset')
+            return FakedResponse(409)
+
+        post_mock.side_effect = _post
+        fd, zip_path = tempfile.mkstemp(suffix='.zip')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zip_content)
+
+            # the file is streamed again after a connection error, and the conflict with the deployment
+            # started by the failed attempt is tracked instead of failing
+            self.assertEqual(enable_zip_deploy(_get_test_cmd(), 'rg', 'web1', zip_path), 'deployed')
+            self.assertEqual(bodies, [(len(zip_content), zip_content)] * 2)
+            self.assertEqual(sleep_mock.call_count, 1)
+
+            # a conflict on the first attempt is still an error
+            del bodies[:]
+            bodies.append(None)
+            with self.assertRaises(CLIError):
+                enable_zip_deploy(_get_test_cmd(), 'rg', 'web1', zip_path)
+        finally:
+            os.remove(zip_path)
+
+    def test_zip_contents_from_dir_incremental(self):
+        import os
+        import shutil
+        import tempfile
+        import zipfile
+        src_dir = tempfile.mkdtemp()
+        zip_dir = tempfile.mkdtemp()
+        zip_path = os.path.join(zip_dir, 'app.zip')
+        try:
+            for name, content in [('app.py', 'print(1)'), ('static/site.css', 'body {}')]:
+                if not os.path.isdir(os.path.dirname(os.path.join(src_dir, name))):
+                    os.makedirs(os.path.dirname(os.path.join(src_dir, name)))
+                with open(os.path.join(src_dir, name), 'w') as f:
+                    f.write(content * 100)
+            zip_contents_from_dir(src_dir, 'python', zip_file_path=zip_path, incremental=True)
+            with open(os.path.join(src_dir, 'app.py'), 'w') as f:
+                f.write('print(2)')
+
+            with mock.patch('zipfile.ZipFile.write', side_effect=zipfile.ZipFile.write, autospec=True) as write_mock:
+                zip_contents_from_dir(src_dir, 'python', zip_file_path=zip_path, incremental=True)
+
+            # only the changed file is compressed again
+            self.assertEqual([c[0][2] for c in write_mock.call_args_list], ['app.py'])
+            with zipfile.ZipFile(zip_path) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(zf.read('app.py'), b'print(2)')
+                self.assertEqual(zf.read('static/site.css'), b'body {}' * 100)
+        finally:
+            shutil.rmtree(src_dir, ignore_errors=True)
+            shutil.rmtree(zip_dir, ignore_errors=True)
+
+    @mock.patch('azure.cli.command_modules.appservice.tunnel.create_connection')
+    def test_tunnel_serves_concurrent_connections(self, create_connection_mock):
+        import socket
+        import threading
+        import time
+        try:
+            from queue import Queue
+        except ImportError:
+            from Queue import Queue
+
+        class _EchoWebSocket(object):
+            connected = True
+
+            def __init__(self):
+                self.frames = Queue()
+
+            def send_binary(self, data):
+                self.frames.put(data)
+
+            def recv(self):
+                return self.frames.get()
+
+            def close(self):
+                self.frames.put(b'')
+
+        create_connection_mock.side_effect = lambda *args, **kwargs: _EchoWebSocket()
+        tunnel_server = TunnelServer('127.0.0.1', 0, 'https://mysite.scm.azurewebsites.net', 'usr', 'pwd')
+        t = threading.Thread(target=tunnel_server.start_server)
+        t.daemon = True
+        t.start()
+
+        def _connect():
+            for _ in range(50):
+                try:
+                    return socket.create_connection(('127.0.0.1', tunnel_server.get_port()))
+                except socket.error:  # the server isn't listening yet
+                    time.sleep(0.1)
+            raise AssertionError('Failed to connect to the tunnel')
+
+        # the second connection is served while the first one is still open
+        first = _connect()
+        second = _connect()
+        try:
+            for client, payload in [(second, b'second'), (first, b'first')]:
+                client.sendall(payload)
+                self.assertEqual(client.recv(100), payload)
+            self.assertEqual(tunnel_server.get_stats(), {'activeConnections': 2, 'totalConnections': 2,
+                                                         'bytesSent': 11, 'bytesReceived': 11})
+        finally:
+            first.close()
+            second.close()
+
+    @mock.patch('azure.cli.command_modules.appservice._log_stream.MERGE_DELAY', 0)
+    @mock.patch('azure.cli.command_modules.appservice._log_stream.open_log_stream', autospec=True)
+    def test_log_tail_merges_instances(self, open_log_stream_mock):
+        streams = {
+            'instance1': [b'2020-01-01T00:00:01.5  GET /a 200\r\n2020-01-01T00:00:03  GET /', b'b 500\r\n   at trace\r\n'],
+            'instance2': [b'2020-01-01 00:00:02.1234 ERROR \xc3', b'\xa9chec\r\n2020-01-01 00:00:04 GET /c 200\r\n'],
+        }
+
+        def _open_log_stream(url, user_name, password, instance=None):
+            r = mock.MagicMock()
+            r.stream.return_value = iter(streams[instance])
+            return r
+
+        class _StopTail(Exception):
+            pass
+
+        open_log_stream_mock.side_effect = _open_log_stream
+        tail = LogTail(line_filter='ERROR|500|trace')
+        tail.sources = 2
+        for instance in streams:
+            tail._read('web1 ' + instance, 'https://web1.scm.azurewebsites.net/logstream', 'usr', 'pwd', instance)
+
+        with mock.patch.object(tail, '_write', side_effect=_StopTail) as write_mock:
+            with self.assertRaises(_StopTail):
+                tail.run()
+        write_mock.assert_called_once_with(
+            u'[web1 instance2] 2020-01-01 00:00:02.1234 ERROR \xe9chec\n'
+            u'[web1 instance1] 2020-01-01T00:00:03  GET /b 500\n'
+            u'[web1 instance1]    at trace\n')
+
 
 class FakedResponse(object):  # pylint: disable=too-few-public-methods
     def __init__(self, status_code):
@@ -12,7 +12,7 @@ import traceback
 import logging as logs
 from contextlib import closing
 from datetime import datetime
-from threading import Thread
+from threading import Thread, Lock
 
 import websocket
 from websocket import create_connection, WebSocket
@@ -21,18 +21,17 @@ from knack.util import CLIError
 from knack.log import get_logger
 logger = get_logger(__name__)
 
+# the size of the reads from a local connection grows from the minimum while they fill the buffer
+MIN_FRAME_SIZE = 16 * 1024
+MAX_FRAME_SIZE = 1024 * 1024
+
 
 class TunnelWebSocket(WebSocket):
     def recv_frame(self):
         frame = super(TunnelWebSocket, self).recv_frame()
-        logger.info('Received frame: %s', frame)
+        logger.debug('Received frame: opcode %s, %s bytes', frame.opcode, len(frame.data))
         return frame
 
-    def recv(self):
-        data = super(TunnelWebSocket, self).recv()
-        logger.info('Received websocket data: %s', data)
-        return data
-
 
 # pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
 class TunnelServer(object):
@@ -47,8 +46,11 @@ class TunnelServer(object):
             self.remote_addr = remote_addr
         self.remote_user_name = remote_user_name
         self.remote_password = remote_password
-        self.client = None
-        self.ws = None
+        self._stats_lock = Lock()
+        self.active_connections = 0
+        self.total_connections = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -113,53 +115,73 @@ class TunnelServer(object):
     def _listen(self):
         self.sock.listen(100)
         index = 0
-        basic_auth_string = self.create_basic_auth()
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
+        if is_verbose:
+            logger.info('Websocket tracing enabled')
+            websocket.enableTrace(True)
+        else:
+            logger.info('Websocket tracing disabled, use --verbose flag to enable')
+            websocket.enableTrace(False)
         while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(60 * 60)
-            host = 'wss://{}{}'.format(self.remote_addr, '/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = 'Authorization: Basic {}'.format(basic_auth_string)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.info('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=[basic_auth_header],
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        timeout=60 * 60,
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
+            client, _address = self.sock.accept()
+            client.settimeout(60 * 60)
             index = index + 1
             logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
-            web_socket_thread.start()
-            logger.info('Both debugger and websocket threads started...')
-            logger.info('Successfully connected to local server..')
-            debugger_thread.join()
-            web_socket_thread.join()
-            logger.info('Both debugger and websocket threads stopped...')
-            logger.info('Stopped local server..')
+            # serve each connection on its own threads, so that the next one can be accepted right away
+            connection_thread = Thread(target=self._serve_client, args=(client, index))
+            connection_thread.daemon = True
+            connection_thread.start()
+
+    def _serve_client(self, client, index):
+        host = 'wss://{}{}'.format(self.remote_addr, '/AppServiceTunnel/Tunnel.ashx')
+        basic_auth_header = 'Authorization: Basic {}'.format(self.create_basic_auth())
+        try:
+            ws = create_connection(host,
+                                   sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                   class_=TunnelWebSocket,
+                                   header=[basic_auth_header],
+                                   sslopt={'cert_reqs': ssl.CERT_NONE},
+                                   timeout=60 * 60,
+                                   enable_multithread=True)
+        except Exception as ex:  # pylint: disable=broad-except
+            logger.warning('Failed to connect to the remote tunnel: %s', ex)
+            client.close()
+            return
+        logger.info('Websocket, connected status: %s, index: %s', ws.connected, index)
+        self._update_stats(active_connections=1, total_connections=1)
+        start = time.time()
+        web_socket_thread = Thread(target=self._listen_to_web_socket, args=(client, ws, index))
+        web_socket_thread.daemon = True
+        web_socket_thread.start()
+        logger.info('Successfully connected to local server.., index: %s', index)
+        self._listen_to_client(client, ws, index)
+        web_socket_thread.join()
+        self._update_stats(active_connections=-1)
+        logger.info('Stopped connection %s after %.1f seconds. %s', index, time.time() - start, self.get_stats())
+
+    def _update_stats(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def get_stats(self):
+        """ Throughput counters of the tunnel across all the connections. """
+        with self._stats_lock:
+            return {'activeConnections': self.active_connections,
+                    'totalConnections': self.total_connections,
+                    'bytesSent': self.bytes_sent,
+                    'bytesReceived': self.bytes_received}
 
     def _listen_to_web_socket(self, client, ws_socket, index):
         try:
             while True:
-                logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
                 data = ws_socket.recv()
-                logger.info('Received websocket data: %s, index: %s', data, index)
                 if data:
                     # Set the response to echo back the recieved data
-                    response = data
-                    logger.info('Sending to debugger, response: %s, index: %s', response, index)
-                    client.sendall(response)
-                    logger.info('Done sending to debugger, index: %s', index)
+                    logger.debug('Sending %s bytes to debugger, index: %s', len(data), index)
+                    self._update_stats(bytes_received=len(data))
+                    client.sendall(data)
                 else:
                     break
         except Exception as ex:  # pylint: disable=broad-except
@@ -170,17 +192,21 @@ class TunnelServer(object):
             ws_socket.close()
 
     def _listen_to_client(self, client, ws_socket, index):
+        # reuse the buffer across reads, and grow it while the reads fill it to send larger frames
+        frame_size = MIN_FRAME_SIZE
+        buf = bytearray(MAX_FRAME_SIZE)
+        view = memoryview(buf)
         try:
             while True:
-                logger.info('Waiting for debugger data, index: %s', index)
-                buf = bytearray(4096)
-                nbytes = client.recv_into(buf, 4096)
-                logger.info('Received debugger data, nbytes: %s, index: %s', nbytes, index)
+                nbytes = client.recv_into(view[:frame_size], frame_size)
                 if nbytes > 0:
-                    responseData = buf[0:nbytes]
-                    logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
-                    ws_socket.send_binary(responseData)
-                    logger.info('Done sending to websocket, index: %s', index)
+                    logger.debug('Sending %s bytes to websocket, index: %s', nbytes, index)
+                    self._update_stats(bytes_sent=nbytes)
+                    ws_socket.send_binary(view[:nbytes].tobytes())
+                    if nbytes == frame_size:
+                        frame_size = min(frame_size * 2, MAX_FRAME_SIZE)
+                    elif nbytes < frame_size // 4:
+                        frame_size = max(frame_size // 2, MIN_FRAME_SIZE)
                 else:
                     break
         except Exception as ex:  # pylint: disable=broad-except
@@ -1060,6 +1060,56 @@ examples:
     crafted: true
 """
 
+helps['monitor metrics export'] = """
+type: command
+short-summary: Export the metric values of many resources.
+long-summary: >
+    The time range is split in windows of 1440 intervals, which are queried concurrently for all the resources.
+    The data points are written one per line as the queries complete, so they are not ordered by time.
+parameters:
+  - name: --aggregation
+    short-summary: The list of aggregation types (space-separated) to retrieve.
+    populator-commands:
+      - az monitor metrics list-definitions
+  - name: --interval
+    short-summary: >
+        The interval over which to aggregate metrics, in ##h##m format.
+  - name: --filter
+    short-summary: A string used to reduce the set of metric data returned. eg. "BlobType eq '*'"
+    long-summary: 'For a full list of filters, see the filter string reference at https://docs.microsoft.com/rest/api/monitor/metrics/list'
+  - name: --dimension
+    short-summary: The list of dimensions (space-separated) the metrics are queried into.
+    populator-commands:
+      - az monitor metrics list-definitions
+  - name: --namespace
+    short-summary: Namespace to query metric definitions for.
+    populator-commands:
+      - az monitor metrics list-definitions
+  - name: --offset
+    short-summary: >
+        Time offset of the query range, in ##d##h format.
+    long-summary: >
+        Can be used with either --start-time or --end-time. If used with --start-time, then
+        the end time will be calculated by adding the offset. If used with --end-time (default), then
+        the start time will be calculated by subtracting the offset. If --start-time and --end-time are
+        provided, then --offset will be ignored.
+  - name: --metrics
+    short-summary: >
+        Space-separated list of metric names to retrieve.
+    populator-commands:
+      - az monitor metrics list-definitions
+examples:
+  - name: Export a month of the CPU usage of all the VMs of a resource group per minute to a CSV file
+    text: >
+        az monitor metrics export --resource-type Microsoft.Compute/virtualMachines -g MyResourceGroup \\
+                                  --metrics "Percentage CPU" --start-time 2020-01-01T00:00:00Z --offset 31d \\
+                                  --file cpu.csv
+  - name: Export the transactions of two storage accounts of the past day as JSON lines
+    text: >
+        az monitor metrics export --resources {ResourceId1} {ResourceId2} --metrics Transactions \\
+                                  --offset 1d --format json-lines
+"""
+
 helps['monitor metrics list'] = """
 type: command
 short-summary: List the metric values for a resource.
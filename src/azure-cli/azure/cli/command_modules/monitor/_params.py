@@ -108,6 +108,26 @@ def load_arguments(self, _):
         c.argument('end_time', arg_type=get_datetime_type(help='End time of the query. Defaults to the current time.'))
         c.argument('offset', type=get_period_type(as_timedelta=True))
         c.argument('interval', arg_group='Time', type=get_period_type())
+
+    with self.argument_context('monitor metrics export') as c:
+        from azure.mgmt.monitor.models import AggregationType
+        c.argument('resources', nargs='+', arg_group='Target Resource', help='Space-separated IDs of the resources.')
+        c.argument('resource_type', arg_group='Target Resource', help="Type of the resources, when --resources is not given. Ex: 'Microsoft.Compute/virtualMachines'")
+        c.argument('resource_group_name', resource_group_name_type, arg_group='Target Resource', help='Name of the resource group of the resources, when --resources is not given.')
+        c.argument('dimension', nargs='*', validator=validate_metric_dimension)
+        c.argument('aggregation', arg_type=get_enum_type(t for t in AggregationType if t.name != 'none'), nargs='*')
+        c.argument('metrics', nargs='+')
+        c.argument('top', help='Max number of records to retrieve per resource and time window. Valid only if --filter used.')
+        c.argument('filters', options_list='--filter')
+        c.argument('metric_namespace', options_list='--namespace')
+        c.argument('output_format', options_list='--format', arg_type=get_enum_type(['csv', 'json-lines']), help='Format of the data points, written one per line.')
+        c.argument('file_path', options_list='--file', help='File to write the data points to, instead of the standard output.')
+
+    with self.argument_context('monitor metrics export', arg_group='Time') as c:
+        c.argument('start_time', arg_type=get_datetime_type(help='Start time of the query.'))
+        c.argument('end_time', arg_type=get_datetime_type(help='End time of the query. Defaults to the current time.'))
+        c.argument('offset', type=get_period_type(as_timedelta=True))
+        c.argument('interval', type=get_period_type(as_timedelta=True))
     # endregion
 
     # region MetricAlerts
@@ -220,6 +220,7 @@ def load_command_table(self, _):
     with self.command_group('monitor metrics') as g:
         from .transformers import metrics_table, metrics_definitions_table
         g.command('list', 'list_metrics', command_type=monitor_custom, table_transformer=metrics_table)
+        g.command('export', 'export_metrics', command_type=monitor_custom)
         g.command('list-definitions', 'list', command_type=metric_definitions_sdk, table_transformer=metrics_definitions_table)
 
     with self.command_group('monitor metrics alert', metric_alert_sdk, custom_command_type=alert_custom, client_factory=cf_metric_alerts) as g:
@@ -9,6 +9,11 @@ from knack.log import get_logger
 
 logger = get_logger(__name__)
 
+METRICS_EXPORT_MAX_CONCURRENCY = 16
+# the data points requested per time series at once, e.g. a day of 1-minute values
+METRICS_EXPORT_WINDOW_POINTS = 1440
+METRICS_EXPORT_AGGREGATIONS = ['average', 'minimum', 'maximum', 'total', 'count']
+
 
 # region ActivityLog
 def list_activity_log(client, filters=None, correlation_id=None, resource_group=None, resource_id=None,
@@ -133,4 +138,172 @@ def list_metrics(cmd, resource,
         filter=filters,
         result_type=ResultType.metadata if metadata else None,
         metricnamespace=metric_namespace)
+
+
+def export_metrics(cmd, metrics, resources=None, resource_type=None, resource_group_name=None,
+                   start_time=None, end_time=None, offset='1h', interval='1m',
+                   dimension=None, aggregation=None, filters=None, metric_namespace=None, top=10,
+                   output_format='csv', file_path=None):
+    import itertools
+    import sys
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    from knack.util import CLIError
+    from six.moves.urllib.parse import quote_plus
+
+    if not resources:
+        if not resource_type:
+            raise CLIError('usage error: --resources IDS | --resource-type TYPE [--resource-group NAME]')
+        resources = _list_resource_ids(cmd.cli_ctx, resource_type, resource_group_name)
+    offset, interval = _get_metrics_period(offset, 'offset'), _get_metrics_period(interval, 'interval')
+    windows = _get_metrics_windows(start_time, end_time, offset, interval)
+    client = cf_metrics(cmd.cli_ctx, None)
+
+    def _list(resource, window):
+        return client.list(
+            resource_uri=resource,
+            timespan=quote_plus('{}/{}'.format(window[0].isoformat(), window[1].isoformat())),
+            interval=interval,
+            metricnames=','.join(metrics),
+            aggregation=','.join(aggregation) if aggregation else None,
+            top=top,
+            filter=filters,
+            metricnamespace=metric_namespace)
+
+    queries = itertools.product(resources, windows)
+    query_count = len(resources) * len(windows)
+    logger.info('Exporting the metrics of %d resources in %d time windows', len(resources), len(windows))
+    failed = 0
+    stream = open(file_path, 'w') if file_path else sys.stdout
+    try:
+        writer = _MetricsWriter(stream, output_format)
+        with ThreadPoolExecutor(max_workers=METRICS_EXPORT_MAX_CONCURRENCY) as executor:
+            # the queries are submitted as the previous ones complete, the results are written in completion order
+            pending = {executor.submit(_list, *query): query
+                       for query in itertools.islice(queries, METRICS_EXPORT_MAX_CONCURRENCY * 2)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    resource, window = pending.pop(future)
+                    try:
+                        writer.write(resource, future.result())
+                    except Exception as ex:  # pylint: disable=broad-except
+                        failed += 1
+                        logger.warning('Failed to get the metrics of %s from %s to %s: %s',
+                                       resource, window[0].isoformat(), window[1].isoformat(), ex)
+                for query in itertools.islice(queries, len(done)):
+                    pending[executor.submit(_list, *query)] = query
+    finally:
+        if file_path:
+            stream.close()
+    if failed:
+        raise CLIError('Failed to get the metrics of {} out of {} queries.'.format(failed, query_count))
+
+
+def _list_resource_ids(cli_ctx, resource_type, resource_group_name=None):
+    from azure.cli.core.commands.client_factory import get_mgmt_service_client
+    from azure.cli.core.profiles import ResourceType
+    client = get_mgmt_service_client(cli_ctx, ResourceType.MGMT_RESOURCE_RESOURCES).resources
+    odata_filter = "resourceType eq '{}'".format(resource_type)
+    if resource_group_name:
+        return [r.id for r in client.list_by_resource_group(resource_group_name, filter=odata_filter)]
+    return [r.id for r in client.list(filter=odata_filter)]
+
+
+def _get_metrics_period(value, name):
+    """ Convert a period in "##d##h##m##s" or ISO 8601 format into a positive timedelta. """
+    from datetime import timedelta
+    from isodate import parse_duration, ISO8601Error
+    from knack.util import CLIError
+    from azure.cli.command_modules.monitor.actions import get_period_type
+
+    if not isinstance(value, timedelta):
+        try:
+            # ISO 8601 strings are returned as is
+            value = get_period_type(as_timedelta=True)(value)
+            if not isinstance(value, timedelta):
+                value = parse_duration(value)
+        except (ValueError, ISO8601Error):
+            pass
+    # durations in years or months are not timedeltas, as their length varies
+    if not isinstance(value, timedelta) or value <= timedelta(0):
+        raise CLIError("usage error: --{} should be a positive period, e.g. '1m' or 'PT1M'".format(name))
+    return value
+
+
+def _get_metrics_windows(start_time, end_time, offset, interval):
+    """ Split the time range of the query in windows of METRICS_EXPORT_WINDOW_POINTS intervals, in naive UTC. """
+    from datetime import datetime
+    import dateutil.parser
+    import dateutil.tz
+
+    def _parse(value):
+        if not value:
+            return None
+        value = dateutil.parser.parse(value)
+        return value.astimezone(dateutil.tz.tzutc()).replace(tzinfo=None) if value.tzinfo else value
+
+    start_time, end_time = _parse(start_time), _parse(end_time)
+    if not start_time and not end_time:
+        end_time = datetime.utcnow()
+    if not start_time:
+        start_time = end_time - offset
+    elif not end_time:
+        end_time = start_time + offset
+
+    windows = []
+    window_size = interval * METRICS_EXPORT_WINDOW_POINTS
+    while start_time < end_time:
+        windows.append((start_time, min(start_time + window_size, end_time)))
+        start_time += window_size
+    return windows
+
+
+class _MetricsWriter(object):
+    """ Writes the data points of metrics responses one per line, as CSV or JSON lines. """
+
+    def __init__(self, stream, output_format):
+        self.stream = stream
+        self.output_format = output_format
+        if output_format == 'csv':
+            header = ['resourceId', 'metric', 'timestamp', 'dimensions'] + METRICS_EXPORT_AGGREGATIONS
+            self._write_lines([','.join(header)])
+
+    def write(self, resource, response):
+        import json
+        from collections import OrderedDict
+        lines = []
+        for metric in response.value:
+            for series in metric.timeseries or []:
+                dimensions = OrderedDict((m.name.value, m.value) for m in series.metadatavalues or [])
+                for data in series.data or []:
+                    values = [getattr(data, a) for a in METRICS_EXPORT_AGGREGATIONS]
+                    if all(v is None for v in values):
+                        continue
+                    timestamp = data.time_stamp.isoformat()
+                    if self.output_format == 'csv':
+                        fields = [resource, metric.name.value, timestamp,
+                                  ';'.join('{}={}'.format(k, v) for k, v in dimensions.items())] + values
+                        lines.append(','.join(_csv_field(f) for f in fields))
+                    else:
+                        row = OrderedDict([('resourceId', resource), ('metric', metric.name.value),
+                                           ('timestamp', timestamp)])
+                        if dimensions:
+                            row['dimensions'] = dimensions
+                        row.update((a, v) for a, v in zip(METRICS_EXPORT_AGGREGATIONS, values) if v is not None)
+                        lines.append(json.dumps(row))
+        self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        if lines:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+
+
+def _csv_field(value):
+    if value is None:
+        return ''
+    value = str(value)
+    if any(c in value for c in ',"\r\n'):
+        return '"{}"'.format(value.replace('"', '""'))
+    return value
 # endregion
@@ -151,3 +151,92 @@ class MonitorMetricAlertActionTest(unittest.TestCase):
         ns = self._build_namespace()
         with self.assertRaisesRegexp(CLIError, 'usage error: --condition'):
             self.call_condition(ns, 'avg Wra!!ga * woo')
+
+
+class _Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def _metrics_response(timestamp, dimensions=None):
+    from datetime import datetime
+    return _Model(value=[_Model(
+        name=_Model(value='Percentage CPU'),
+        timeseries=[_Model(
+            metadatavalues=[_Model(name=_Model(value=k), value=v) for k, v in (dimensions or {}).items()],
+            data=[_Model(time_stamp=datetime(2020, 1, 1, 0, 0), average=1.5, minimum=None, maximum=2.0, total=None, count=None),
+                  _Model(time_stamp=timestamp, average=None, minimum=None, maximum=None, total=None, count=None)])])])
+
+
+class MonitorMetricsExportTest(unittest.TestCase):
+
+    @mock.patch('azure.cli.command_modules.monitor.custom.cf_metrics', autospec=True)
+    def test_export_metrics(self, cf_metrics_mock):
+        import json
+        import os
+        import tempfile
+        from datetime import datetime, timedelta
+        from six.moves.urllib.parse import unquote_plus
+        from azure.cli.command_modules.monitor.custom import export_metrics
+
+        client = cf_metrics_mock.return_value
+        client.list.side_effect = lambda **kwargs: _metrics_response(datetime(2020, 1, 1, 0, 1), {'Role': 'web,1'})
+        file_path = os.path.join(tempfile.mkdtemp(), 'metrics.csv')
+
+        # two days of 1-minute values are queried in two windows per resource
+        export_metrics(mock.MagicMock(), ['Percentage CPU'], resources=['/vm1', '/vm2'],
+                       start_time='2020-01-01T00:00:00+00:00', offset=timedelta(days=2), interval=timedelta(minutes=1),
+                       file_path=file_path)
+
+        self.assertEqual(client.list.call_count, 4)
+        timespans = sorted((c[1]['resource_uri'], unquote_plus(c[1]['timespan'])) for c in client.list.call_args_list)
+        self.assertEqual(timespans, [('/vm1', '2020-01-01T00:00:00/2020-01-02T00:00:00'),
+                                     ('/vm1', '2020-01-02T00:00:00/2020-01-03T00:00:00'),
+                                     ('/vm2', '2020-01-01T00:00:00/2020-01-02T00:00:00'),
+                                     ('/vm2', '2020-01-02T00:00:00/2020-01-03T00:00:00')])
+        with open(file_path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'resourceId,metric,timestamp,dimensions,average,minimum,maximum,total,count')
+        # the data points without any value are skipped
+        self.assertEqual(len(lines), 5)
+        self.assertIn('/vm1,Percentage CPU,2020-01-01T00:00:00,"Role=web,1",1.5,,2.0,,', lines)
+
+        # a failed query is reported once the others are written
+        def _list(**kwargs):
+            if kwargs['resource_uri'] == '/vm2':
+                raise ValueError('throttled')
+            return _metrics_response(datetime(2020, 1, 1, 0, 1))
+
+        client.list.side_effect = _list
+        with self.assertRaises(CLIError) as cm:
+            export_metrics(mock.MagicMock(), ['Percentage CPU'], resources=['/vm1', '/vm2'],
+                           start_time='2020-01-01T00:00:00+00:00', offset=timedelta(days=2),
+                           interval=timedelta(minutes=1), output_format='json-lines', file_path=file_path)
+        self.assertIn('2 out of 4', str(cm.exception))
+        with open(file_path) as f:
+            rows = [json.loads(line) for line in f.read().splitlines()]
+        self.assertEqual(rows, [{'resourceId': '/vm1', 'metric': 'Percentage CPU', 'timestamp': '2020-01-01T00:00:00',
+                                 'average': 1.5, 'maximum': 2.0}] * 2)
+
+    @mock.patch('azure.cli.command_modules.monitor.custom.cf_metrics', autospec=True)
+    def test_export_metrics_period(self, cf_metrics_mock):
+        import os
+        import tempfile
+        from datetime import datetime, timedelta
+        from azure.cli.command_modules.monitor.custom import export_metrics
+
+        client = cf_metrics_mock.return_value
+        client.list.side_effect = lambda **kwargs: _metrics_response(datetime(2020, 1, 1, 0, 1))
+        file_path = os.path.join(tempfile.mkdtemp(), 'metrics.csv')
+
+        # ISO 8601 periods are converted, so that a day of 1-hour values is queried in a single window
+        export_metrics(mock.MagicMock(), ['Percentage CPU'], resources=['/vm1'], start_time='2020-01-01T00:00:00+00:00',
+                       offset='P1D', interval='PT1H', file_path=file_path)
+        client.list.assert_called_once()
+        self.assertEqual(client.list.call_args[1]['interval'], timedelta(hours=1))
+
+        for interval in [timedelta(0), '0m', 'PT0S', 'P1YT1H', 'often']:
+            with self.assertRaises(CLIError) as cm:
+                export_metrics(mock.MagicMock(), ['Percentage CPU'], resources=['/vm1'], interval=interval,
+                               file_path=file_path)
+            self.assertIn('--interval should be a positive period', str(cm.exception))
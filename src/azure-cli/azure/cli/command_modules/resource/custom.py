@@ -14,6 +14,8 @@ import os
 import re
 import ssl
 import sys
+import threading
+import time
 import uuid
 
 from six.moves.urllib.request import urlopen  # pylint: disable=import-error
@@ -44,6 +46,8 @@ from msrest.pipeline import SansIOHTTPPolicy
 
 logger = get_logger(__name__)
 
+DELETE_RESOURCE_MAX_CONCURRENCY = 16
+
 
 def _build_resource_id(**kwargs):
     from msrestazure.tools import resource_id as resource_id_from_dict
@@ -554,12 +558,12 @@ def _list_resources_odata_filter_builder(resource_group_name=None, resource_prov
 
 def _get_auth_provider_latest_api_version(cli_ctx):
     rcf = _resource_client_factory(cli_ctx)
-    api_version = _ResourceUtils.resolve_api_version(rcf, 'Microsoft.Authorization', None, 'providerOperations')
+    api_version = _ResourceUtils.resolve_api_version(rcf, 'Microsoft.Authorization', None, 'providerOperations',
+                                                     cli_ctx=cli_ctx)
     return api_version
 
 
 def _update_provider(cli_ctx, namespace, registering, wait):
-    import time
     target_state = 'Registered' if registering else 'Unregistered'
     rcf = _resource_client_factory(cli_ctx)
     if registering:
@@ -1070,6 +1074,54 @@ def show_resource(cmd, resource_ids=None, resource_group_name=None,
             include_response_body) for id_dict in parsed_ids])
 
 
+def _delete_resources_concurrently(to_be_deleted, resource_name=None,
+                                   max_concurrency=DELETE_RESOURCE_MAX_CONCURRENCY):
+    """
+    Deletes resources with a bounded pool of workers and returns the results in the order of
+    the given resources along with the resources which could not be deleted.
+    Resources whose delete request is rejected are held back, and re-queued as soon as another deletion
+    completes after the request was sent, since that deletion may have removed the dependency blocking them.
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    from msrestazure.azure_exceptions import CloudError
+
+    def _delete(rsrc_utils, id_dict):
+        try:
+            operation = rsrc_utils.delete()
+        except CloudError as e:
+            # request to delete failed, hold the parsed id dict back until a dependency is gone
+            id_dict['exception'] = str(e)
+            return False, None
+        logger.debug("deleting %s", _build_resource_id(**id_dict) or resource_name)
+        return True, operation.result()
+
+    pending = deque(enumerate(to_be_deleted))
+    # index -> (item, number of deletions completed when its rejected request was sent)
+    blocked = {}
+    results = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        while pending or running:
+            while pending and len(running) < max_concurrency:
+                index, item = pending.popleft()
+                # a deletion completing while the request is in flight may come too late for it
+                running[executor.submit(_delete, *item)] = (index, item, len(results))
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, item, completed = running.pop(future)
+                deleted, result = future.result()
+                if deleted:
+                    results[index] = result
+                else:
+                    blocked[index] = (item, completed)
+            retry = sorted(index for index, (_, completed) in blocked.items() if completed < len(results))
+            if retry:
+                logger.debug("Retry deleting %d resource(s).", len(retry))
+                pending.extend((index, blocked.pop(index)[0]) for index in retry)
+    return [results[i] for i in sorted(results)], [blocked[i][0] for i in sorted(blocked)]
+
+
 # pylint: disable=unused-argument
 def delete_resource(cmd, resource_ids=None, resource_group_name=None,
                     resource_provider_namespace=None, parent_resource_path=None, resource_type=None,
@@ -1077,7 +1129,8 @@ def delete_resource(cmd, resource_ids=None, resource_group_name=None,
     """
     Deletes the given resource(s).
     This function allows deletion of ids with dependencies on one another.
-    This is done with multiple passes through the given ids.
+    Deletions run concurrently; a deletion that is rejected (e.g. because a dependent
+    resource still exists) is retried whenever another deletion completes.
     """
     parsed_ids = _get_parsed_resource_ids(resource_ids) or [_create_parsed_id(cmd.cli_ctx,
                                                                               resource_group_name,
@@ -1088,30 +1141,7 @@ def delete_resource(cmd, resource_ids=None, resource_group_name=None,
     to_be_deleted = [(_get_rsrc_util_from_parsed_id(cmd.cli_ctx, id_dict, api_version), id_dict)
                      for id_dict in parsed_ids]
 
-    results = []
-    from msrestazure.azure_exceptions import CloudError
-    while to_be_deleted:
-        logger.debug("Start new loop to delete resources.")
-        operations = []
-        failed_to_delete = []
-        for rsrc_utils, id_dict in to_be_deleted:
-            try:
-                operations.append(rsrc_utils.delete())
-                resource = _build_resource_id(**id_dict) or resource_name
-                logger.debug("deleting %s", resource)
-            except CloudError as e:
-                # request to delete failed, add parsed id dict back to queue
-                id_dict['exception'] = str(e)
-                failed_to_delete.append((rsrc_utils, id_dict))
-        to_be_deleted = failed_to_delete
-
-        # stop deleting if none deletable
-        if not operations:
-            break
-
-        # all operations return result before next pass
-        for operation in operations:
-            results.append(operation.result())
+    results, to_be_deleted = _delete_resources_concurrently(to_be_deleted, resource_name)
 
     if to_be_deleted:
         error_msg_builder = ['Some resources failed to be deleted (run with `--verbose` for more information):']
@@ -1210,8 +1240,7 @@ def list_resources(cmd, resource_group_name=None,
     odata_filter = _list_resources_odata_filter_builder(resource_group_name,
                                                         resource_provider_namespace,
                                                         resource_type, name, tag, location)
-    resources = rcf.resources.list(filter=odata_filter)
-    return list(resources)
+    return rcf.resources.list(filter=odata_filter)
 
 
 def register_provider(cmd, resource_provider_namespace, wait=False):
@@ -1602,7 +1631,6 @@ def update_policy_setdefinition(cmd, policy_set_definition_name, definitions=Non
 
 def _register_rp(cli_ctx, subscription_id=None):
     rp = "Microsoft.Management"
-    import time
     rcf = get_mgmt_service_client(
         cli_ctx,
         ResourceType.MGMT_RESOURCE_RESOURCES,
@@ -2035,6 +2063,74 @@ def show_version(cmd):
     return versions
 
 
+class _ApiVersionCache(object):
+    """
+    The API versions of the resource types of resource providers, persisted per cloud and subscription under the
+    config directory, so that generic resource commands don't need to get the resource provider each time. Entries
+    expire after `[resource] api_version_cache_ttl` seconds (0 disables the cache). With
+    `[resource] prewarm_api_version_cache` enabled, all the providers are listed with one request when the cache
+    of a subscription is empty or expired.
+    """
+
+    _CACHE_DIR = 'apiVersionCache'
+    _DEFAULT_TTL = 24 * 60 * 60
+    _lock = threading.Lock()
+    _sessions = {}
+
+    def __init__(self, cli_ctx, rcf):
+        self.rcf = rcf
+        self.ttl, self.prewarm, self.session = 0, False, None
+        if cli_ctx:
+            self.ttl = cli_ctx.config.getint('resource', 'api_version_cache_ttl', fallback=self._DEFAULT_TTL)
+            self.prewarm = cli_ctx.config.getboolean('resource', 'prewarm_api_version_cache', fallback=False)
+        base_url = getattr(rcf.config, 'base_url', None)
+        subscription_id = getattr(rcf.config, 'subscription_id', None)
+        # a client without a subscription or endpoint (e.g. a mock) is not cached
+        if self.ttl > 0 and isinstance(base_url, str) and isinstance(subscription_id, str):
+            file_name = '{}_{}.json'.format(re.sub(r'[^\w.-]', '_', urlparse(base_url).netloc), subscription_id)
+            self.session = self._get_session(os.path.join(cli_ctx.config.config_dir, self._CACHE_DIR, file_name))
+
+    @classmethod
+    def _get_session(cls, file_path):
+        from knack.util import ensure_dir
+        from azure.cli.core._session import Session
+        with cls._lock:
+            if file_path not in cls._sessions:
+                ensure_dir(os.path.dirname(file_path))
+                session = Session()
+                session.load(file_path)
+                cls._sessions[file_path] = session
+            return cls._sessions[file_path]
+
+    def _is_fresh(self, entry):
+        return entry is not None and entry.get('time', 0) + self.ttl > time.time()
+
+    @staticmethod
+    def _to_entry(provider):
+        return {'time': time.time(),
+                'resourceTypes': {t.resource_type.lower(): list(t.api_versions or []) for t in provider.resource_types}}
+
+    def get_resource_types(self, namespace, refresh=False):
+        """ The API versions of each resource type (in lowercase) of the namespace, and whether they were cached. """
+        if self.session is None:
+            return self._to_entry(self.rcf.providers.get(namespace))['resourceTypes'], False
+        with self._lock:
+            entry = self.session.data.get(namespace.lower())
+            if not refresh and self._is_fresh(entry):
+                return entry['resourceTypes'], True
+            if self.prewarm and not any(self._is_fresh(e) for e in self.session.data.values()):
+                providers = list(self.rcf.providers.list())
+                logger.debug('Caching the API versions of %d resource providers', len(providers))
+                self.session.data = {p.namespace.lower(): self._to_entry(p) for p in providers}
+            if refresh or not self._is_fresh(self.session.data.get(namespace.lower())):
+                self.session.data[namespace.lower()] = self._to_entry(self.rcf.providers.get(namespace))
+            try:
+                self.session.save_with_retry()
+            except (OSError, IOError) as ex:
+                logger.debug('Failed to save the API version cache: %s', ex)
+            return self.session.data[namespace.lower()]['resourceTypes'], False
+
+
 class _ResourceUtils(object):  # pylint: disable=too-many-instance-attributes
     def __init__(self, cli_ctx,
                  resource_group_name=None, resource_provider_namespace=None,
@@ -2051,14 +2147,15 @@ class _ResourceUtils(object):  # pylint: disable=too-many-instance-attributes
         self.rcf = rcf or _resource_client_factory(cli_ctx)
         if api_version is None:
             if resource_id:
-                api_version = _ResourceUtils._resolve_api_version_by_id(self.rcf, resource_id)
+                api_version = _ResourceUtils._resolve_api_version_by_id(self.rcf, resource_id, cli_ctx=cli_ctx)
             else:
                 _validate_resource_inputs(resource_group_name, resource_provider_namespace,
                                           resource_type, resource_name)
                 api_version = _ResourceUtils.resolve_api_version(self.rcf,
                                                                  resource_provider_namespace,
                                                                  parent_resource_path,
-                                                                 resource_type)
+                                                                 resource_type,
+                                                                 cli_ctx=cli_ctx)
 
         self.resource_group_name = resource_group_name
         self.resource_provider_namespace = resource_provider_namespace
@@ -2252,25 +2349,28 @@ class _ResourceUtils(object):  # pylint: disable=too-many-instance-attributes
                                     self.rcf.resources.config.long_running_operation_timeout)
 
     @staticmethod
-    def resolve_api_version(rcf, resource_provider_namespace, parent_resource_path, resource_type):
-        provider = rcf.providers.get(resource_provider_namespace)
+    def resolve_api_version(rcf, resource_provider_namespace, parent_resource_path, resource_type, cli_ctx=None):
+        api_version_cache = _ApiVersionCache(cli_ctx, rcf)
+        resource_types, cached = api_version_cache.get_resource_types(resource_provider_namespace)
 
         # If available, we will use parent resource's api-version
         resource_type_str = (parent_resource_path.split('/')[0] if parent_resource_path else resource_type)
 
-        rt = [t for t in provider.resource_types
-              if t.resource_type.lower() == resource_type_str.lower()]
-        if not rt:
+        if resource_type_str.lower() not in resource_types and cached:
+            # the resource type may have been added since the provider was cached
+            resource_types, _ = api_version_cache.get_resource_types(resource_provider_namespace, refresh=True)
+        if resource_type_str.lower() not in resource_types:
             raise IncorrectUsageError('Resource type {} not found.'.format(resource_type_str))
-        if len(rt) == 1 and rt[0].api_versions:
-            npv = [v for v in rt[0].api_versions if 'preview' not in v.lower()]
-            return npv[0] if npv else rt[0].api_versions[0]
+        api_versions = resource_types[resource_type_str.lower()]
+        if api_versions:
+            npv = [v for v in api_versions if 'preview' not in v.lower()]
+            return npv[0] if npv else api_versions[0]
         raise IncorrectUsageError(
             'API version is required and could not be resolved for resource {}'
             .format(resource_type))
 
     @staticmethod
-    def _resolve_api_version_by_id(rcf, resource_id):
+    def _resolve_api_version_by_id(rcf, resource_id, cli_ctx=None):
         parts = parse_resource_id(resource_id)
         namespace = parts.get('child_namespace_1', parts['namespace'])
         if parts.get('child_type_2'):
@@ -2289,4 +2389,4 @@ class _ResourceUtils(object):  # pylint: disable=too-many-instance-attributes
             parent = None
             resource_type = parts['type']
 
-        return _ResourceUtils.resolve_api_version(rcf, namespace, parent, resource_type)
+        return _ResourceUtils.resolve_api_version(rcf, namespace, parent, resource_type, cli_ctx=cli_ctx)
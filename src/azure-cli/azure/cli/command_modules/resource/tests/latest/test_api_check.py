@@ -78,6 +78,47 @@ class TestApiCheck(unittest.TestCase):
                                    resource_group_name='rg', rcf=rcf)
         self.assertEqual(res_utils.api_version, "2005-01-01-preview")
 
+    def _get_mock_cli_ctx(self, config_dir, prewarm=False):  # pylint: disable=no-self-use
+        cli_ctx = MagicMock()
+        cli_ctx.config.config_dir = config_dir
+        cli_ctx.config.getint.side_effect = lambda section, option, fallback: fallback
+        cli_ctx.config.getboolean.side_effect = lambda section, option, fallback: prewarm
+        return cli_ctx
+
+    def test_resolve_api_version_cached(self):
+        import shutil
+        import tempfile
+        config_dir = tempfile.mkdtemp()
+        try:
+            rcf = self._get_mock_client()
+            rcf.config.base_url = 'https://management.azure.com'
+            rcf.config.subscription_id = '00000000-0000-0000-0000-000000000000'
+            cli_ctx = self._get_mock_cli_ctx(config_dir)
+
+            for _ in range(3):
+                self.assertEqual(_ResourceUtils.resolve_api_version(rcf, 'Mock', None, 'test', cli_ctx=cli_ctx),
+                                 '2016-01-01')
+            self.assertEqual(rcf.providers.get.call_count, 1)
+
+            # a resource type missing from the cache refreshes the provider
+            rcf.providers.get.return_value.resource_types.append(
+                self._get_mock_resource_type('new', ['2020-01-01']))
+            self.assertEqual(_ResourceUtils.resolve_api_version(rcf, 'Mock', None, 'new', cli_ctx=cli_ctx),
+                             '2020-01-01')
+            self.assertEqual(rcf.providers.get.call_count, 2)
+
+            # the cache of another subscription is prewarmed with all providers
+            rcf.config.subscription_id = '00000000-0000-0000-0000-000000000001'
+            rcf.providers.list.return_value = [rcf.providers.get.return_value]
+            rcf.providers.get.return_value.namespace = 'Mock'
+            cli_ctx = self._get_mock_cli_ctx(config_dir, prewarm=True)
+            self.assertEqual(_ResourceUtils.resolve_api_version(rcf, 'Mock', None, 'test', cli_ctx=cli_ctx),
+                             '2016-01-01')
+            self.assertEqual(rcf.providers.get.call_count, 2)
+            self.assertEqual(rcf.providers.list.call_count, 1)
+        finally:
+            shutil.rmtree(config_dir, ignore_errors=True)
+
     def _get_mock_client(self):
         client = MagicMock()
         provider = MagicMock()
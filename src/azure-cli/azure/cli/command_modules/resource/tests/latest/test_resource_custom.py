@@ -19,7 +19,7 @@ except ImportError:
 from azure.cli.core.util import CLIError, get_file_json, shell_safe_json_parse
 from azure.cli.command_modules.resource.custom import \
     (_get_missing_parameters, _extract_lock_params, _process_parameters, _find_missing_parameters,
-     _prompt_for_parameters, _load_file_string_or_uri)
+     _prompt_for_parameters, _load_file_string_or_uri, _delete_resources_concurrently)
 
 
 def _simulate_no_tty():
@@ -333,6 +333,66 @@ class TestCustom(unittest.TestCase):
         results = _prompt_for_parameters(dict(missing_parameters), fail_on_no_tty=False)
         self.assertTrue(str(list(results.keys())) in param_alpha_order)
 
+    def test_delete_resources_concurrently_retries_dependencies(self):
+        from msrestazure.azure_exceptions import CloudError
+        deleted = set()
+        dependencies = {'nic': 'vm', 'ip': 'nic', 'vm': None, 'disk': 'vm'}
+
+        def _get_rsrc_utils(name):
+            def _delete():
+                if dependencies[name] and dependencies[name] not in deleted:
+                    raise CloudError(mock.MagicMock(), '{} is in use'.format(name))
+                deleted.add(name)
+                return mock.MagicMock(result=mock.MagicMock(return_value=name))
+            return mock.MagicMock(delete=_delete)
+
+        to_be_deleted = [(_get_rsrc_utils(name), {'resource_id': name}) for name in ['ip', 'nic', 'vm', 'disk']]
+        results, failed = _delete_resources_concurrently(to_be_deleted, max_concurrency=2)
+        self.assertEqual(results, ['ip', 'nic', 'vm', 'disk'])
+        self.assertEqual(failed, [])
+
+        dependencies['orphan'] = 'missing'
+        deleted.clear()
+        to_be_deleted = [(_get_rsrc_utils(name), {'resource_id': name}) for name in ['orphan', 'nic', 'vm']]
+        results, failed = _delete_resources_concurrently(to_be_deleted, max_concurrency=2)
+        self.assertEqual(results, ['nic', 'vm'])
+        self.assertEqual(failed, [to_be_deleted[0]])
+        self.assertIn('exception', failed[0][1])
+
+    def test_delete_resources_concurrently_retries_blocked_during_slow_delete(self):
+        import threading
+        from msrestazure.azure_exceptions import CloudError
+        deleted = set()
+        nic_rejected, nic_deleted = threading.Event(), threading.Event()
+        vm_waited_for_nic = []
+
+        def _wait_for_nic():
+            vm_waited_for_nic.append(nic_deleted.wait(5))
+            return 'vm'
+
+        def _delete_vm():
+            # a long running deletion, still in progress when the NIC is retried
+            return mock.MagicMock(result=_wait_for_nic)
+
+        def _delete_nic():
+            if 'disk' not in deleted:
+                nic_rejected.set()
+                raise CloudError(mock.MagicMock(), 'nic is in use')
+            nic_deleted.set()
+            return mock.MagicMock(result=mock.MagicMock(return_value='nic'))
+
+        def _delete_disk():
+            nic_rejected.wait(5)
+            deleted.add('disk')
+            return mock.MagicMock(result=mock.MagicMock(return_value='disk'))
+
+        to_be_deleted = [(mock.MagicMock(delete=delete), {'resource_id': name})
+                         for name, delete in [('vm', _delete_vm), ('nic', _delete_nic), ('disk', _delete_disk)]]
+        results, failed = _delete_resources_concurrently(to_be_deleted, max_concurrency=3)
+        self.assertEqual(results, ['vm', 'nic', 'disk'])
+        self.assertEqual(failed, [])
+        self.assertEqual(vm_waited_for_nic, [True])
+
 
 if __name__ == '__main__':
     unittest.main()
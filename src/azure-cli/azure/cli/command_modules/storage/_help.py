@@ -279,7 +279,7 @@ examples:
 
 helps['storage blob copy start-batch'] = """
 type: command
-short-summary: Copy multiple blobs or files to a blob container. Use `az storage blob show` to check the status of the blobs.
+short-summary: Copy multiple blobs or files to a blob container. Use `az storage blob show` or `--wait` to check the status of the blobs.
 parameters:
   - name: --destination-container -c
     type: string
@@ -314,6 +314,8 @@ examples:
   - name: Copy multiple blobs or files to a blob container. Use `az storage blob show` to check the status of the blobs. (autogenerated)
     text: az storage blob copy start-batch --account-key 00000000 --account-name MyAccount --destination-container MyDestinationContainer --source-account-key MySourceKey --source-account-name MySourceAccount --source-container MySourceContainer
     crafted: true
+  - name: Copy all blobs of a container to another storage account and wait until the copies have completed.
+    text: az storage blob copy start-batch --account-name MyAccount --destination-container MyDestinationContainer --source-account-name MySourceAccount --source-container MySourceContainer --wait
 """
 
 helps['storage blob delete'] = """
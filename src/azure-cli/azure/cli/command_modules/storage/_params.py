@@ -425,10 +425,18 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source', options_list=('--source', '-s'))
         c.argument('destination', options_list=('--destination', '-d'))
         c.argument('max_connections', type=int,
-                   help='Maximum number of parallel connections to use when the blob size exceeds 64MB.')
+                   help='Maximum number of parallel connections to use for the whole batch. Files are uploaded '
+                        'concurrently, and a blob whose size exceeds 64MB may use several connections.')
         c.argument('maxsize_condition', arg_group='Content Control')
         c.argument('validate_content', action='store_true', min_api='2016-05-31', arg_group='Content Control')
         c.argument('blob_type', options_list=('--type', '-t'), arg_type=get_enum_type(get_blob_types()))
+        c.argument('skip_unchanged', action='store_true', arg_group='Sync',
+                   help='Only upload the files which are new or changed since they were last uploaded, based on '
+                        'their size, modification time and MD5 hash. The details of the uploaded files are stored '
+                        'under the CLI configuration directory.')
+        c.argument('sync', action='store_true', arg_group='Sync',
+                   help='Same as --skip-unchanged, and also delete the blobs uploaded by a previous run whose source '
+                        'files no longer exist.')
         c.extra('no_progress', progress_type)
         c.extra('socket_timeout', socket_timeout_type)
 
@@ -448,7 +456,8 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.extra('no_progress', progress_type)
         c.extra('socket_timeout', socket_timeout_type)
         c.argument('max_connections', type=int,
-                   help='Maximum number of parallel connections to use when the blob size exceeds 64MB.')
+                   help='Maximum number of parallel connections to use for the whole batch. Blobs are downloaded '
+                        'concurrently, and a blob whose size exceeds 32MB may use several connections.')
 
     with self.argument_context('storage blob delete') as c:
         from .sdkutil import get_delete_blob_snapshot_type_names
@@ -534,6 +543,11 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         c.argument('source_container')
         c.argument('source_share')
 
+    with self.argument_context('storage blob copy start-batch') as c:
+        c.argument('wait', action='store_true',
+                   help='Wait until all the copies have completed, reporting the progress. The command fails if any '
+                        'copy fails or is aborted.')
+
     with self.argument_context('storage blob incremental-copy start') as c:
         from azure.cli.command_modules.storage._validators import process_blob_source_uri
 
@@ -811,7 +825,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         from ._validators import process_file_upload_batch_parameters
         c.argument('source', options_list=('--source', '-s'), validator=process_file_upload_batch_parameters)
         c.argument('destination', options_list=('--destination', '-d'))
-        c.argument('max_connections', arg_group='Download Control', type=int)
+        c.argument('max_connections', arg_group='Download Control', type=int,
+                   help='Maximum number of parallel connections to use for the whole batch. Files are uploaded '
+                        'concurrently, and a large file may use several connections.')
         c.argument('validate_content', action='store_true', min_api='2016-05-31')
         c.register_content_settings_argument(t_file_content_settings, update=False, arg_group='Content Settings')
         c.extra('no_progress', progress_type)
@@ -820,7 +836,9 @@ def load_arguments(self, _):  # pylint: disable=too-many-locals, too-many-statem
         from ._validators import process_file_download_batch_parameters
         c.argument('source', options_list=('--source', '-s'), validator=process_file_download_batch_parameters)
         c.argument('destination', options_list=('--destination', '-d'))
-        c.argument('max_connections', arg_group='Download Control', type=int)
+        c.argument('max_connections', arg_group='Download Control', type=int,
+                   help='Maximum number of parallel connections to use for the whole batch. Files are downloaded '
+                        'concurrently, and a large file may use several connections.')
         c.argument('validate_content', action='store_true', min_api='2016-05-31')
         c.extra('no_progress', progress_type)
 
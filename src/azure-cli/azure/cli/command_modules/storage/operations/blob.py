@@ -14,7 +14,8 @@ from azure.cli.command_modules.storage.util import (create_blob_service_from_sto
                                                     create_short_lived_container_sas,
                                                     filter_none, collect_blobs, collect_files,
                                                     mkdir_p, guess_content_type, normalize_blob_file_path,
-                                                    check_precondition_success)
+                                                    check_precondition_success, transfer_in_parallel,
+                                                    BlobUploadManifest)
 from knack.log import get_logger
 from knack.util import CLIError
 
@@ -93,9 +94,13 @@ def set_service_properties(client, parameters, delete_retention=None, delete_ret
     return client.get_blob_service_properties()
 
 
+# the number of copy requests sent concurrently by `storage blob copy start-batch`
+COPY_BATCH_MAX_CONCURRENCY = 16
+
+
 def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                             destination_path=None, source_container=None, source_share=None,
-                            source_sas=None, pattern=None, dryrun=False):
+                            source_sas=None, pattern=None, dryrun=False, wait=False):
     """Copy a group of blob or files to a blob container."""
     logger = None
     if dryrun:
@@ -118,16 +123,15 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                                                           source_container)
 
         # pylint: disable=inconsistent-return-statements
-        def action_blob_copy(blob_name):
+        def action_blob_copy(blob_name, *_):
             if dryrun:
                 logger.warning('  - copy blob %s', blob_name)
             else:
                 return _copy_blob_to_blob_container(client, source_client, container_name, destination_path,
                                                     source_container, source_sas, blob_name)
 
-        return list(filter_none(action_blob_copy(blob) for blob in collect_blobs(source_client,
-                                                                                 source_container,
-                                                                                 pattern)))
+        return _run_blob_copy_batch(client, container_name, collect_blobs(source_client, source_container, pattern),
+                                    action_blob_copy, dryrun, wait)
 
     if source_share:
         # copy blob from file share
@@ -140,7 +144,7 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                                                       source_share)
 
         # pylint: disable=inconsistent-return-statements
-        def action_file_copy(file_info):
+        def action_file_copy(file_info, *_):
             dir_name, file_name = file_info
             if dryrun:
                 logger.warning('  - copy file %s', os.path.join(dir_name, file_name))
@@ -148,68 +152,114 @@ def storage_blob_copy_batch(cmd, client, source_client, container_name=None,
                 return _copy_file_to_blob_container(client, source_client, container_name, destination_path,
                                                     source_share, source_sas, dir_name, file_name)
 
-        return list(filter_none(action_file_copy(file) for file in collect_files(cmd,
-                                                                                 source_client,
-                                                                                 source_share,
-                                                                                 pattern)))
+        return _run_blob_copy_batch(client, container_name, collect_files(cmd, source_client, source_share, pattern),
+                                    action_file_copy, dryrun, wait)
     raise ValueError('Fail to find source. Neither blob container or file share is specified')
 
 
+def _run_blob_copy_batch(client, container_name, sources, copy_action, dryrun, wait):
+    if dryrun:
+        for source in sources:
+            copy_action(source)
+        return []
+
+    # the copies are started concurrently, the service performs them asynchronously
+    copies = transfer_in_parallel(sources, copy_action, COPY_BATCH_MAX_CONCURRENCY)
+    if wait:
+        _wait_for_blob_copies(client, container_name, copies)
+    return [client.make_blob_url(container_name, blob_name) for blob_name, _ in copies]
+
+
+def _wait_for_blob_copies(client, container_name, copies, max_interval=30):
+    """ Poll the copy status of the pending copies, waiting twice as long after each round, until all of them end.
+    The overall progress and throughput is logged after each round. """
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    logger = get_logger(__name__)
+
+    def _get_copy_properties(blob_name):
+        return client.get_blob_properties(container_name, blob_name).properties.copy
+
+    def _get_bytes(copy):
+        try:
+            copied, total = (int(n) for n in copy.progress.split('/'))
+            return copied if copy.status == 'pending' else total
+        except (AttributeError, ValueError):
+            return 0
+
+    pending = [blob_name for blob_name, copy in copies if copy.status == 'pending']
+    failures = [(blob_name, copy) for blob_name, copy in copies if copy.status not in ['pending', 'success']]
+    start_time, interval, completed_bytes = time.time(), 1, 0
+    with ThreadPoolExecutor(max_workers=COPY_BATCH_MAX_CONCURRENCY) as executor:
+        while pending:
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+            pending_bytes, still_pending = 0, []
+            for blob_name, copy in zip(pending, executor.map(_get_copy_properties, pending)):
+                if copy.status == 'pending':
+                    still_pending.append(blob_name)
+                    pending_bytes += _get_bytes(copy)
+                else:
+                    completed_bytes += _get_bytes(copy)
+                    if copy.status != 'success':
+                        failures.append((blob_name, copy))
+            pending = still_pending
+            copied_mb = (completed_bytes + pending_bytes) / (1024.0 * 1024)
+            logger.warning('%d of %d copies completed. %.1f MB copied at %.1f MB/s.', len(copies) - len(pending),
+                           len(copies), copied_mb, copied_mb / max(time.time() - start_time, 1))
+
+    if failures:
+        details = ['{}: {} {}'.format(blob_name, copy.status, copy.status_description or '')
+                   for blob_name, copy in failures]
+        raise CLIError('{} of {} copies did not succeed:\n{}'.format(len(failures), len(copies), '\n'.join(details)))
+
+
 # pylint: disable=unused-argument
 def storage_blob_download_batch(client, source, destination, source_container_name, pattern=None, dryrun=False,
                                 progress_callback=None, max_connections=2):
 
-    def _download_blob(blob_service, container, destination_folder, normalized_blob_name, blob_name):
+    def _download_blob(blob_names, connections, file_progress_callback):
         # TODO: try catch IO exception
-        destination_path = os.path.join(destination_folder, normalized_blob_name)
+        normalized_blob_name, blob_name = blob_names
+        destination_path = os.path.join(destination, normalized_blob_name)
         destination_folder = os.path.dirname(destination_path)
         if not os.path.exists(destination_folder):
             mkdir_p(destination_folder)
 
-        blob = blob_service.get_blob_to_path(container, blob_name, destination_path, max_connections=max_connections,
-                                             progress_callback=progress_callback)
+        blob = client.get_blob_to_path(source_container_name, blob_name, destination_path,
+                                       max_connections=connections, progress_callback=file_progress_callback)
         return blob.name
 
+    def _get_blobs_to_download(blob_names):
+        normalized_blob_names = set()
+        for blob_name in blob_names:
+            # remove starting path seperator and normalize
+            normalized_blob_name = normalize_blob_file_path(None, blob_name)
+            if normalized_blob_name in normalized_blob_names:
+                raise CLIError('Multiple blobs with download path: `{}`. As a solution, use the `--pattern` '
+                               'parameter to select for a subset of blobs to download OR utilize the `storage blob '
+                               'download` command instead to download individual blobs.'.format(normalized_blob_name))
+            normalized_blob_names.add(normalized_blob_name)
+            yield normalized_blob_name, blob_name
+
     source_blobs = collect_blobs(client, source_container_name, pattern)
-    blobs_to_download = {}
-    for blob_name in source_blobs:
-        # remove starting path seperator and normalize
-        normalized_blob_name = normalize_blob_file_path(None, blob_name)
-        if normalized_blob_name in blobs_to_download:
-            raise CLIError('Multiple blobs with download path: `{}`. As a solution, use the `--pattern` parameter '
-                           'to select for a subset of blobs to download OR utilize the `storage blob download` '
-                           'command instead to download individual blobs.'.format(normalized_blob_name))
-        blobs_to_download[normalized_blob_name] = blob_name
 
     if dryrun:
         logger = get_logger(__name__)
         logger.warning('download action: from %s to %s', source, destination)
         logger.warning('    pattern %s', pattern)
         logger.warning('  container %s', source_container_name)
-        logger.warning('      total %d', len(source_blobs))
         logger.warning(' operations')
-        for b in source_blobs:
-            logger.warning('  - %s', b)
+        total = 0
+        for _, blob_name in _get_blobs_to_download(source_blobs):
+            logger.warning('  - %s', blob_name)
+            total += 1
+        logger.warning('      total %d', total)
         return []
 
-    # Tell progress reporter to reuse the same hook
-    if progress_callback:
-        progress_callback.reuse = True
-
-    results = []
-    for index, blob_normed in enumerate(blobs_to_download):
-        # add blob name and number to progress message
-        if progress_callback:
-            progress_callback.message = '{}/{}: "{}"'.format(
-                index + 1, len(blobs_to_download), blobs_to_download[blob_normed])
-        results.append(_download_blob(
-            client, source_container_name, destination, blob_normed, blobs_to_download[blob_normed]))
-
-    # end progress hook
-    if progress_callback:
-        progress_callback.hook.end()
-
-    return results
+    # blobs are downloaded concurrently while they are being listed, sharing a budget of max_connections connections
+    return transfer_in_parallel(_get_blobs_to_download(source_blobs), _download_blob, max_connections,
+                                progress_callback=progress_callback)
 
 
 def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  # pylint: disable=too-many-locals
@@ -218,7 +268,7 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
                               content_settings=None, metadata=None, validate_content=False,
                               maxsize_condition=None, max_connections=2, lease_id=None, progress_callback=None,
                               if_modified_since=None, if_unmodified_since=None, if_match=None,
-                              if_none_match=None, timeout=None, dryrun=False):
+                              if_none_match=None, timeout=None, dryrun=False, skip_unchanged=False, sync=False):
     def _create_return_result(blob_name, blob_content_settings, upload_result=None):
         blob_name = normalize_blob_file_path(destination_path, blob_name)
         return {
@@ -231,6 +281,15 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
     source_files = source_files or []
     t_content_settings = cmd.get_models('blob.models#ContentSettings')
 
+    manifest, file_md5s, blobs_to_delete = None, {}, []
+    if skip_unchanged or sync:
+        manifest = BlobUploadManifest(cmd.cli_ctx, client.account_name, destination_container_name,
+                                      destination_path, source, pattern)
+        source_files, file_md5s, blobs_to_delete = _get_blob_upload_delta(client, destination_container_name,
+                                                                          destination_path, source_files, manifest)
+        if not sync:
+            blobs_to_delete = []
+
     results = []
     if dryrun:
         logger.info('upload action: from %s to %s', source, destination)
@@ -238,6 +297,8 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
         logger.info('  container %s', destination_container_name)
         logger.info('       type %s', blob_type)
         logger.info('      total %d', len(source_files))
+        for blob_name in blobs_to_delete:
+            logger.info('  - delete %s', blob_name)
         results = []
         for src, dst in source_files:
             results.append(_create_return_result(dst, guess_content_type(src, content_settings, t_content_settings)))
@@ -246,40 +307,98 @@ def storage_blob_upload_batch(cmd, client, source, destination, pattern=None,  #
         def _upload_blob(*args, **kwargs):
             return upload_blob(*args, **kwargs)
 
-        # Tell progress reporter to reuse the same hook
-        if progress_callback:
-            progress_callback.reuse = True
-
-        for index, source_file in enumerate(source_files):
+        def _upload_source_file(source_file, connections, file_progress_callback):
             src, dst = source_file
-            # logger.warning('uploading %s', src)
             guessed_content_settings = guess_content_type(src, content_settings, t_content_settings)
-
-            # add blob name and number to progress message
-            if progress_callback:
-                progress_callback.message = '{}/{}: "{}"'.format(
-                    index + 1, len(source_files), normalize_blob_file_path(destination_path, dst))
-
+            if src in file_md5s:
+                # store the MD5 so that unchanged files can be detected without the manifest
+                guessed_content_settings = _copy_content_settings(t_content_settings, guessed_content_settings,
+                                                                  content_md5=file_md5s[src])
+            file_stat = os.stat(src)
             include, result = _upload_blob(cmd, client, destination_container_name,
                                            normalize_blob_file_path(destination_path, dst), src,
                                            blob_type=blob_type, content_settings=guessed_content_settings,
                                            metadata=metadata, validate_content=validate_content,
-                                           maxsize_condition=maxsize_condition, max_connections=max_connections,
-                                           lease_id=lease_id, progress_callback=progress_callback,
+                                           maxsize_condition=maxsize_condition, max_connections=connections,
+                                           lease_id=lease_id, progress_callback=file_progress_callback,
                                            if_modified_since=if_modified_since,
                                            if_unmodified_since=if_unmodified_since, if_match=if_match,
                                            if_none_match=if_none_match, timeout=timeout)
-            if include:
-                results.append(_create_return_result(dst, guessed_content_settings, result))
-        # end progress hook
-        if progress_callback:
-            progress_callback.hook.end()
+            if include and manifest:
+                manifest.record(normalize_blob_file_path(destination_path, dst), file_stat, file_md5s[src],
+                                result.etag)
+            return _create_return_result(dst, guessed_content_settings, result) if include else None
+
+        # files are uploaded concurrently, sharing a budget of max_connections connections
+        results = list(filter_none(transfer_in_parallel(source_files, _upload_source_file, max_connections,
+                                                        progress_callback=progress_callback,
+                                                        sizes=[os.path.getsize(src) for src, _ in source_files])))
         num_failures = len(source_files) - len(results)
         if num_failures:
             logger.warning('%s of %s files not uploaded due to "Failed Precondition"', num_failures, len(source_files))
+
+        for blob_name in blobs_to_delete:
+            client.delete_blob(destination_container_name, blob_name, lease_id=lease_id, timeout=timeout)
+            manifest.remove(blob_name)
+        if manifest:
+            manifest.save()
     return results
 
 
+def _get_blob_upload_delta(client, container_name, destination_path, source_files, manifest):
+    """
+    Compare the source files with the blobs in the destination, listed once. Returns the source files which are new
+    or changed, the MD5 hash of each of them, and the blobs uploaded by a previous run whose source files were
+    removed since. Unchanged files are recorded in the manifest.
+    """
+    logger = get_logger(__name__)
+    prefix = normalize_blob_file_path(destination_path, '') + '/' if destination_path else None
+    remote_blobs = {blob.name: blob.properties for blob in client.list_blobs(container_name, prefix=prefix)}
+
+    changed_files, file_md5s, blob_names = [], {}, set()
+    for src, dst in source_files:
+        blob_name = normalize_blob_file_path(destination_path, dst)
+        blob_names.add(blob_name)
+        file_stat = os.stat(src)
+        remote = remote_blobs.get(blob_name)
+        if remote and manifest.is_unchanged(blob_name, file_stat, remote.etag):
+            continue
+        md5 = manifest.get_md5(blob_name, src, file_stat)
+        if remote and remote.content_length == file_stat.st_size and remote.content_settings.content_md5 == md5:
+            manifest.record(blob_name, file_stat, md5, remote.etag)
+            continue
+        changed_files.append((src, dst))
+        file_md5s[src] = md5
+
+    # only delete blobs which were uploaded by a previous run and were not modified since
+    blobs_to_delete = []
+    for blob_name, entry in list(manifest.entries.items()):
+        if blob_name in blob_names:
+            continue
+        remote = remote_blobs.get(blob_name)
+        if remote and remote.etag == entry['etag']:
+            blobs_to_delete.append(blob_name)
+        else:
+            manifest.remove(blob_name)
+
+    logger.info('%d of %d files changed, %d blobs to delete', len(changed_files), len(source_files),
+                len(blobs_to_delete))
+    return changed_files, file_md5s, blobs_to_delete
+
+
+def _copy_content_settings(settings_class, original, **kwargs):
+    settings = {
+        'content_type': original.content_type,
+        'content_encoding': original.content_encoding,
+        'content_disposition': original.content_disposition,
+        'content_language': original.content_language,
+        'content_md5': original.content_md5,
+        'cache_control': original.cache_control
+    }
+    settings.update(kwargs)
+    return settings_class(**settings)
+
+
 def upload_blob(cmd, client, container_name, blob_name, file_path, blob_type=None, content_settings=None, metadata=None,
                 validate_content=False, maxsize_condition=None, max_connections=2, lease_id=None, tier=None,
                 if_modified_since=None, if_unmodified_since=None, if_match=None, if_none_match=None, timeout=None,
@@ -472,8 +591,8 @@ def _copy_blob_to_blob_container(blob_service, source_blob_service, destination_
                                                         sas_token=source_sas)
     destination_blob_name = normalize_blob_file_path(destination_path, source_blob_name)
     try:
-        blob_service.copy_blob(destination_container, destination_blob_name, source_blob_url)
-        return blob_service.make_blob_url(destination_container, destination_blob_name)
+        return destination_blob_name, blob_service.copy_blob(destination_container, destination_blob_name,
+                                                             source_blob_url)
     except AzureException:
         error_template = 'Failed to copy blob {} to container {}.'
         raise CLIError(error_template.format(source_blob_name, destination_container))
@@ -490,8 +609,7 @@ def _copy_file_to_blob_container(blob_service, source_file_service, destination_
     destination_blob_name = normalize_blob_file_path(destination_path, source_path)
 
     try:
-        blob_service.copy_blob(destination_container, destination_blob_name, file_url)
-        return blob_service.make_blob_url(destination_container, destination_blob_name)
+        return destination_blob_name, blob_service.copy_blob(destination_container, destination_blob_name, file_url)
     except AzureException as ex:
         error_template = 'Failed to copy file {} to container {}. {}'
         raise CLIError(error_template.format(source_file_name, destination_container, ex))
@@ -11,7 +11,7 @@ import os
 from azure.cli.command_modules.storage.util import (filter_none, collect_blobs, collect_files,
                                                     create_blob_service_from_storage_client,
                                                     create_short_lived_container_sas, create_short_lived_share_sas,
-                                                    guess_content_type)
+                                                    guess_content_type, transfer_in_parallel)
 from azure.cli.command_modules.storage.url_quote_util import encode_for_url, make_encoded_file_url_and_params
 from knack.log import get_logger
 
@@ -65,18 +65,20 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
                  'Type': guess_content_type(src, content_settings, settings_class).content_type} for src, dst in
                 source_files]
 
-    # TODO: Performance improvement
-    # 1. Upload files in parallel
-    def _upload_action(src, dst):
+    # the cache of existing directories in the destination file share, shared by the upload workers
+    existing_dirs = set()
+
+    def _upload_action(source_file, connections, file_progress_callback):
+        src, dst = source_file
         dst = normalize_blob_file_path(destination_path, dst)
         dir_name = os.path.dirname(dst)
         file_name = os.path.basename(dst)
 
-        _make_directory_in_files_share(client, destination, dir_name)
+        _make_directory_in_files_share(client, destination, dir_name, existing_dirs)
         create_file_args = {'share_name': destination, 'directory_name': dir_name, 'file_name': file_name,
-                            'local_file_path': src, 'progress_callback': progress_callback,
+                            'local_file_path': src, 'progress_callback': file_progress_callback,
                             'content_settings': guess_content_type(src, content_settings, settings_class),
-                            'metadata': metadata, 'max_connections': max_connections}
+                            'metadata': metadata, 'max_connections': connections}
 
         if cmd.supported_api_version(min_api='2016-05-31'):
             create_file_args['validate_content'] = validate_content
@@ -86,7 +88,9 @@ def storage_file_upload_batch(cmd, client, destination, source, destination_path
 
         return client.make_file_url(destination, dir_name, file_name)
 
-    return list(_upload_action(src, dst) for src, dst in source_files)
+    # files are uploaded concurrently, sharing a budget of max_connections connections
+    return transfer_in_parallel(source_files, _upload_action, max_connections, progress_callback=progress_callback,
+                                sizes=[os.path.getsize(src) for src, _ in source_files])
 
 
 def storage_file_download_batch(cmd, client, source, destination, pattern=None, dryrun=False, validate_content=False,
@@ -115,13 +119,13 @@ def storage_file_download_batch(cmd, client, source, destination, pattern=None,
 
         return []
 
-    def _download_action(pair):
+    def _download_action(pair, connections, file_progress_callback):
         destination_dir = os.path.join(destination, pair[0])
         mkdir_p(destination_dir)
 
         get_file_args = {'share_name': source, 'directory_name': pair[0], 'file_name': pair[1],
-                         'file_path': os.path.join(destination, *pair), 'max_connections': max_connections,
-                         'progress_callback': progress_callback, 'snapshot': snapshot}
+                         'file_path': os.path.join(destination, *pair), 'max_connections': connections,
+                         'progress_callback': file_progress_callback, 'snapshot': snapshot}
 
         if cmd.supported_api_version(min_api='2016-05-31'):
             get_file_args['validate_content'] = validate_content
@@ -129,7 +133,8 @@ def storage_file_download_batch(cmd, client, source, destination, pattern=None,
         client.get_file_to_path(**get_file_args)
         return client.make_file_url(source, *pair)
 
-    return list(_download_action(f) for f in source_files)
+    # files are downloaded concurrently while the share is being crawled
+    return transfer_in_parallel(source_files, _download_action, max_connections, progress_callback=progress_callback)
 
 
 def storage_file_copy_batch(cmd, client, source_client, destination_share=None, destination_path=None,
@@ -310,7 +315,7 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
         p = os.path.dirname(p)
 
     for dir_name in reversed(parents):
-        if existing_dirs and (dir_name in existing_dirs):
+        if existing_dirs is not None and dir_name in existing_dirs:
             continue
 
         try:
@@ -319,8 +324,8 @@ def _make_directory_in_files_share(file_service, file_share, directory_path, exi
             from knack.util import CLIError
             raise CLIError('Failed to create directory {}'.format(dir_name))
 
-        if existing_dirs:
-            existing_dirs.add(directory_path)
+        if existing_dirs is not None:
+            existing_dirs.add(dir_name)
 
 
 def _file_share_exists(client, resource_group_name, account_name, share_name):
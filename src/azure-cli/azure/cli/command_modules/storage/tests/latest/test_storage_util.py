@@ -0,0 +1,294 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import mock
+
+from azure.cli.command_modules.storage.util import (transfer_in_parallel, SMALL_FILE_SIZE, SMALL_FILE_BATCH_COUNT,
+                                                    BlobUploadManifest, get_file_md5, collect_blobs,
+                                                    glob_files_remotely)
+
+
+class TestTransferInParallel(unittest.TestCase):
+
+    def test_transfer_in_parallel_respects_connection_budget(self):
+        lock = threading.Lock()
+        state = {'open': 0, 'max_open': 0}
+        calls = []
+
+        def _transfer(item, connections, _):
+            with lock:
+                calls.append((item, connections))
+                state['open'] += connections
+                state['max_open'] = max(state['max_open'], state['open'])
+            with lock:
+                state['open'] -= connections
+            return item * 2
+
+        items = list(range(100))
+        sizes = [SMALL_FILE_SIZE + 1 if i % 10 == 0 else 10 for i in items]
+        results = transfer_in_parallel(items, _transfer, 4, sizes=sizes)
+
+        self.assertEqual(results, [i * 2 for i in items])
+        self.assertLessEqual(state['max_open'], 4)
+        self.assertEqual(sorted(item for item, _ in calls), items)
+        self.assertTrue(all(connections == 1 for _, connections in calls))
+
+    def test_transfer_in_parallel_gives_large_files_the_budget(self):
+        transfer = mock.MagicMock(return_value=None)
+        transfer_in_parallel(['big'], transfer, 8, sizes=[SMALL_FILE_SIZE * 10])
+        transfer.assert_called_once_with('big', 8, mock.ANY)
+
+    def test_transfer_in_parallel_batches_small_files(self):
+        threads = {}
+
+        def _transfer(item, connections, _):
+            threads[item] = threading.current_thread().ident
+
+        items = list(range(SMALL_FILE_BATCH_COUNT))
+        transfer_in_parallel(items, _transfer, 4, sizes=[1] * len(items))
+        self.assertEqual(len(set(threads.values())), 1)
+
+    def test_transfer_in_parallel_reports_aggregated_progress(self):
+        progress_callback = mock.MagicMock()
+
+        def _transfer(item, connections, file_progress_callback):
+            file_progress_callback(item, item)
+
+        transfer_in_parallel([10, 20, 30], _transfer, 2, progress_callback=progress_callback, sizes=[10, 20, 30])
+
+        self.assertTrue(progress_callback.reuse)
+        progress_callback.assert_called_with(60, 60)
+        self.assertEqual(progress_callback.message, '3/3 files')
+        progress_callback.hook.end.assert_called_once_with()
+
+    def test_transfer_in_parallel_raises_errors(self):
+        def _transfer(item, connections, _):
+            if item == 3:
+                raise ValueError('failed')
+
+        with self.assertRaises(ValueError):
+            transfer_in_parallel(range(10), _transfer, 2)
+
+    def test_transfer_in_parallel_streams_items(self):
+        listed = []
+
+        def _list():
+            for i in range(100):
+                listed.append(i)
+                yield i
+
+        transferred = []
+
+        def _transfer(item, connections, _):
+            transferred.append((item, len(listed)))
+            return item
+
+        self.assertEqual(transfer_in_parallel(_list(), _transfer, 2), list(range(100)))
+        # the first transfers started before the listing completed
+        self.assertLess(min(count for _, count in transferred), 100)
+
+
+class TestCollectBlobs(unittest.TestCase):
+
+    @staticmethod
+    def _blob(name):
+        blob = mock.MagicMock()
+        blob.name = name
+        return blob
+
+    def test_collect_blobs_pushes_down_pattern_prefix(self):
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [self._blob(n) for n in ['apple/a.txt', 'apple/b.json', 'apple/c/d.txt']]
+
+        self.assertEqual(list(collect_blobs(client, 'container', 'apple/*.txt')), ['apple/a.txt', 'apple/c/d.txt'])
+        client.list_blobs.assert_called_once_with('container', prefix='apple/')
+
+        client.list_blobs.reset_mock()
+        list(collect_blobs(client, 'container', '*/a.txt'))
+        client.list_blobs.assert_called_once_with('container', prefix=None)
+
+        client.list_blobs.reset_mock()
+        list(collect_blobs(client, 'container', None))
+        client.list_blobs.assert_called_once_with('container', prefix=None)
+
+    def test_collect_blobs_without_wildcards(self):
+        client = mock.MagicMock()
+        client.exists.return_value = True
+        self.assertEqual(collect_blobs(client, 'container', 'apple/a.txt'), ['apple/a.txt'])
+        client.list_blobs.assert_not_called()
+
+
+class TestBlobUploadManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.source = tempfile.mkdtemp()
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.config_dir = self.config_dir
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+        shutil.rmtree(self.source, ignore_errors=True)
+
+    def _write_file(self, name, content):
+        path = os.path.join(self.source, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path, name
+
+    @staticmethod
+    def _blob(name, size, md5, etag):
+        blob = mock.MagicMock()
+        blob.name = name
+        blob.properties.content_length = size
+        blob.properties.content_settings.content_md5 = md5
+        blob.properties.etag = etag
+        return blob
+
+    def _get_manifest(self):
+        return BlobUploadManifest(self.cli_ctx, 'account', 'container', 'site', self.source)
+
+    def test_blob_upload_delta(self):
+        from azure.cli.command_modules.storage.operations.blob import _get_blob_upload_delta
+
+        unchanged = self._write_file('unchanged', 'a')
+        changed = self._write_file('changed', 'bb')
+        new = self._write_file('new', 'ccc')
+        copied = self._write_file('copied', 'dddd')
+
+        manifest = self._get_manifest()
+        manifest.record('site/unchanged', os.stat(unchanged[0]), get_file_md5(unchanged[0]), 'etag1')
+        manifest.record('site/changed', os.stat(changed[0]), 'old-md5', 'etag2')
+        manifest.record('site/removed', os.stat(changed[0]), 'md5', 'etag3')
+        manifest.record('site/removed_modified', os.stat(changed[0]), 'md5', 'etag4')
+        manifest.entries['site/changed']['size'] = 1
+        manifest.save()
+
+        client = mock.MagicMock()
+        client.list_blobs.return_value = [
+            self._blob('site/unchanged', 1, None, 'etag1'),
+            self._blob('site/changed', 1, 'old-md5', 'etag2'),
+            self._blob('site/copied', 4, get_file_md5(copied[0]), 'etag5'),
+            self._blob('site/removed', 1, 'md5', 'etag3'),
+            self._blob('site/removed_modified', 1, 'md5', 'modified'),
+        ]
+
+        manifest = self._get_manifest()
+        changed_files, md5s, blobs_to_delete = _get_blob_upload_delta(
+            client, 'container', 'site', [unchanged, changed, new, copied], manifest)
+
+        client.list_blobs.assert_called_once_with('container', prefix='site/')
+        self.assertEqual(changed_files, [changed, new])
+        self.assertEqual(md5s[new[0]], get_file_md5(new[0]))
+        self.assertEqual(blobs_to_delete, ['site/removed'])
+        self.assertEqual(manifest.entries['site/copied']['etag'], 'etag5')
+        self.assertNotIn('site/removed_modified', manifest.entries)
+
+
+class TestGlobFilesRemotely(unittest.TestCase):
+
+    class Directory(object):
+        def __init__(self, name):
+            self.name = name
+
+    class File(Directory):
+        pass
+
+    def _get_client(self, tree):
+        client = mock.MagicMock()
+        listed = []
+
+        def _list(share_name, directory):
+            listed.append(directory)
+            return [self.Directory(n) if isinstance(c, dict) else self.File(n)
+                    for n, c in self._find(tree, directory).items()]
+
+        client.list_directories_and_files.side_effect = _list
+        return client, listed
+
+    @staticmethod
+    def _find(tree, directory):
+        for part in [p for p in directory.split(os.sep) if p]:
+            tree = tree[part]
+        return tree
+
+    def test_glob_files_remotely(self):
+        cmd = mock.MagicMock()
+        cmd.get_models.return_value = (self.Directory, self.File)
+        tree = {'a.txt': None, 'apple': {'b.txt': None, 'c': {'d.txt': None, 'e.json': None}},
+                'banana': {'f.txt': None}}
+
+        client, listed = self._get_client(tree)
+        files = sorted(glob_files_remotely(cmd, client, 'share', None))
+        self.assertEqual(files, sorted([('', 'a.txt'), ('apple', 'b.txt'), (os.path.join('apple', 'c'), 'd.txt'),
+                                        (os.path.join('apple', 'c'), 'e.json'), ('banana', 'f.txt')]))
+
+        # directories outside of the literal prefix of the pattern are not listed
+        client, listed = self._get_client(tree)
+        files = sorted(glob_files_remotely(cmd, client, 'share', 'apple/*.txt'))
+        self.assertEqual(files, [('apple', 'b.txt'), (os.path.join('apple', 'c'), 'd.txt')])
+        self.assertNotIn('banana', listed)
+
+
+class TestMakeDirectoryInFilesShare(unittest.TestCase):
+
+    def test_make_directory_uses_cache(self):
+        from azure.cli.command_modules.storage.operations.file import _make_directory_in_files_share
+        client = mock.MagicMock()
+        existing_dirs = set()
+        _make_directory_in_files_share(client, 'share', 'a/b/c', existing_dirs)
+        _make_directory_in_files_share(client, 'share', 'a/b/d', existing_dirs)
+        created = [c[1]['directory_name'] for c in client.create_directory.call_args_list]
+        self.assertEqual(created, ['a', 'a/b', 'a/b/c', 'a/b/d'])
+
+
+class TestBlobCopyBatch(unittest.TestCase):
+
+    @staticmethod
+    def _copy(status, progress=None, status_description=None):
+        return mock.MagicMock(status=status, progress=progress, status_description=status_description)
+
+    @mock.patch('time.sleep', autospec=True)
+    def test_wait_for_blob_copies(self, sleep_mock):
+        from knack.util import CLIError
+        from azure.cli.command_modules.storage.operations.blob import _wait_for_blob_copies
+
+        statuses = {
+            'a': [self._copy('pending', '5/10'), self._copy('success', '10/10')],
+            'b': [self._copy('pending', '1/20'), self._copy('pending', '10/20'), self._copy('failed', '10/20', 'gone')]
+        }
+        client = mock.MagicMock()
+        client.get_blob_properties.side_effect = lambda c, n: mock.MagicMock(
+            properties=mock.MagicMock(copy=statuses[n].pop(0)))
+
+        copies = [('a', self._copy('pending')), ('b', self._copy('pending')), ('c', self._copy('success'))]
+        with self.assertRaisesRegexp(CLIError, 'b: failed gone'):
+            _wait_for_blob_copies(client, 'container', copies)
+
+        self.assertEqual([c[0][0] for c in sleep_mock.call_args_list], [1, 2, 4])
+        self.assertEqual(client.get_blob_properties.call_count, 5)
+
+    def test_run_blob_copy_batch(self):
+        from azure.cli.command_modules.storage.operations.blob import _run_blob_copy_batch
+
+        client = mock.MagicMock()
+        client.make_blob_url.side_effect = lambda c, n: 'https://account/{}/{}'.format(c, n)
+        copy_action = mock.MagicMock(side_effect=lambda name, *_: ('dest/' + name, self._copy('success')))
+
+        urls = _run_blob_copy_batch(client, 'container', ['a', 'b'], copy_action, False, True)
+        self.assertEqual(urls, ['https://account/container/dest/a', 'https://account/container/dest/b'])
+        client.get_blob_properties.assert_not_called()
+
+        self.assertEqual(_run_blob_copy_batch(client, 'container', ['a', 'b'], copy_action, True, False), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
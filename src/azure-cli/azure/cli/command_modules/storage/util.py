@@ -5,6 +5,7 @@
 
 
 import os
+import re
 
 
 def collect_blobs(blob_service, container, pattern=None):
@@ -20,17 +21,23 @@ def collect_blobs(blob_service, container, pattern=None):
     if not _pattern_has_wildcards(pattern):
         return [pattern] if blob_service.exists(container, pattern) else []
 
-    results = []
-    for blob in blob_service.list_blobs(container):
+    return _list_matching_blobs(blob_service, container, pattern)
+
+
+def _list_matching_blobs(blob_service, container, pattern):
+    """
+    Yield the names of the blobs matching the pattern while the listing continues. Only the blobs starting with the
+    literal prefix of the pattern are listed.
+    """
+    prefix = _get_pattern_prefix(pattern) or None
+    for blob in blob_service.list_blobs(container, prefix=prefix):
         try:
             blob_name = blob.name.encode('utf-8') if isinstance(blob.name, unicode) else blob.name
         except NameError:
             blob_name = blob.name
 
         if not pattern or _match_path(blob_name, pattern):
-            results.append(blob_name)
-
-    return results
+            yield blob_name
 
 
 def collect_files(cmd, file_service, share, pattern=None):
@@ -81,20 +88,39 @@ def glob_files_locally(folder_path, pattern):
                 yield (full_path, full_path[len_folder_path:])
 
 
-def glob_files_remotely(cmd, client, share_name, pattern):
-    """glob the files in remote file share based on the given pattern"""
+def glob_files_remotely(cmd, client, share_name, pattern, max_workers=8):
+    """
+    glob the files in remote file share based on the given pattern. Directories are listed concurrently by up to
+    `max_workers` threads, the directories which cannot contain matching files are skipped, and the files of a
+    directory are yielded as soon as it has been listed.
+    """
     from collections import deque
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
     t_dir, t_file = cmd.get_models('file.models#Directory', 'file.models#File')
+    prefix = _get_pattern_prefix(pattern)
 
-    queue = deque([""])
-    while queue:
-        current_dir = queue.pop()
-        for f in client.list_directories_and_files(share_name, current_dir):
+    def _list_directory(directory):
+        files, directories = [], []
+        for f in client.list_directories_and_files(share_name, directory):
+            path = os.path.join(directory, f.name)
             if isinstance(f, t_file):
-                if not pattern or _match_path(os.path.join(current_dir, f.name), pattern):
-                    yield current_dir, f.name
-            elif isinstance(f, t_dir):
-                queue.appendleft(os.path.join(current_dir, f.name))
+                if not pattern or _match_path(path, pattern):
+                    files.append(f.name)
+            elif isinstance(f, t_dir) and _may_contain_matches(path, prefix):
+                directories.append(path)
+        return directory, files, directories
+
+    pending, running = deque([""]), set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                running.add(executor.submit(_list_directory, pending.popleft()))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory, files, directories = future.result()
+                pending.extend(directories)
+                for file_name in files:
+                    yield directory, file_name
 
 
 def create_short_lived_blob_sas(cmd, account_name, account_key, container, blob):
@@ -167,6 +193,19 @@ def _pattern_has_wildcards(p):
     return not p or p.find('*') != -1 or p.find('?') != -1 or p.find('[') != -1
 
 
+def _get_pattern_prefix(pattern):
+    """ The part of the pattern before its first wildcard, which every matching path starts with. """
+    if not pattern:
+        return ''
+    return re.split(r'[*?[]', pattern, 1)[0]
+
+
+def _may_contain_matches(directory, prefix):
+    """ Whether files in the directory may match a pattern starting with the given literal prefix. """
+    directory, prefix = os.path.normcase(directory), os.path.normcase(prefix)
+    return prefix.startswith(directory + os.sep) or directory.startswith(prefix)
+
+
 def _match_path(path, pattern):
     from fnmatch import fnmatch
     return fnmatch(path, pattern)
@@ -212,6 +251,209 @@ def normalize_blob_file_path(path, name):
     return path_sep.join(os.path.normpath(name).split(os.path.sep)).strip(path_sep)
 
 
+def get_file_md5(file_path):
+    """ The base64 encoded MD5 hash of a file, as stored in the Content-MD5 property of blobs. """
+    import base64
+    import hashlib
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as stream:
+        for chunk in iter(lambda: stream.read(4 * 1024 * 1024), b''):
+            md5.update(chunk)
+    return base64.b64encode(md5.digest()).decode('utf-8')
+
+
+class BlobUploadManifest(object):
+    """
+    The size, modification time and MD5 hash of the files uploaded from a local directory to a destination blob
+    path with a file pattern, along with the ETag of the resulting blobs. It is used to tell which files changed
+    since the last upload without hashing unchanged files, and is stored under the CLI configuration directory.
+    """
+
+    _MANIFEST_DIR = 'blobUploadManifests'
+
+    def __init__(self, cli_ctx, account_name, container_name, destination_path, source, pattern=None):
+        import hashlib
+        from knack.util import ensure_dir
+        from azure.cli.core._session import Session
+        manifest_dir = os.path.join(cli_ctx.config.config_dir, self._MANIFEST_DIR)
+        ensure_dir(manifest_dir)
+        key = '\n'.join([account_name or '', container_name, destination_path or '', source, pattern or ''])
+        self._session = Session()
+        self._session.load(os.path.join(manifest_dir,
+                                        '{}.json'.format(hashlib.sha256(key.encode('utf-8')).hexdigest())))
+        self.entries = self._session.data.setdefault('files', {})
+
+    def is_unchanged(self, blob_name, file_stat, etag):
+        """ Whether the file was uploaded to a blob which has not been modified since. """
+        entry = self.entries.get(blob_name)
+        return bool(entry and etag and entry['etag'] == etag and entry['size'] == file_stat.st_size and
+                    entry['mtime'] == file_stat.st_mtime)
+
+    def get_md5(self, blob_name, file_path, file_stat):
+        entry = self.entries.get(blob_name)
+        if entry and entry['size'] == file_stat.st_size and entry['mtime'] == file_stat.st_mtime:
+            return entry['md5']
+        return get_file_md5(file_path)
+
+    def record(self, blob_name, file_stat, md5, etag):
+        self.entries[blob_name] = {'size': file_stat.st_size, 'mtime': file_stat.st_mtime, 'md5': md5, 'etag': etag}
+
+    def remove(self, blob_name):
+        self.entries.pop(blob_name, None)
+
+    def save(self):
+        self._session.save_with_retry()
+
+
+# files up to this size are transferred with a single request and are grouped into batches of worker tasks
+SMALL_FILE_SIZE = 4 * 1024 * 1024
+SMALL_FILE_BATCH_COUNT = 32
+
+
+class _ConnectionBudget(object):
+    """ Connections shared by all the transfers of a batch command. """
+
+    def __init__(self, max_connections):
+        import threading
+        self.available = max_connections
+        self._condition = threading.Condition()
+
+    def acquire(self, count):
+        with self._condition:
+            while self.available < count:
+                self._condition.wait()
+            self.available -= count
+
+    def release(self, count):
+        with self._condition:
+            self.available += count
+            self._condition.notify_all()
+
+
+class _BatchProgress(object):
+    """ Aggregates the progress of the transfers of a batch command into one progress report. The progress is
+    measured in bytes when the sizes of all files are known, otherwise in number of files. """
+
+    def __init__(self, progress_callback, total_count, total_size=None):
+        import threading
+        self.progress_callback = progress_callback
+        self.total_count = total_count
+        self.total_size = total_size
+        self.completed_count = 0
+        self.completed_size = 0
+        self._in_progress = {}
+        self._lock = threading.Lock()
+        if progress_callback:
+            # Tell progress reporter to reuse the same hook
+            progress_callback.reuse = True
+
+    def _report(self):
+        if not self.progress_callback:
+            return
+        self.progress_callback.message = '{}/{} files'.format(self.completed_count, self.total_count)
+        if self.total_size:
+            self.progress_callback(self.completed_size + sum(self._in_progress.values()), self.total_size)
+        else:
+            self.progress_callback(self.completed_count, self.total_count)
+
+    def get_file_callback(self, key):
+        if not self.total_size:
+            return None
+
+        def _file_progress(current, _):
+            with self._lock:
+                self._in_progress[key] = current
+                self._report()
+        return _file_progress
+
+    def file_done(self, key, size):
+        with self._lock:
+            self._in_progress.pop(key, None)
+            self.completed_count += 1
+            self.completed_size += size or 0
+            self._report()
+
+    def end(self):
+        if self.progress_callback:
+            self.progress_callback.hook.end()
+
+
+def transfer_in_parallel(items, transfer_func, max_connections, progress_callback=None, sizes=None):
+    """
+    Transfer files concurrently with at most `max_connections` connections open at once across all files.
+    `transfer_func(item, connections, file_progress_callback)` transfers a single item using up to `connections`
+    connections. `items` may be a generator, in which case transfers start while it is still being consumed and
+    only a bounded number of items is queued. Small files (per `sizes`) are grouped so that a worker task transfers
+    several of them, and files too large for a single request may use several connections when there are few
+    files. The progress of all transfers is reported through `progress_callback`. Returns the results in the order
+    of `items`.
+    """
+    import itertools
+    import sys
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    max_connections = max(max_connections or 1, 1)
+    sizes = list(sizes) if sizes is not None else None
+    items = iter(items)
+    # peek at the first items to tell whether there are fewer files than connections
+    first_items = list(itertools.islice(items, max_connections))
+    total_count = len(first_items) if len(first_items) < max_connections else None
+    if sizes is not None:
+        total_count = len(sizes)
+    items = itertools.chain(first_items, items)
+    # connections of a file which cannot be uploaded or downloaded with a single request
+    large_file_connections = max(1, max_connections // max(1, min(max_connections, total_count or max_connections)))
+
+    progress = _BatchProgress(progress_callback, total_count or 0, sum(sizes) if sizes is not None else None)
+    budget = _ConnectionBudget(max_connections)
+    backlog = threading.BoundedSemaphore(max_connections * 2)
+    results, errors = {}, []
+
+    def _iter_tasks():
+        small_files = []
+        for index, item in enumerate(items):
+            if total_count is None:
+                progress.total_count = index + 1
+            size = sizes[index] if sizes is not None else None
+            if size is not None and size <= SMALL_FILE_SIZE:
+                small_files.append((index, item, size))
+                if len(small_files) == SMALL_FILE_BATCH_COUNT:
+                    yield small_files, 1
+                    small_files = []
+            else:
+                yield [(index, item, size)], large_file_connections
+        if small_files:
+            yield small_files, 1
+
+    def _run_task(files, connections):
+        budget.acquire(connections)
+        try:
+            for index, item, size in files:
+                if errors:
+                    return
+                results[index] = transfer_func(item, connections, progress.get_file_callback(index))
+                progress.file_done(index, size)
+        except BaseException:  # pylint: disable=broad-except
+            errors.append(sys.exc_info())
+        finally:
+            budget.release(connections)
+            backlog.release()
+
+    with ThreadPoolExecutor(max_workers=max_connections) as executor:
+        for files, connections in _iter_tasks():
+            backlog.acquire()
+            if errors:
+                backlog.release()
+                break
+            executor.submit(_run_task, files, connections)
+    if errors:
+        import six
+        six.reraise(*errors[0])
+    progress.end()
+    return [results[index] for index in sorted(results)]
+
+
 def check_precondition_success(func):
     def wrapper(*args, **kwargs):
         from azure.common import AzureHttpError